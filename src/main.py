@@ -1,7 +1,8 @@
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from PyQt5.Qsci import QsciScintilla, QsciLexerPerl, QsciLexerPython
+from PyQt5.Qsci import (QsciScintilla, QsciLexerPerl, QsciLexerPython, QsciLexerBash, QsciLexerJSON,
+                         QsciLexerYAML, QsciLexerCustom, QsciStyle)
 import sys
 from pathlib import Path
 import subprocess
@@ -12,9 +13,31 @@ import json
 import pyjokes
 import requests
 import re
+import time
+import hashlib
+import zlib
+import codecs
+import sqlite3
+import heapq
+import queue
+import threading
+from urllib.parse import unquote
+from collections import deque
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
+import difflib
+import bisect
+import mmap
+from array import array
 from Bio import SeqIO
 from io import StringIO
 
+try:
+    import resource
+except ImportError:
+    # resource is only available on POSIX systems
+    resource = None
+
 # Set up environment variables for custom interpreters
 def setup_custom_interpreters():
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -34,6 +57,61 @@ def setup_custom_interpreters():
 # Call setup at module level
 setup_custom_interpreters()
 
+def format_byte_size(size):
+    """Format a byte count as a short human readable string"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+# Byte order marks, UTF-32 LE comes first since it starts with the UTF-16 LE mark
+TEXT_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+# Tried in order for files without a BOM, latin1 accepts any byte so it is the last resort
+TEXT_ENCODINGS = ['utf-8', 'cp1252', 'latin1']
+# Leading bytes searched for NULs to recognize binary files
+BINARY_SNIFF_BYTES = 8192
+# Read once at import, os.umask can only be queried by setting it, which is not safe from worker threads
+PROCESS_UMASK = os.umask(0)
+os.umask(PROCESS_UMASK)
+
+# Opened in the image viewer rather than as text
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.svg']
+# Known non-text file extensions (excluding images)
+NON_TEXT_EXTENSIONS = [
+    '.pdf', '.exe', '.dll', '.zip', '.rar', '.7z', '.tar', '.gz', '.mp3', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.wav', '.ogg', '.bin', '.obj', '.class', '.so', '.dylib', '.psd', '.ai', '.eps', '.ttf', '.otf', '.woff', '.woff2', '.apk', '.iso', '.img', '.msi', '.cab', '.sys', '.dat', '.db', '.sqlite', '.mdb', '.accdb', '.ppt', '.pptx', '.xls', '.xlsx', '.doc', '.docx', '.rtf', '.chm', '.swf', '.fla', '.jar', '.crx', '.xpi', '.vbs', '.scr', '.msu', '.msp', '.bat', '.com', '.pif', '.cpl', '.msc', '.lnk', '.tmp', '.torrent', '.sav']
+
+def is_binary_path(path):
+    """Known non-text type by extension, images excluded. Content is sniffed for NULs when read"""
+    ext = os.path.splitext(str(path))[1].lower()
+    return ext not in IMAGE_EXTENSIONS and ext in NON_TEXT_EXTENSIONS
+
+def sniff_bom(head):
+    """(encoding, BOM length) for the first bytes of a file, None without a BOM"""
+    for bom, encoding in TEXT_BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    return None
+
+def decode_text(data):
+    """Decode a file read in one go, returns (text, encoding, has BOM) or None for binary content"""
+    bom = sniff_bom(data[:4])
+    if bom is not None:
+        encoding, length = bom
+        return data[length:].decode(encoding, errors='replace'), encoding, True
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return None
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding), encoding, False
+        except UnicodeDecodeError:
+            continue
+
 class SettingsPanel(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -429,96 +507,1147 @@ class AddPanel(QFrame):
         layout.addStretch()
         self.setLayout(layout)
 
-class CommandPromptEmulator(QTextEdit):
+class TerminalLineBuffer:
+    """
+    Fixed-capacity ring buffer of terminal lines, each line is a list of [text, style] spans
+    """
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self.ring = [None] * self.capacity
+        self.head = 0
+        self.count = 0
+        # Total number of lines that fell off the start of the buffer
+        self.dropped = 0
+        # Called with each line once a new line starts after it
+        self.on_line_finished = None
+        self.append_line()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.ring[(self.head + index) % self.capacity]
+
+    def append_line(self):
+        """Start a new empty line, dropping the oldest one when full"""
+        if self.count and self.on_line_finished is not None:
+            self.on_line_finished(self.last())
+        if self.count == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+            self.dropped += 1
+        else:
+            self.count += 1
+        line = self.tail = []
+        self.ring[(self.head + self.count - 1) % self.capacity] = line
+        return line
+
+    def last(self):
+        return self.tail
+
+    def clear(self):
+        self.ring = [None] * self.capacity
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+        self.append_line()
+
+    @staticmethod
+    def line_text(line):
+        return "".join(span[0] for span in line)
+
+class TerminalCache:
+    """
+    Terminal scrollback persisted as size-rotated gzip segments, appended by a background thread
+    """
+    # Compressed size after which a new segment is started
+    SEGMENT_BYTES = 256 * 1024
+    # Oldest segments beyond this are deleted
+    MAX_SEGMENTS = 16
+    # Seconds to collect lines before compressing them in one batch
+    BATCH_DELAY = 0.25
+    SEGMENT_PATTERN = re.compile(r'^terminal-(\d+)\.log\.gz$')
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def segments(self):
+        """Segment paths, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        numbered = []
+        for name in names:
+            match = self.SEGMENT_PATTERN.match(name)
+            if match:
+                numbered.append((int(match.group(1)), name))
+        return [os.path.join(self.directory, name) for _, name in sorted(numbered)]
+
+    @staticmethod
+    def read_segment(path):
+        """Decompress a segment made of one or more gzip members, returns the text and whether it ends cleanly"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return "", False
+        parts = []
+        complete = True
+        while data:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                parts.append(decompressor.decompress(data))
+            except zlib.error:
+                complete = False
+                break
+            if not decompressor.eof:
+                # Member cut short, e.g. by a crash, what was flushed is still readable
+                complete = False
+                break
+            data = decompressor.unused_data
+        return b"".join(parts).decode('utf-8', errors='replace'), complete
+
+    def tail(self, line_count):
+        """Last lines of the scrollback, only the newest segments needed for them are read"""
+        lines = []
+        # First line of the newer segments, it may continue the last line of an older one
+        head = ""
+        for path in reversed(self.segments()):
+            segment_lines = (self.read_segment(path)[0] + head).split("\n")
+            head = segment_lines.pop(0)
+            lines[:0] = segment_lines
+            if len(lines) > line_count:
+                break
+        else:
+            if head:
+                lines.insert(0, head)
+        if lines and lines[-1] == "":
+            lines.pop()
+        return lines[-line_count:]
+
+    def write(self, text):
+        """Queue text to be appended, the file work happens on the writer thread"""
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.run, daemon=True)
+            self.writer.start()
+        self.queue.put(text)
+
+    def close(self):
+        """Flush queued text and finish the current segment"""
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join(2)
+            self.writer = None
+
+    def discard(self):
+        """Stop writing and delete the segments, for a session that was closed"""
+        import shutil
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open_segment(self):
+        """Continue the newest segment while it is small and intact, otherwise start a new one"""
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self.segments()
+        path = None
+        if segments and os.path.getsize(segments[-1]) < self.SEGMENT_BYTES and self.read_segment(segments[-1])[1]:
+            path = segments[-1]
+        else:
+            number = int(self.SEGMENT_PATTERN.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+            path = os.path.join(self.directory, f"terminal-{number:06d}.log.gz")
+            segments.append(path)
+            for old_path in segments[:-self.MAX_SEGMENTS]:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        # Each open adds a new gzip member, readers handle several members per file
+        return open(path, 'ab'), zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def run(self):
+        stream = None
+        compressor = None
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            if batch[0] is not None:
+                time.sleep(self.BATCH_DELAY)
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            data = "".join(item for item in batch if item is not None).encode('utf-8')
+            try:
+                # Large batches are written in pieces so segments rotate close to their size limit
+                for start in range(0, len(data), self.SEGMENT_BYTES):
+                    if stream is not None and stream.tell() >= self.SEGMENT_BYTES:
+                        stream.write(compressor.flush())
+                        stream.close()
+                        stream = None
+                    if stream is None:
+                        stream, compressor = self.open_segment()
+                    stream.write(compressor.compress(data[start:start + self.SEGMENT_BYTES]))
+                    # Sync flush so everything written so far survives a crash
+                    stream.write(compressor.flush(zlib.Z_SYNC_FLUSH))
+                    stream.flush()
+                if stop and stream is not None:
+                    stream.write(compressor.flush())
+                    stream.close()
+                    stream = None
+            except OSError as e:
+                print(f"Error writing terminal cache: {e}")
+                stream = None
+
+class CommandHistoryStore:
+    """
+    Terminal command history shared by all sessions, persisted in SQLite and deduplicated per directory
+    """
+    def __init__(self, path):
+        self.path = path
+        # In-memory copy for searching: cwd -> {command: [count, last_used]}
+        self.entries = None
+        self.loader = None
+        # Commands added while the loader thread runs, replayed once it is done
+        self.added_while_loading = []
+        try:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "command TEXT NOT NULL, cwd TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 1, "
+                "last_used REAL NOT NULL, PRIMARY KEY (command, cwd))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS history_last_used ON history (last_used)")
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print(f"Error opening command history: {e}")
+            self.connection = None
+
+    def add(self, command, cwd):
+        """Record a use of a command in a directory"""
+        now = time.time()
+        if self.connection is not None:
+            try:
+                self.connection.execute(
+                    "INSERT INTO history (command, cwd, count, last_used) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (command, cwd) DO UPDATE SET count = count + 1, last_used = excluded.last_used",
+                    (command, cwd, now))
+                self.connection.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving command history: {e}")
+        if self.entries is not None:
+            self.remember(self.entries, command, cwd, 1, now)
+        elif self.loader is not None:
+            self.added_while_loading.append((command, cwd, now))
+
+    @staticmethod
+    def remember(entries, command, cwd, count, last_used):
+        entry = entries.setdefault(cwd, {}).setdefault(command, [0, last_used])
+        entry[0] += count
+        entry[1] = max(entry[1], last_used)
+
+    def recent(self, limit=500):
+        """Most recently used distinct commands, oldest first"""
+        if self.connection is None:
+            return []
+        commands = []
+        seen = set()
+        # Walk the last_used index newest first, the same command may appear for several directories
+        for (command,) in self.connection.execute(
+                "SELECT command FROM history ORDER BY last_used DESC LIMIT ?", (limit * 4,)):
+            if command not in seen:
+                seen.add(command)
+                commands.append(command)
+                if len(commands) == limit:
+                    break
+        return commands[::-1]
+
+    def read_entries(self):
+        # Uses its own connection so it can run on the loader thread
+        entries = {}
+        try:
+            connection = sqlite3.connect(self.path)
+            for command, cwd, count, last_used in connection.execute(
+                    "SELECT command, cwd, count, last_used FROM history"):
+                self.remember(entries, command, cwd, count, last_used)
+            connection.close()
+        except sqlite3.Error as e:
+            print(f"Error reading command history: {e}")
+        return entries
+
+    def preload(self):
+        """Read the history into memory in the background so the first search is instant"""
+        if self.entries is not None or self.loader is not None or self.connection is None:
+            return
+        import threading
+        self.loader = threading.Thread(target=self.finish_preload, daemon=True)
+        self.loader.start()
+
+    def finish_preload(self):
+        entries = self.read_entries()
+        # Publish first, adds from now on go straight into the entries
+        self.entries = entries
+        pending, self.added_while_loading = self.added_while_loading, []
+        for command, cwd, now in pending:
+            self.remember(entries, command, cwd, 1, now)
+
+    def load(self):
+        if self.entries is None:
+            if self.loader is not None:
+                self.loader.join()
+            else:
+                self.entries = self.read_entries() if self.connection is not None else {}
+        return self.entries
+
+    @staticmethod
+    def frecency(count, last_used, now):
+        """Use count weighted by how recently the command was used"""
+        age = now - last_used
+        if age < 3600:
+            weight = 4.0
+        elif age < 86400:
+            weight = 2.0
+        elif age < 7 * 86400:
+            weight = 0.5
+        else:
+            weight = 0.25
+        return count * weight
+
+    def candidates(self, cwd=None):
+        """All (command, score) pairs, limited to one directory when cwd is given"""
+        now = time.time()
+        entries = self.load()
+        if cwd is not None:
+            return [(command, self.frecency(count, last_used, now))
+                    for command, (count, last_used) in entries.get(cwd, {}).items()]
+        scores = {}
+        for commands in entries.values():
+            for command, (count, last_used) in commands.items():
+                scores[command] = scores.get(command, 0) + self.frecency(count, last_used, now)
+        return list(scores.items())
+
+    @staticmethod
+    def fuzzy_filter(candidates, query, limit=None):
+        """Keep candidates containing the query as a subsequence, best first"""
+        if not query:
+            matches = candidates
+        else:
+            lowered = query.lower()
+            pattern = re.compile(".*?".join(re.escape(char) for char in lowered))
+            # The first character is checked with a fast substring test before the regex
+            first = lowered[0]
+            matches = [c for c in candidates if first in c[0].lower() and pattern.search(c[0].lower())]
+        if limit is None:
+            return matches
+
+        def rank(candidate):
+            # Contiguous matches rank above scattered ones
+            bonus = 2.0 if query.lower() in candidate[0].lower() else 1.0
+            return candidate[1] * bonus
+        return heapq.nlargest(limit, matches, key=rank)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+# 16 base colors used for ANSI color indexes 0-15
+ANSI_PALETTE = [
+    "#000000", "#cd3131", "#0dbc79", "#e5e510", "#2472c8", "#bc3fbc", "#11a8cd", "#e5e5e5",
+    "#666666", "#f14c4c", "#23d18b", "#f5f543", "#3b8eea", "#d670d6", "#29b8db", "#ffffff",
+]
+
+# CSI, OSC and other escape sequences, an escape that starts none of them is dropped on its own
+ANSI_SEQUENCE_PATTERN = re.compile(
+    r'\x1b(?:\[([0-9;:?<=>]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[()#%][^\x1b\n]|[^\[\]()#%\x1b\n]|)')
+# The start of a sequence cut off at the end of a read: ESC, CSI without its final byte, OSC without
+# its terminator (or only the ESC of it), or a charset escape without its argument
+ANSI_INCOMPLETE_PATTERN = re.compile(r'\x1b(?:\[[0-9;:?<=>]*[ -/]*|\][^\x07\x1b]*\x1b?|[()#%])?')
+
+class AnsiParser:
+    """
+    Streaming ANSI parser turning text with SGR sequences into (text, style) runs
+
+    A style is None for the default colors or a tuple (fg, bg, bold, italic, underline, inverse),
+    colors are None, a 0-255 palette index or an (r, g, b) tuple.
+    """
+    DEFAULT_STYLE = (None, None, False, False, False, False)
+    # Caches shared by all parsers: SGR transitions per style, QColors and QTextCharFormats per style
+    sgr_cache = {}
+    color_cache = {}
+    format_cache = {}
+
+    def __init__(self, base_style=None):
+        self.style = base_style
+        # Incomplete escape sequence held back until the next chunk
+        self.pending = ""
+
+    def feed(self, text):
+        """Split a chunk into styled runs, non-SGR sequences are dropped"""
+        if self.pending:
+            text = self.pending + text
+            self.pending = ""
+        if "\x1b" not in text:
+            # Fast path: plain text keeps the current style
+            return [(text, self.style)] if text else []
+        escape = text.rfind("\x1b")
+        osc = text.rfind("\x1b]", 0, escape)
+        if osc != -1 and ANSI_INCOMPLETE_PATTERN.fullmatch(text, osc):
+            # The last escape is the first half of the terminator of an OSC sequence
+            escape = osc
+        if len(text) - escape < 256 and ANSI_INCOMPLETE_PATTERN.fullmatch(text, escape):
+            # Held back until the rest of the sequence arrives
+            self.pending = text[escape:]
+            text = text[:escape]
+        # split() yields text, parameters, final byte, text, ... without per-match objects
+        parts = ANSI_SEQUENCE_PATTERN.split(text)
+        # Text after a sequence that leaves the style as it was (resets, unsupported codes) stays in
+        # the same run, every run costs a separate insert in the widget
+        runs = []
+        style = self.style
+        transitions = self.transitions(style)
+        run_text = parts[0]
+        for parameters, final, after in zip(parts[1::3], parts[2::3], parts[3::3]):
+            if final == "m":
+                # False when not cached yet, None is the default style
+                new_style = transitions.get(parameters, False)
+                if new_style is False:
+                    new_style = self.apply_sgr(style, parameters)
+                if new_style != style:
+                    if run_text:
+                        runs.append((run_text, style))
+                    run_text = after
+                    style = new_style
+                    transitions = self.transitions(style)
+                    continue
+            run_text += after
+        if run_text:
+            runs.append((run_text, style))
+        self.style = style
+        return runs
+
+    def flush(self):
+        """End of the stream: an incomplete sequence held back from the last chunk is dropped"""
+        self.pending = ""
+
+    @classmethod
+    def transitions(cls, style):
+        """Cached styles after SGR parameters, starting from style"""
+        table = cls.sgr_cache.get(style)
+        if table is None:
+            if len(cls.sgr_cache) > 256:
+                cls.sgr_cache.clear()
+            table = cls.sgr_cache[style] = {}
+        return table
+
+    @classmethod
+    def apply_sgr(cls, style, parameters):
+        """Style after an SGR sequence"""
+        table = cls.transitions(style)
+        if parameters in table:
+            return table[parameters]
+        fg, bg, bold, italic, underline, inverse = style or cls.DEFAULT_STYLE
+        codes = [int(part) if part.isdigit() else 0 for part in parameters.replace(":", ";").split(";")]
+        index = 0
+        while index < len(codes):
+            code = codes[index]
+            if code == 0:
+                fg, bg, bold, italic, underline, inverse = cls.DEFAULT_STYLE
+            elif code == 1:
+                bold = True
+            elif code == 22:
+                bold = False
+            elif code == 3:
+                italic = True
+            elif code == 23:
+                italic = False
+            elif code == 4:
+                underline = True
+            elif code == 24:
+                underline = False
+            elif code == 7:
+                inverse = True
+            elif code == 27:
+                inverse = False
+            elif 30 <= code <= 37:
+                fg = code - 30
+            elif 90 <= code <= 97:
+                fg = code - 90 + 8
+            elif code == 39:
+                fg = None
+            elif 40 <= code <= 47:
+                bg = code - 40
+            elif 100 <= code <= 107:
+                bg = code - 100 + 8
+            elif code == 49:
+                bg = None
+            elif code in (38, 48) and index + 1 < len(codes):
+                # Extended colors: 5;n (256 colors) or 2;r;g;b (true color)
+                if codes[index + 1] == 5 and index + 2 < len(codes):
+                    color = codes[index + 2]
+                    index += 2
+                elif codes[index + 1] == 2 and index + 4 < len(codes):
+                    color = tuple(codes[index + 2:index + 5])
+                    index += 4
+                else:
+                    color = None
+                    index += 1
+                if code == 38:
+                    fg = color
+                else:
+                    bg = color
+            index += 1
+        result = (fg, bg, bold, italic, underline, inverse)
+        if result == cls.DEFAULT_STYLE:
+            result = None
+        if len(table) > 4096:
+            table.clear()
+        table[parameters] = result
+        return result
+
+    @classmethod
+    def color(cls, spec):
+        """QColor for a palette index or (r, g, b) tuple"""
+        qcolor = cls.color_cache.get(spec)
+        if qcolor is None:
+            if isinstance(spec, tuple):
+                qcolor = QColor(*[min(255, value) for value in spec])
+            elif spec < 16:
+                qcolor = QColor(ANSI_PALETTE[spec])
+            elif spec < 232:
+                # 6x6x6 color cube
+                spec -= 16
+                levels = [0 if level == 0 else 55 + level * 40 for level in (spec // 36, spec // 6 % 6, spec % 6)]
+                qcolor = QColor(*levels)
+            else:
+                gray = 8 + (min(spec, 255) - 232) * 10
+                qcolor = QColor(gray, gray, gray)
+            cls.color_cache[spec] = qcolor
+        return qcolor
+
+    @classmethod
+    def char_format(cls, style):
+        """Shared QTextCharFormat for a style, one per distinct style rather than per character"""
+        text_format = cls.format_cache.get(style)
+        if text_format is None:
+            text_format = QTextCharFormat()
+            if style is not None:
+                fg, bg, bold, italic, underline, inverse = style
+                if inverse:
+                    fg, bg = (bg if bg is not None else 0), (fg if fg is not None else 7)
+                if fg is not None:
+                    text_format.setForeground(cls.color(fg))
+                if bg is not None:
+                    text_format.setBackground(cls.color(bg))
+                if bold:
+                    text_format.setFontWeight(QFont.Bold)
+                text_format.setFontItalic(italic)
+                text_format.setFontUnderline(underline)
+            cls.format_cache[style] = text_format
+        return text_format
+
+# Style of stderr text in the Output panel
+ERROR_OUTPUT_STYLE = ((255, 0, 0), None, False, False, False, False)
+
+# Escape sequences handled by the terminal emulation layer: CSI parameters and final byte, OSC body,
+# or another escape (all groups None). The pattern starts with ESC so split() skips plain text quickly
+TERMINAL_SEQUENCE_PATTERN = re.compile(
+    r'\x1b(?:\[([0-9;:?<=>]*)[ -/]*([@-~])|\]([^\x07\x1b]*)(?:\x07|\x1b\\)|[()#%].|[^\[\]()#%]|)', re.S)
+# Control characters other than newline, which is handled together with the text around it
+TERMINAL_CONTROLS = "\r\b\t\x07\x00"
+TERMINAL_CONTROL_PATTERN = re.compile(f"[{TERMINAL_CONTROLS}]")
+
+# Bash startup file for terminal sessions: keeps the user's bashrc, reports the cwd with OSC 7
+TERMINAL_BASH_RC = r"""
+[ -f ~/.bashrc ] && . ~/.bashrc
+PS1='${PWD}>'
+PROMPT_COMMAND='printf "\033]7;file://%s%s\007" "$HOSTNAME" "$PWD"'
+"""
+
+class TerminalSession(QObject):
+    """
+    One long-lived shell: bash on a pseudo terminal on POSIX, a persistent cmd.exe elsewhere
+    """
+    output_received = pyqtSignal(str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, directory=None, parent=None):
+        super().__init__(parent)
+        self.directory = directory if directory and os.path.isdir(directory) else None
+        self.pid = None
+        self.master_fd = None
+        self.notifier = None
+        self.process = None
+        self.rc_path = None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def start(self, rows=24, columns=80):
+        if sys.platform == "win32":
+            self.start_cmd()
+        else:
+            self.start_pty(rows, columns)
+
+    def start_pty(self, rows, columns):
+        import pty
+        import tempfile
+        rc_fd, self.rc_path = tempfile.mkstemp(prefix='nucleoide-bashrc-')
+        with os.fdopen(rc_fd, 'w') as f:
+            f.write(TERMINAL_BASH_RC)
+        env = dict(os.environ, TERM="xterm", PAGER="cat", GIT_PAGER="cat")
+        pid, master_fd = pty.fork()
+        if pid == 0:
+            # Child: tty echo stays on, submitted lines come back through it and programs reading a
+            # password turn it off, which is how the widget knows not to show or record that input
+            try:
+                if self.directory:
+                    os.chdir(self.directory)
+                os.execvpe("bash", ["bash", "--rcfile", self.rc_path, "--noediting", "-i"], env)
+            finally:
+                os._exit(127)
+        self.pid = pid
+        self.master_fd = master_fd
+        self.resize(rows, columns)
+        self.notifier = QSocketNotifier(master_fd, QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.read_pty)
+
+    def start_cmd(self):
+        self.process = QProcess(self)
+        self.process.setProcessChannelMode(QProcess.MergedChannels)
+        if self.directory:
+            self.process.setWorkingDirectory(self.directory)
+        self.process.readyReadStandardOutput.connect(
+            lambda: self.output_received.emit(self.decoder.decode(self.process.readAllStandardOutput().data())))
+        self.process.finished.connect(lambda code, status: self.finished.emit(code))
+        # The prompt reports the cwd with OSC 7 before showing the usual "path>"
+        self.process.start("cmd.exe", ["/Q", "/K", "prompt $E]7;$P$E\\$P$G"])
+
+    def read_pty(self):
+        try:
+            data = os.read(self.master_fd, 65536)
+        except OSError:
+            data = b""
+        if data:
+            self.output_received.emit(self.decoder.decode(data))
+            return
+        # EOF or EIO: the shell has exited
+        self.notifier.setEnabled(False)
+        exit_code = 0
+        try:
+            _, status = os.waitpid(self.pid, 0)
+            exit_code = os.waitstatus_to_exitcode(status)
+        except ChildProcessError:
+            pass
+        self.pid = None
+        self.close()
+        self.finished.emit(exit_code)
+
+    def write(self, text):
+        """Send input to the shell"""
+        data = text.encode('utf-8')
+        if self.master_fd is not None:
+            try:
+                os.write(self.master_fd, data)
+            except OSError:
+                pass
+        elif self.process is not None:
+            self.process.write(data.replace(b"\n", b"\r\n"))
+
+    def tty_echo(self):
+        """Whether the pty echoes what is written to it, None for cmd.exe where the widget echoes input"""
+        if self.master_fd is None:
+            return None
+        import termios
+        try:
+            return bool(termios.tcgetattr(self.master_fd)[3] & termios.ECHO)
+        except termios.error:
+            return True
+
+    def interrupt(self):
+        """Ctrl+C: the pty turns ^C into SIGINT for the foreground job"""
+        if self.master_fd is not None:
+            self.write("\x03")
+        elif self.process is not None:
+            # cmd.exe over pipes has no console to signal, restart the shell instead
+            self.process.kill()
+
+    def send_eof(self):
+        if self.master_fd is not None:
+            self.write("\x04")
+        elif self.process is not None:
+            self.process.closeWriteChannel()
+
+    def resize(self, rows, columns):
+        """Tell programs in the session about the visible size"""
+        if self.master_fd is None:
+            return
+        import fcntl
+        import struct
+        import termios
+        try:
+            fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, columns, 0, 0))
+        except OSError:
+            pass
+
+    def is_running(self):
+        if self.process is not None:
+            return self.process.state() != QProcess.NotRunning
+        return self.pid is not None
+
+    def close(self):
+        """Stop the shell and release the pty"""
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+            self.notifier.deleteLater()
+            self.notifier = None
+        if self.master_fd is not None:
+            os.close(self.master_fd)
+            self.master_fd = None
+        if self.pid is not None:
+            import signal
+            try:
+                os.kill(self.pid, signal.SIGHUP)
+                # Give the shell a moment to exit on hangup before killing it
+                for _ in range(50):
+                    if os.waitpid(self.pid, os.WNOHANG)[0]:
+                        break
+                    time.sleep(0.01)
+                else:
+                    os.kill(self.pid, signal.SIGKILL)
+                    os.waitpid(self.pid, 0)
+            except OSError:
+                pass
+            self.pid = None
+        if self.process is not None:
+            self.process.finished.disconnect()
+            self.process.kill()
+            self.process.waitForFinished(1000)
+            self.process = None
+        if self.rc_path and os.path.exists(self.rc_path):
+            os.unlink(self.rc_path)
+            self.rc_path = None
+
+class CommandPromptEmulator(QAbstractScrollArea):
     """
-    Widget that emulates the Windows Command Prompt functionality
+    Terminal widget running a persistent shell session with local line editing
     """
     command_executed = pyqtSignal(str)
-    
-    def __init__(self, parent=None, settings=None):
+    directory_changed = pyqtSignal(str)
+
+    # Pixels between the border and the text
+    MARGIN = 6
+    # Default number of scrollback lines kept in memory
+    DEFAULT_SCROLLBACK = 10000
+    # Shell exits within QUICK_EXIT_SECONDS of each other after which no new session is started
+    MAX_QUICK_EXITS = 5
+    QUICK_EXIT_SECONDS = 10
+
+    def __init__(self, parent=None, settings=None, directory=None, history=None):
         super().__init__(parent)
         self.settings = settings
-        
+
         # Set appearance to match CMD
         self.setFont(QFont("Consolas", 10))
         self.setStyleSheet("background-color: #000000; color: #FFFFFF;")
-        
-        # Initialize command process
-        self.process = QProcess(self)
-        self.process.setProcessChannelMode(QProcess.SeparateChannels)
-        self.process.readyReadStandardOutput.connect(self.handle_stdout)
-        self.process.readyReadStandardError.connect(self.handle_stderr)
-        self.process.finished.connect(self.handle_process_finished)
-        
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+
+        # Scrollback lines, only the visible ones are painted
+        scrollback = self.settings.get('terminalScrollback', self.DEFAULT_SCROLLBACK) if self.settings else self.DEFAULT_SCROLLBACK
+        self.buffer = TerminalLineBuffer(scrollback)
+        self.buffer.on_line_finished = self.cache_line
+        # Persistent scrollback, finished lines are collected and appended to it in one write
+        self.cache = None
+        self.finished_lines = []
+        # Loader for the previous session's lines, run when the terminal is first shown
+        self.pending_restore = None
+        self.max_columns = 0
+        self.follow_output = True
+        self.painted_dropped = 0
+        # Set when output arrived while hidden, the view is refreshed when shown again
+        self.needs_refresh = False
+
+        # Repaints are coalesced so a burst of output costs one paint per frame
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(16)
+        self.update_timer.timeout.connect(self.flush_updates)
+        self.verticalScrollBar().valueChanged.connect(self.scroll_position_changed)
+
+        # Shell session, started once a folder is open. Exit times of recent sessions, a shell that
+        # keeps exiting right away is not restarted forever
+        self.session = None
+        self.session_exits = deque(maxlen=self.MAX_QUICK_EXITS)
+
+        # Emulation state: cursor column on the last line (None = end of line), a pending escape sequence
+        # and the current SGR style
+        self.cursor_column = None
+        self.escape_sequence = None
+        self.current_style = None
+        self.style_fonts = {}
+
         # Get custom interpreter paths
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.python_interpreter = os.path.join(base_dir, 'interpretor', 'python', 'python.exe')
         self.perl_interpreter = os.path.join(base_dir, 'interpretor', 'perl', 'perl', 'bin', 'perl.exe')
-        
-        # Flag to track if a process is running and waiting for input
-        self.process_running = False
-        self.waiting_for_input = False
-        
-        # Text selection tracking
+
+        # Text selection as (absolute line, column) pairs, absolute lines survive scrollback trimming
+        self.selection_anchor = None
+        self.selection_end = None
         self.selecting_text = False
-        
-        # Command history
-        self.command_history = []
-        self.history_index = -1
-        
-        # Current command being typed
-        self.current_command = ""
+
+        # Command history, persisted and shared between sessions when a store is given
+        self.history = history
+        self.command_history = history.recent() if history is not None else []
+        self.history_index = len(self.command_history)
+        # Ctrl+R search state: query, candidate stack per query length, match index, scope
+        self.search = None
+
+        # Current command being typed, drawn after the last line
         self.current_input = ""
-        
+        self.input_cursor = 0
+        self.input_active = False
+
         # Current working directory
-        self.current_directory = self.settings.get('openMainFolder', '') if self.settings else ''
-        
-        # To keep track of the current command line's position
-        self.command_line_position = 0
-        
-        # Set up keyboard shortcuts
-        self.setup_shortcuts()
-        
+        if directory is None:
+            directory = self.settings.get('openMainFolder', '') if self.settings else ''
+        self.current_directory = directory
+
         # Start the command prompt
         self.initialize_command_prompt()
-        
-    def setup_shortcuts(self):
-        """Set up keyboard shortcuts for copy and paste"""
-        # We'll handle copy in the keyPressEvent method to preserve selection
-        # Copy shortcut
-        self.copy_shortcut = QShortcut(QKeySequence.Copy, self)
-        self.copy_shortcut.activated.connect(self.copy_selected_text)
-        
-        # Paste shortcut
-        self.paste_shortcut = QShortcut(QKeySequence.Paste, self)
-        self.paste_shortcut.activated.connect(self.handle_paste)
-        
+
+    # Buffer
+
+    def write(self, text, style=None):
+        """Stream text into the buffer, newlines start new lines"""
+        if not text:
+            return
+        self.put_lines(text.replace("\r\n", "\n"), style)
+        self.schedule_update()
+
+    def put_lines(self, text, style=None):
+        """Write text at the cursor column, each newline starts a new line"""
+        lines = text.split("\n")
+        line = self.buffer.last()
+        if lines[0]:
+            if self.cursor_column is not None:
+                self.put_text(lines[0], style)
+            elif line and line[-1][1] == style:
+                line[-1][0] += lines[0]
+            else:
+                line.append([lines[0], style])
+        if len(lines) == 1:
+            return
+        # The lines after the first hold just their own text
+        self.max_columns = max(self.max_columns, len(TerminalLineBuffer.line_text(line)), max(map(len, lines)))
+        self.cursor_column = None
+        append_line = self.buffer.append_line
+        for part in lines[1:]:
+            line = append_line()
+            if part:
+                line.append([part, style])
+
+    def append(self, text, style=None):
+        """Add text as a new line, like QTextEdit.append"""
+        if not self.is_empty():
+            self.buffer.append_line()
+        self.write(text, style)
+        self.schedule_update()
+
+    def ensure_line_start(self):
+        """Start a new line unless the last line is empty"""
+        if self.buffer.last():
+            self.buffer.append_line()
+
+    def is_empty(self):
+        return len(self.buffer) == 1 and not self.buffer.last()
+
+    def clear(self):
+        self.buffer.clear()
+        self.cursor_column = None
+        self.painted_dropped = 0
+        self.max_columns = 0
+        self.selection_anchor = self.selection_end = None
+        self.follow_output = True
+        self.schedule_update()
+
+    def setPlainText(self, text):
+        self.clear()
+        self.write(text)
+
+    def toPlainText(self):
+        return "\n".join(TerminalLineBuffer.line_text(self.buffer[i]) for i in range(len(self.buffer)))
+
+    def cache_line(self, line):
+        if self.cache is not None:
+            self.finished_lines.append(TerminalLineBuffer.line_text(line))
+
+    def flush_cache(self):
+        if self.finished_lines:
+            if self.cache is not None:
+                self.cache.write("\n".join(self.finished_lines) + "\n")
+            self.finished_lines = []
+
+    def restore_later(self, load):
+        """Restore scrollback from load() once the terminal is visible"""
+        self.pending_restore = load
+        if self.isVisible():
+            self.restore_scrollback()
+
+    def restore_scrollback(self):
+        """Put the previous session's lines above what the current session printed"""
+        load, self.pending_restore = self.pending_restore, None
+        lines = load()
+        if not lines:
+            return
+        current = [self.buffer[i] for i in range(len(self.buffer))]
+        cursor_column = self.cursor_column
+        # Restored lines are already in the cache
+        self.buffer.on_line_finished = None
+        self.clear()
+        self.write("\n".join(lines))
+        for line in current:
+            self.buffer.append_line().extend(line)
+            self.max_columns = max(self.max_columns, len(TerminalLineBuffer.line_text(line)))
+        self.buffer.on_line_finished = self.cache_line
+        self.cursor_column = cursor_column
+
+    # Rendering
+
+    def line_height(self):
+        return self.fontMetrics().height()
+
+    def char_width(self):
+        return max(1, self.fontMetrics().horizontalAdvance('M'))
+
+    def visible_rows(self):
+        return max(1, (self.viewport().height() - self.MARGIN) // self.line_height())
+
+    def schedule_update(self):
+        self.flush_cache()
+        if not self.isVisible():
+            # Hidden sessions only buffer output
+            self.needs_refresh = True
+            return
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.pending_restore is not None:
+            self.restore_scrollback()
+        if self.needs_refresh:
+            self.flush_updates()
+
+    def flush_updates(self):
+        """Apply buffered changes to the scroll bars and repaint once"""
+        self.needs_refresh = False
+        self.max_columns = max(self.max_columns, len(TerminalLineBuffer.line_text(self.buffer.last())) + len(self.current_input) + 1)
+        vertical = self.verticalScrollBar()
+        newly_dropped = self.buffer.dropped - self.painted_dropped
+        self.painted_dropped = self.buffer.dropped
+        value = vertical.value()
+        follow = self.follow_output
+        vertical.setRange(0, max(0, len(self.buffer) - self.visible_rows()))
+        vertical.setPageStep(self.visible_rows())
+        if follow:
+            vertical.setValue(vertical.maximum())
+        elif newly_dropped:
+            # Keep the same lines in view while old lines are trimmed
+            vertical.setValue(max(0, value - newly_dropped))
+        horizontal = self.horizontalScrollBar()
+        horizontal.setRange(0, max(0, self.max_columns * self.char_width() + 2 * self.MARGIN - self.viewport().width()))
+        horizontal.setPageStep(self.viewport().width())
+        horizontal.setSingleStep(self.char_width())
+        self.viewport().update()
+
+    def scroll_position_changed(self, value):
+        self.follow_output = value >= self.verticalScrollBar().maximum()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.flush_updates()
+        if self.session is not None:
+            columns = max(1, (self.viewport().width() - 2 * self.MARGIN) // self.char_width())
+            self.session.resize(self.visible_rows(), columns)
+
+    def line_display_text(self, index):
+        """Text of a buffer line, including the command being typed on the last line"""
+        text = TerminalLineBuffer.line_text(self.buffer[index])
+        if self.input_active and index == len(self.buffer) - 1:
+            text += self.input_display()[0]
+        return text
+
+    def input_display(self):
+        """Text drawn after the last line and the cursor position in it"""
+        if self.search is None:
+            if self.session is not None and self.session.tty_echo() is False:
+                return "", 0  # Password prompt, what is typed is not shown
+            return self.current_input, self.input_cursor
+        scope = "here" if self.search["cwd_only"] else "all"
+        prefix = f"(history search, {scope})`{self.search['query']}': "
+        match = self.search_match() or ""
+        return prefix + match, len(prefix) - 3
+
+    def selection_range(self):
+        """Ordered ((line, column), (line, column)) selection in absolute lines, or None"""
+        if self.selection_anchor is None or self.selection_end is None or self.selection_anchor == self.selection_end:
+            return None
+        return tuple(sorted((self.selection_anchor, self.selection_end)))
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        background = palette.color(QPalette.Base)
+        foreground = palette.color(QPalette.Text)
+        painter.fillRect(event.rect(), background)
+        painter.setFont(self.font())
+
+        line_height = self.line_height()
+        char_width = self.char_width()
+        ascent = self.fontMetrics().ascent()
+        first = self.verticalScrollBar().value()
+        last = min(len(self.buffer), first + self.visible_rows() + 1)
+        x0 = self.MARGIN - self.horizontalScrollBar().value()
+        selection = self.selection_range()
+        highlight = palette.color(QPalette.Highlight)
+
+        for index in range(first, last):
+            y = self.MARGIN + (index - first) * line_height
+            absolute = self.buffer.dropped + index
+            line = self.buffer[index]
+
+            # Selection background
+            if selection and selection[0][0] <= absolute <= selection[1][0]:
+                start = selection[0][1] if absolute == selection[0][0] else 0
+                end = selection[1][1] if absolute == selection[1][0] else len(self.line_display_text(index)) + 1
+                painter.fillRect(x0 + start * char_width, y, max(0, end - start) * char_width, line_height, highlight)
+
+            column = 0
+            for text, style in line:
+                x = x0 + column * char_width
+                if style is None:
+                    painter.setPen(foreground)
+                    painter.setFont(self.font())
+                else:
+                    fg, bg, bold, italic, underline, inverse = style
+                    pen = AnsiParser.color(fg) if fg is not None else foreground
+                    fill = AnsiParser.color(bg) if bg is not None else None
+                    if inverse:
+                        pen, fill = (fill or background), pen
+                    if fill is not None:
+                        painter.fillRect(x, y, len(text) * char_width, line_height, fill)
+                    painter.setPen(pen)
+                    painter.setFont(self.style_font(bold, italic, underline))
+                painter.drawText(x, y + ascent, text)
+                column += len(text)
+            painter.setFont(self.font())
+
+            # Command being typed and the cursor
+            if self.input_active and index == len(self.buffer) - 1:
+                text, cursor = self.input_display()
+                painter.setPen(foreground)
+                painter.drawText(x0 + column * char_width, y + ascent, text)
+                if self.hasFocus():
+                    cursor_x = x0 + (column + cursor) * char_width
+                    painter.fillRect(cursor_x, y, 2, line_height, foreground)
+
+    def style_font(self, bold, italic, underline):
+        """Font variant for a style, cached per combination"""
+        key = (bold, italic, underline)
+        font = self.style_fonts.get(key)
+        if font is None:
+            font = QFont(self.font())
+            font.setBold(bold)
+            font.setItalic(italic)
+            font.setUnderline(underline)
+            self.style_fonts[key] = font
+        return font
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self.style_fonts = {}
+
+    def position_at(self, point):
+        """(absolute line, column) under a viewport position"""
+        index = self.verticalScrollBar().value() + max(0, point.y() - self.MARGIN) // self.line_height()
+        index = min(index, len(self.buffer) - 1)
+        x = point.x() - self.MARGIN + self.horizontalScrollBar().value()
+        column = max(0, int(round(x / self.char_width())))
+        column = min(column, len(self.line_display_text(index)))
+        return self.buffer.dropped + index, column
+
+    def selected_text(self):
+        selection = self.selection_range()
+        if not selection:
+            return ""
+        (start_line, start_column), (end_line, end_column) = selection
+        lines = []
+        for absolute in range(max(start_line, self.buffer.dropped), end_line + 1):
+            text = self.line_display_text(absolute - self.buffer.dropped)
+            if absolute == end_line:
+                text = text[:end_column]
+            if absolute == start_line:
+                text = text[start_column:]
+            lines.append(text)
+        return "\n".join(lines)
+
+    def focusNextPrevChild(self, next):
+        # Keep Tab inside the terminal
+        return False
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.viewport().update()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.viewport().update()
+
+    # Prompt and input
+
     def copy_selected_text(self):
         """Copy selected text without losing selection"""
-        if self.textCursor().hasSelection():
-            QApplication.clipboard().setText(self.textCursor().selectedText())
-            # Don't clear selection after copying
-    
+        text = self.selected_text()
+        if text:
+            QApplication.clipboard().setText(text)
+
     def handle_paste(self):
-        """Custom paste handler to ensure paste works properly in the terminal"""
-        # Only paste if we're in the editable area or if a process is waiting for input
-        if self.process_running and self.waiting_for_input:
-            # Direct paste for running processes
-            self.paste()
-        else:
-            # For command prompt, ensure cursor is at the right position then paste
-            cursor = self.textCursor()
-            cursor.movePosition(QTextCursor.End)
-            self.setTextCursor(cursor)
-            self.paste()
-        
+        """Paste clipboard text at the input cursor, each full line is submitted like Enter"""
+        if self.settings and not self.settings.get('openMainFolder'):
+            return
+        lines = QApplication.clipboard().text().replace("\r\n", "\n").split("\n")
+        for line in lines[:-1]:
+            self.insert_input(line)
+            self.submit_input()
+        self.insert_input(lines[-1])
+
+    def insert_input(self, text):
+        self.current_input = self.current_input[:self.input_cursor] + text + self.current_input[self.input_cursor:]
+        self.input_cursor += len(text)
+        self.follow_output = True
+        self.schedule_update()
+
+    def replace_command_line(self, new_command):
+        """Replace the current command line with a new command"""
+        self.current_input = new_command
+        self.input_cursor = len(new_command)
+        self.schedule_update()
+
     def initialize_command_prompt(self):
-        """Initialize the command prompt with the welcome message and first prompt"""
-        # Display Windows CMD-like header
-        self.append("Microsoft Windows [Version 10.0.22621.1848]")
-        self.append("(c) Microsoft Corporation. All rights reserved.")
-        self.append("")
-        
+        """Start the shell session, or show how to get started when no folder is open"""
         # Check if no folder is open
         if self.settings and not self.settings.get('openMainFolder'):
             self.append("Welcome to NucleoIDE!")
@@ -533,316 +1662,423 @@ class CommandPromptEmulator(QTextEdit):
             self.append("- Run your code")
             self.append("- Use the terminal in your project directory")
             self.append("")
-            # Don't show prompt if no folder is open
+            # Don't start a shell if no folder is open
             return
-        
+
+        self.start_session()
+
+    def start_session(self):
+        """Start a new shell in the current directory"""
+        self.session = TerminalSession(self.current_directory, self)
+        self.session.output_received.connect(self.feed)
+        self.session.finished.connect(self.session_finished)
+        columns = max(1, (self.viewport().width() - 2 * self.MARGIN) // self.char_width())
+        self.session.start(self.visible_rows(), columns)
+        self.input_active = True
+
+    def close_session(self):
+        if self.session is not None:
+            self.session.finished.disconnect()
+            self.session.close()
+            self.session = None
+        self.input_active = False
+        self.flush_cache()
+
+    def session_finished(self, exit_code):
+        """Restart the shell when it exits (e.g. after `exit`)"""
+        self.session = None
         self.display_prompt()
-        
+        now = time.monotonic()
+        self.session_exits.append(now)
+        if len(self.session_exits) == self.MAX_QUICK_EXITS and now - self.session_exits[0] < self.QUICK_EXIT_SECONDS:
+            # The shell cannot start (e.g. exec fails), stop instead of restarting in a loop
+            self.write(f"[Shell exited with code {exit_code} {self.MAX_QUICK_EXITS} times in a row, not restarting it]")
+            self.buffer.append_line()
+            self.input_active = False
+            self.schedule_update()
+            return
+        self.write(f"[Shell exited with code {exit_code}, starting a new session]")
+        self.buffer.append_line()
+        self.start_session()
+
     def display_prompt(self):
-        """Display the command prompt with current directory"""
-        if not self.current_directory:
-            self.append(">")
-        else:
-            self.append(f"{self.current_directory}>")
-        # Save the position of the current command line
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.command_line_position = cursor.position()
-        self.moveCursor(QTextCursor.End)
-        self.process_running = False
-        self.waiting_for_input = False
-        
-    def handle_stdout(self):
-        """Handle standard output from the process"""
-        data = self.process.readAllStandardOutput().data().decode('utf-8', errors='replace')
-        if data:
-            # Check if the process might be waiting for input
-            if data.rstrip().endswith(':') or data.rstrip().endswith('?'):
-                self.waiting_for_input = True
-                
-            # Only remove trailing whitespace if it's not just whitespace
-            if data.strip():
-                self.append(data.rstrip())
-            else:
-                self.append(data)
-                
-        self.moveCursor(QTextCursor.End)
-        # Update command line position after adding output
-        cursor = self.textCursor()
-        self.command_line_position = cursor.position()
-        
-    def handle_stderr(self):
-        """Handle standard error from the process"""
-        data = self.process.readAllStandardError().data().decode('utf-8', errors='replace')
-        if data:
-            # Use a different color for errors
-            current_format = self.currentCharFormat()
-            error_format = QTextCharFormat()
-            error_format.setForeground(QColor("red"))
-            self.setCurrentCharFormat(error_format)
-            
-            # Only remove trailing whitespace if it's not just whitespace
-            if data.strip():
-                self.append(data.rstrip())
+        """Start a fresh line for the shell's next prompt"""
+        self.ensure_line_start()
+        self.cursor_column = None
+        self.follow_output = True
+        self.schedule_update()
+
+    # Emulation layer
+
+    def feed(self, text):
+        """Interpret shell output: control characters, CSI and OSC sequences"""
+        # The carriage return has no effect before a newline
+        text = text.replace("\r\n", "\n")
+        while text:
+            if self.escape_sequence is not None:
+                text = text[self.consume_escape(text, 0):]
+                continue
+            escape = text.rfind("\x1b")
+            if escape != -1 and TERMINAL_SEQUENCE_PATTERN.match(text, escape).end() == escape + 1:
+                # A sequence cut off by the read (or not one we know) is collected byte by byte, the
+                # escape can also be the first half of the terminator of an OSC sequence
+                osc = text.rfind("\x1b]", 0, escape)
+                if osc != -1 and TERMINAL_SEQUENCE_PATTERN.match(text, osc).end() == osc + 1:
+                    escape = osc
+                self.interpret(text[:escape])
+                self.escape_sequence = ""
+                text = text[escape + 1:]
+                continue
+            self.interpret(text)
+            break
+        self.schedule_update()
+
+    def interpret(self, text):
+        """Apply text made of complete sequences, a lone escape character is dropped"""
+        put = self.put_controls if any(char in text for char in TERMINAL_CONTROLS) else self.put_lines
+        # split() yields text, CSI parameters, CSI final byte, OSC body, text, ...
+        parts = TERMINAL_SEQUENCE_PATTERN.split(text)
+        for index in range(0, len(parts) - 1, 4):
+            if parts[index]:
+                put(parts[index], self.current_style)
+            if parts[index + 2] is not None:
+                self.handle_csi(parts[index + 1], parts[index + 2])
+            elif parts[index + 3] is not None:
+                self.handle_osc(parts[index + 3])
+            # Other escapes have no visible effect
+        if parts[-1]:
+            put(parts[-1], self.current_style)
+
+    def put_controls(self, text, style):
+        """Write text without escape sequences that may contain control characters"""
+        position = 0
+        while True:
+            match = TERMINAL_CONTROL_PATTERN.search(text, position)
+            end = match.start() if match else len(text)
+            if end > position:
+                self.put_lines(text[position:end], style)
+            if not match:
+                return
+            char = text[end]
+            position = end + 1
+            if char == "\r":
+                self.cursor_column = 0
+            elif char == "\b":
+                self.cursor_column = max(0, self.current_column() - 1)
+            elif char == "\t":
+                self.put_text(" " * (8 - self.current_column() % 8), style)
+            # BEL and NUL are ignored
+
+    def consume_escape(self, text, position):
+        """Collect an escape sequence that may be split across reads"""
+        sequence = self.escape_sequence
+        while position < len(text):
+            char = text[position]
+            position += 1
+            sequence += char
+            kind = sequence[0]
+            if kind == "[":
+                if len(sequence) > 1 and "\x40" <= char <= "\x7e":
+                    self.escape_sequence = None
+                    self.handle_csi(sequence[1:-1], char)
+                    return position
+            elif kind == "]":
+                if char == "\x07" or sequence.endswith("\x1b\\"):
+                    self.escape_sequence = None
+                    self.handle_osc(sequence[1:-1] if char == "\x07" else sequence[1:-2])
+                    return position
+            elif kind in "()#%" and len(sequence) < 2:
+                continue
             else:
-                self.append(data)
-            
-            # Restore the original format
-            self.setCurrentCharFormat(current_format)
-        self.moveCursor(QTextCursor.End)
-        # Update command line position after adding error output
-        cursor = self.textCursor()
-        self.command_line_position = cursor.position()
-        
-    def handle_process_finished(self, exit_code, exit_status):
-        """Handle when the process finishes"""
-        self.process_running = False
-        self.waiting_for_input = False
-        
-        if exit_code != 0:
-            self.append(f"Process exited with code {exit_code}")
-        self.display_prompt()
-        
-    def execute_command(self, command):
-        """Execute the given command with custom interpreter handling"""
-        if not command.strip():
-            self.display_prompt()
-            return
-            
-        # If we're waiting for input to a running process
-        if self.process_running and self.waiting_for_input:
-            self.process.write((command + "\n").encode('utf-8'))
-            self.waiting_for_input = False
-            return
-            
-        # Add command to history
-        self.command_history.append(command)
-        self.history_index = len(self.command_history)
-        
-        # Handle pip commands
-        if command.lower().startswith('pip '):
-            self.process.start(self.python_interpreter, ['-m', 'pip'] + command.split()[1:])
-            self.process_running = True
+                # Other two-character escapes (charsets, keypad modes) have no visible effect
+                self.escape_sequence = None
+                return position
+            if len(sequence) > 4096:
+                # Not a sequence we understand, drop it
+                self.escape_sequence = None
+                return position
+        self.escape_sequence = sequence
+        return position
+
+    def handle_csi(self, parameters, command):
+        if parameters.startswith("?"):
+            # Private modes (cursor visibility, bracketed paste...) are not emulated
             return
-            
-        # Handle cpan commands
-        if command.lower().startswith('cpan '):
-            self.process.start(self.perl_interpreter, ['-MCPAN', '-e'] + [' '.join(command.split()[1:])])
-            self.process_running = True
+        if command == "m":
+            self.current_style = AnsiParser.apply_sgr(self.current_style, parameters)
             return
-            
-        # Handle Python file execution
-        if command.lower().endswith('.py'):
-            self.process.start(self.python_interpreter, [command])
-            self.process_running = True
+        numbers = [int(part) if part.isdigit() else 0 for part in parameters.split(";")]
+        first = numbers[0]
+        column = self.current_column()
+        if command == "K":
+            line = self.buffer.last()
+            chars = self.line_chars(line)
+            if first == 0:
+                del chars[column:]
+            elif first == 1:
+                chars[:column + 1] = [(" ", None)] * min(column + 1, len(chars))
+            else:
+                chars = []
+            line[:] = self.chars_to_spans(chars)
+        elif command == "J" and first in (2, 3):
+            # Clear screen: start over with an empty view
+            self.clear()
+        elif command == "C":
+            self.cursor_column = column + max(1, first)
+        elif command == "D":
+            self.cursor_column = max(0, column - max(1, first))
+        elif command == "G":
+            self.cursor_column = max(0, first - 1)
+        elif command in "Hf":
+            # Rows are not addressable in a scrolling buffer, only the column is honoured
+            self.cursor_column = max(0, numbers[1] - 1) if len(numbers) > 1 else 0
+        # Other sequences are ignored
+
+    def handle_osc(self, body):
+        """OSC 7 reports the shell's working directory"""
+        if body.startswith("7;"):
+            url = body[2:]
+            if url.startswith("file://"):
+                # file://host/path, the host part is dropped
+                url = url[len("file://"):]
+                url = url[url.find("/"):] if "/" in url else ""
+            path = unquote(url)
+            if path and path != self.current_directory:
+                self.current_directory = path
+                self.directory_changed.emit(path)
+
+    def current_column(self):
+        if self.cursor_column is not None:
+            return self.cursor_column
+        return len(TerminalLineBuffer.line_text(self.buffer.last()))
+
+    @staticmethod
+    def line_chars(line):
+        return [(char, style) for text, style in line for char in text]
+
+    @staticmethod
+    def chars_to_spans(chars):
+        spans = []
+        for char, style in chars:
+            if spans and spans[-1][1] == style:
+                spans[-1][0] += char
+            else:
+                spans.append([char, style])
+        return spans
+
+    def put_text(self, text, style=None):
+        """Write text at the cursor column, overwriting what is already there"""
+        line = self.buffer.last()
+        column = self.cursor_column
+        if column is None or column == len(TerminalLineBuffer.line_text(line)):
+            self.cursor_column = None
+            if line and line[-1][1] == style:
+                line[-1][0] += text
+            else:
+                line.append([text, style])
             return
-            
-        # Handle Perl file execution
-        if command.lower().endswith('.pl'):
-            self.process.start(self.perl_interpreter, [command])
-            self.process_running = True
+        chars = self.line_chars(line)
+        if column > len(chars):
+            chars.extend([(" ", None)] * (column - len(chars)))
+        chars[column:column + len(text)] = [(char, style) for char in text]
+        line[:] = self.chars_to_spans(chars)
+        column += len(text)
+        self.cursor_column = None if column >= len(chars) else column
+
+    # Input
+
+    def submit_input(self):
+        """Handle Enter: echo the typed line and send it to the shell"""
+        command = self.current_input
+        self.current_input = ""
+        self.input_cursor = 0
+        self.cursor_column = None
+        echo = self.session.tty_echo() if self.session is not None else None
+        if echo is False:
+            # Echo turned off by the program reading, e.g. a password: sent as is, never shown or stored
+            self.session.write(command + "\n")
+            self.schedule_update()
             return
-            
-        # Special handling for WSL command
-        if command.lower() == "wsl" or command.lower().startswith("wsl "):
-            self.append("WSL is not supported in this terminal environment.")
-            self.append("Please use the Windows Command Prompt or PowerShell separately for WSL operations.")
-            self.display_prompt()
+        if echo is None:
+            # No pty to echo the line back
+            self.write(command)
+            self.buffer.append_line()
+        if command.strip():
+            self.command_history.append(command)
+            if self.history is not None:
+                self.history.add(command.strip(), self.current_directory)
+        self.history_index = len(self.command_history)
+        self.execute_command(command)
+
+    # History search
+
+    def start_search(self):
+        """Ctrl+R: incremental fuzzy search over the persisted history"""
+        if self.history is None:
             return
-        
-        # Handle built-in commands
-        if command.lower().startswith("cd ") or command.lower() == "cd":
-            self.change_directory(command[3:].strip() if " " in command else "")
-        elif command.lower() == "cls":
-            self.clear()
-            self.display_prompt()
+        self.search = {"query": "", "stack": [], "index": 0, "cwd_only": True, "original": self.current_input}
+        self.update_search("")
+
+    def update_search(self, query):
+        """Narrow the candidates when the query grows, fall back to the saved set when it shrinks"""
+        search = self.search
+        stack = search["stack"]
+        while stack and not query.startswith(stack[-1][0]):
+            stack.pop()
+        if stack and stack[-1][0] == query:
+            matches = stack[-1][1]
+        else:
+            if stack:
+                base = stack[-1][1]
+            else:
+                base = self.history.candidates(self.current_directory if search["cwd_only"] else None)
+            matches = CommandHistoryStore.fuzzy_filter(base, query)
+            stack.append((query, matches))
+        search["query"] = query
+        search["index"] = 0
+        search["ranked"] = CommandHistoryStore.fuzzy_filter(matches, query, limit=50)
+
+    def search_match(self):
+        ranked = self.search["ranked"]
+        if not ranked:
+            return None
+        return ranked[self.search["index"] % len(ranked)][0]
+
+    def finish_search(self, accept):
+        match = self.search_match() if accept else None
+        original = self.search["original"]
+        self.search = None
+        self.replace_command_line(match if match is not None else original)
+
+    def search_key(self, event):
+        """Keys while searching: type to narrow, Ctrl+R for the next match, Tab to switch scope"""
+        key = event.key()
+        control = event.modifiers() & Qt.ControlModifier
+        search = self.search
+        if control and key == Qt.Key_R:
+            search["index"] += 1
+        elif key == Qt.Key_Tab:
+            search["cwd_only"] = not search["cwd_only"]
+            search["stack"] = []
+            self.update_search(search["query"])
+        elif key == Qt.Key_Backspace:
+            self.update_search(search["query"][:-1])
+        elif key == Qt.Key_Escape or (control and key == Qt.Key_G):
+            self.finish_search(accept=False)
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.finish_search(accept=True)
+            self.submit_input()
+        elif key in (Qt.Key_Left, Qt.Key_Right, Qt.Key_Home, Qt.Key_End):
+            # Accept the match for editing
+            self.finish_search(accept=True)
+        elif event.text() and event.text().isprintable() and not control:
+            self.update_search(search["query"] + event.text())
+        self.schedule_update()
+
+    def execute_command(self, command):
+        """Send a command line to the shell, with custom interpreter handling"""
+        if self.session is None:
             return
-        elif command.lower() == "exit":
+        stripped = command.strip()
+        lowered = stripped.lower()
+
+        if lowered == "cls":
             self.clear()
-            self.display_prompt()
-        else:
-            # Execute external command
-            try:
-                if sys.platform == "win32":
-                    self.process.start("cmd.exe", ["/c", command])
-                else:
-                    self.process.start("/bin/bash", ["-c", command])
-                self.process_running = True
-            except Exception as e:
-                self.append(f"Error executing command: {str(e)}")
-                self.display_prompt()
-                
-    def change_directory(self, new_dir):
-        """Change the current directory (no project root restriction)"""
-        try:
-            # Handle empty cd command (show current directory)
-            if not new_dir:
-                self.append(self.current_directory)
-                self.display_prompt()
-                return
-                
-            # Handle cd to drive letter
-            if len(new_dir) == 2 and new_dir[1] == ':':
-                new_dir += '\\'
-                
-            # Handle parent directory navigation
-            if new_dir == '..':
-                parent_dir = os.path.dirname(self.current_directory)
-                os.chdir(parent_dir)
-                self.current_directory = os.getcwd()
-                self.display_prompt()
-                return
+            self.session.write("\n")
+            return
+
+        # Use the bundled interpreters when they are available
+        if lowered.startswith('pip ') and os.path.exists(self.python_interpreter):
+            command = f'"{self.python_interpreter}" -m pip ' + stripped[4:]
+        elif lowered.startswith('cpan ') and os.path.exists(self.perl_interpreter):
+            command = f'"{self.perl_interpreter}" -MCPAN -e "{stripped[5:]}"'
+        elif lowered.endswith('.py') and " " not in stripped and os.path.exists(self.python_interpreter):
+            command = f'"{self.python_interpreter}" {stripped}'
+        elif lowered.endswith('.pl') and " " not in stripped and os.path.exists(self.perl_interpreter):
+            command = f'"{self.perl_interpreter}" {stripped}'
+
+        self.session.write(command + "\n")
+        self.command_executed.emit(stripped)
+
+    # Mouse and keyboard
 
-            # For other directory changes
-            new_abs_path = os.path.abspath(os.path.join(self.current_directory, new_dir))
-            os.chdir(new_abs_path)
-            self.current_directory = os.getcwd()
-            self.display_prompt()
-        except Exception as e:
-            self.append(f"\nError: The system cannot find the path specified: {new_dir}")
-            self.append("")
-            self.display_prompt()
-        
     def mousePressEvent(self, event):
-        """Handle mouse click events"""
+        """Start a selection, or move the input cursor when clicking on the command"""
         # If no folder is open, don't process mouse events
         if self.settings and not self.settings.get('openMainFolder'):
-                return
-            
-        super().mousePressEvent(event)
-        
-        # Ensure cursor is after the prompt if not selecting text
-        if not self.selecting_text:
-            self.ensure_cursor_at_command_line()
-    
+            return
+        self.setFocus()
+        if event.button() == Qt.LeftButton:
+            position = self.position_at(event.pos())
+            self.selection_anchor = self.selection_end = position
+            self.selecting_text = True
+            prompt_columns = len(TerminalLineBuffer.line_text(self.buffer.last()))
+            if self.input_active and position[0] == self.buffer.dropped + len(self.buffer) - 1 and position[1] >= prompt_columns:
+                self.input_cursor = position[1] - prompt_columns
+            self.viewport().update()
+
     def mouseMoveEvent(self, event):
         """Handle mouse move events for text selection"""
-        if event.buttons() & Qt.LeftButton:
-            # If mouse is being dragged with left button, we're selecting text
-            self.selecting_text = True
-        super().mouseMoveEvent(event)
-    
+        if self.selecting_text and event.buttons() & Qt.LeftButton:
+            self.selection_end = self.position_at(event.pos())
+            self.viewport().update()
+
     def mouseReleaseEvent(self, event):
         """Handle mouse release events"""
-        super().mouseReleaseEvent(event)
-        
-        # If we just finished a selection, keep it; otherwise ensure cursor position
-        if self.selecting_text:
-            # Check if there's actually a selection
-            if not self.textCursor().hasSelection():
-                self.selecting_text = False
-                self.ensure_cursor_at_command_line()
-        else:
-            self.ensure_cursor_at_command_line()
-    
-    def ensure_cursor_at_command_line(self):
-        """Ensures the cursor is positioned at the command input area"""
-        cursor = self.textCursor()
-        cursor_pos = cursor.position()
-        
-        # If cursor is before the command line position, move it to the end
-        if cursor_pos < self.command_line_position:
-            cursor.movePosition(QTextCursor.End)
-            self.setTextCursor(cursor)
-            
+        self.selecting_text = False
+
     def keyPressEvent(self, event):
         """Handle key press events"""
         # If no folder is open, don't process any key events
         if self.settings and not self.settings.get('openMainFolder'):
             return
-            
-        # Handle text selection copy if Ctrl+C is pressed
+
+        # Ctrl+C copies the selection, otherwise it interrupts the running command
         if event.matches(QKeySequence.Copy):
-            if self.textCursor().hasSelection():
-                # Store the current selection
-                cursor = self.textCursor()
-                selected_text = cursor.selectedText()
-                
-                # Copy to clipboard
-                QApplication.clipboard().setText(selected_text)
-                
-                # Restore the selection
-                cursor.setPosition(cursor.selectionStart())
-                cursor.setPosition(cursor.selectionEnd(), QTextCursor.KeepAnchor)
-                self.setTextCursor(cursor)
-                return
-                
-        # Handle keyboard selections (Shift+Arrow keys)
-        if event.modifiers() & Qt.ShiftModifier:
-            if event.key() in (Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down, Qt.Key_Home, Qt.Key_End):
-                # If shift is held with navigation keys, we're selecting text
-                self.selecting_text = True
-                super().keyPressEvent(event)
-                return
-                
-        # Reset selection mode when any key is pressed (unless it's just a modifier key)
-        # Don't reset selection when Ctrl, Shift, Alt, Meta are pressed to allow keyboard shortcuts
-        if event.key() not in (Qt.Key_Control, Qt.Key_Shift, Qt.Key_Alt, Qt.Key_Meta):
-            # Only reset selection mode if we're not using a keyboard shortcut
-            # Don't reset if Ctrl is held (to allow Ctrl+C to work)
-            if not (event.modifiers() & (Qt.ControlModifier | Qt.ShiftModifier)):
-                self.selecting_text = False
-            
-        # If we're in WSL mode or waiting for input, handle differently
-        if self.process_running and self.waiting_for_input:
-            if event.key() == Qt.Key_Return:
-                cursor = self.textCursor()
-                cursor.movePosition(QTextCursor.End)
-                self.setTextCursor(cursor)
-                
-                # Get the current line
-                cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.KeepAnchor)
-                current_line = cursor.selectedText()
-                
-                # Send the line as input to the process
-                self.append("")  # New line
-                self.process.write((current_line + "\n").encode('utf-8'))
-                return
-                
-            # For regular input, just let most keys through
-            super().keyPressEvent(event)
+            if self.search is not None:
+                self.finish_search(accept=False)
+            elif self.selected_text():
+                self.copy_selected_text()
+            elif self.session is not None:
+                self.current_input = ""
+                self.input_cursor = 0
+                self.write("^C")
+                self.session.interrupt()
             return
-            
-        # Normal command line handling
-        # Get current line text
-        cursor = self.textCursor()
-        current_position = cursor.position()
-        
-        # Move to end of document then to start of line to get current line
-        cursor.movePosition(QTextCursor.End)
-        cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.KeepAnchor)
-        current_line = cursor.selectedText()
-        
-        # Calculate prompt and boundaries
-        prompt = f"{self.current_directory}>"
-        prompt_length = len(prompt)
-        
-        # Get the absolute position of the start of the line plus prompt length
-        start_pos = self.document().findBlockByLineNumber(self.textCursor().blockNumber()).position()
-        # More accurate calculation of editable position
-        accurate_editable_start = start_pos + prompt_length
-        
-        if event.key() == Qt.Key_Return:
-            # Execute command on Enter
-            cursor.movePosition(QTextCursor.End)
-            self.setTextCursor(cursor)  # Ensure cursor is at the end
-            
-            # Extract command (text after prompt)
-            if prompt_length < len(current_line):
-                command = current_line[prompt_length:].strip()
-            else:
-                command = ""
-                
-            self.append("")  # New line
-            self.execute_command(command)
-            
-        elif event.key() == Qt.Key_Up:
+        if event.matches(QKeySequence.Paste):
+            self.handle_paste()
+            return
+        if event.matches(QKeySequence.SelectAll):
+            self.selection_anchor = (self.buffer.dropped, 0)
+            self.selection_end = (self.buffer.dropped + len(self.buffer) - 1, len(self.line_display_text(len(self.buffer) - 1)))
+            self.viewport().update()
+            return
+        if event.key() in (Qt.Key_Control, Qt.Key_Shift, Qt.Key_Alt, Qt.Key_Meta):
+            return
+        if not self.input_active:
+            return
+
+        # Typing clears the selection
+        self.selection_anchor = self.selection_end = None
+        key = event.key()
+        control = event.modifiers() & Qt.ControlModifier
+        if self.search is not None:
+            self.search_key(event)
+            return
+        if control and key == Qt.Key_R:
+            self.start_search()
+        elif control and key == Qt.Key_D and not self.current_input:
+            self.session.send_eof()
+        elif control and key == Qt.Key_L:
+            self.clear()
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.submit_input()
+        elif key == Qt.Key_Up:
             # Navigate command history (up)
             if self.history_index > 0:
                 self.history_index -= 1
                 self.replace_command_line(self.command_history[self.history_index])
-                
-        elif event.key() == Qt.Key_Down:
+        elif key == Qt.Key_Down:
             # Navigate command history (down)
             if self.history_index < len(self.command_history) - 1:
                 self.history_index += 1
@@ -850,116 +2086,624 @@ class CommandPromptEmulator(QTextEdit):
             elif self.history_index == len(self.command_history) - 1:
                 self.history_index = len(self.command_history)
                 self.replace_command_line("")
-                
-        elif event.key() == Qt.Key_Tab:
-            # Tab completion (simplified)
-            if prompt_length < len(current_line):
-                command = current_line[prompt_length:].strip()
-                # Here you would implement tab completion logic
-            
-        elif event.key() == Qt.Key_Backspace:
-            # Only prevent backspacing if we're exactly at the prompt boundary
-            # Get the current cursor to accurately check if we're at the first character position
-            current_cursor = self.textCursor()
-            current_cursor_pos = current_cursor.position()
-            
-            # Get the current line text again to ensure we have up-to-date info
-            cursor_for_line = self.textCursor()
-            cursor_for_line.movePosition(QTextCursor.End)
-            cursor_for_line.movePosition(QTextCursor.StartOfLine, QTextCursor.KeepAnchor)
-            current_line_text = cursor_for_line.selectedText()
-            
-            # Check if the current text after prompt has only one character
-            # and if we're trying to delete that character
-            command_text = current_line_text[prompt_length:] if len(current_line_text) > prompt_length else ""
-            
-            # Only block backspace if we're at the boundary between prompt and command
-            if current_cursor_pos <= accurate_editable_start:
-                return
-                
-            super().keyPressEvent(event)
-            
-        elif event.key() == Qt.Key_Left:
-            # Prevent moving cursor into the prompt
-            # Get accurate cursor position
-            cursor_pos = self.textCursor().position()
-            
-            # Only block if we'd move into the prompt area
-            if cursor_pos <= accurate_editable_start:
-                return
-            super().keyPressEvent(event)
-            
-        elif event.key() == Qt.Key_Home:
-            # Move to start of command, not start of line
-            try:
-                cursor = self.textCursor()
-                # Use movePosition instead of setPosition to avoid out-of-range errors
-                cursor.movePosition(QTextCursor.StartOfLine)
-                for _ in range(prompt_length):
-                    cursor.movePosition(QTextCursor.Right)
-                self.setTextCursor(cursor)
-            except Exception as e:
-                print(f"Error in Home key handling: {e}")
+        elif key == Qt.Key_Backspace:
+            if self.input_cursor > 0:
+                self.current_input = self.current_input[:self.input_cursor - 1] + self.current_input[self.input_cursor:]
+                self.input_cursor -= 1
+        elif key == Qt.Key_Delete:
+            self.current_input = self.current_input[:self.input_cursor] + self.current_input[self.input_cursor + 1:]
+        elif key == Qt.Key_Left:
+            self.input_cursor = max(0, self.input_cursor - 1)
+        elif key == Qt.Key_Right:
+            self.input_cursor = min(len(self.current_input), self.input_cursor + 1)
+        elif key == Qt.Key_Home:
+            self.input_cursor = 0
+        elif key == Qt.Key_End:
+            self.input_cursor = len(self.current_input)
+        elif key == Qt.Key_Tab:
+            # Tab completion is not implemented yet
+            pass
+        elif event.text() and event.text().isprintable():
+            self.insert_input(event.text())
             return
-            
-        elif current_position < accurate_editable_start:
-            # If cursor is in prompt area, move it to the editable area
-            try:
-                cursor = self.textCursor()
-                # Use movePosition instead of setPosition to avoid out-of-range errors
-                cursor.movePosition(QTextCursor.StartOfLine)
-                for _ in range(prompt_length):
-                    cursor.movePosition(QTextCursor.Right)
-                self.setTextCursor(cursor)
-            except Exception as e:
-                print(f"Error in cursor positioning: {e}")
-                
-            # If it's a printable character, insert it
-            if event.text() and event.text().isprintable():
-                super().keyPressEvent(event)
-        else:
-            # Allow normal editing for other keys
-            super().keyPressEvent(event)
-            
+        self.follow_output = True
+        self.schedule_update()
+
     def contextMenuEvent(self, event):
-        """Handle right-click events"""
-        # If no folder is open, don't process right-click
-        if self.settings and not self.settings.get('openMainFolder'):
-            return
-            
-        # Get clipboard content
-        clipboard = QApplication.clipboard()
-        text_to_paste = clipboard.text()
-        
-        if text_to_paste:
-            # Ensure cursor is at the right position
-            cursor = self.textCursor()
-            cursor.movePosition(QTextCursor.End)
-            self.setTextCursor(cursor)
-            
-            # Insert the text
-            self.insertPlainText(text_to_paste)
-            
-        # Prevent the default context menu
+        """Right click pastes the clipboard, like the Windows console"""
+        self.handle_paste()
         event.accept()
-        
+
     def clear_and_reset(self):
-        """Clear the terminal and reset the prompt"""
+        """Clear the terminal and restart the shell in the current directory"""
+        self.close_session()
         self.clear()
+        self.current_input = ""
+        self.input_cursor = 0
         self.initialize_command_prompt()
-            
-    def replace_command_line(self, new_command):
-        """Replace the current command line with a new command"""
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.KeepAnchor)
-        prompt = f"{self.current_directory}>"
-        cursor.removeSelectedText()
-        cursor.insertText(prompt + new_command)
-        cursor.movePosition(QTextCursor.End)
-        self.setTextCursor(cursor)
+
+class TerminalTabs(QTabWidget):
+    """
+    Terminal sessions as tabs, each with its own shell, working directory and scrollback
+    """
+    SESSION_PATTERN = re.compile(r'^session-(\d+)$')
+
+    def __init__(self, parent=None, settings=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.history = CommandHistoryStore(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'command_history.db'))
+        self.history.preload()
+        # Directory with a scrollback cache per session, set once it has been opened
+        self.cache_directory = None
+        self.next_session = 1
+        self.setDocumentMode(True)
+        self.setTabsClosable(True)
+        self.setMovable(True)
+        self.tabCloseRequested.connect(self.close_terminal)
+
+        new_button = QToolButton()
+        new_button.setText("+")
+        new_button.setToolTip("New Terminal")
+        new_button.setAutoRaise(True)
+        new_button.clicked.connect(lambda: self.new_terminal())
+        self.setCornerWidget(new_button, Qt.TopRightCorner)
+
+        self.new_terminal()
+
+    def current_terminal(self):
+        return self.currentWidget()
+
+    def terminals(self):
+        return [self.widget(index) for index in range(self.count())]
+
+    @property
+    def current_directory(self):
+        terminal = self.current_terminal()
+        return terminal.current_directory if terminal else ''
+
+    def new_terminal(self, directory=None):
+        """Open a new session, in the current session's directory by default"""
+        if directory is None:
+            directory = self.current_directory or (self.settings.get('openMainFolder', '') if self.settings else '')
+        terminal = CommandPromptEmulator(None, self.settings, directory, self.history)
+        terminal.cache = self.session_cache()
+        terminal.directory_changed.connect(lambda path, terminal=terminal: self.update_title(terminal))
+        index = self.addTab(terminal, "")
+        self.update_title(terminal)
+        self.setCurrentIndex(index)
+        terminal.setFocus()
+        return terminal
+
+    def session_cache(self):
+        """Scrollback cache for a new session, None until the cache directory is set"""
+        if self.cache_directory is None:
+            return None
+        cache = TerminalCache(os.path.join(self.cache_directory, f"session-{self.next_session}"))
+        self.next_session += 1
+        return cache
+
+    def set_cache_directory(self, directory, line_count):
+        """Reopen a tab for every session saved in directory, each restored from its own scrollback"""
+        numbers = []
+        try:
+            for name in os.listdir(directory):
+                match = self.SESSION_PATTERN.match(name)
+                if match:
+                    numbers.append(int(match.group(1)))
+        except OSError:
+            pass
+        numbers.sort()
+        # Tabs are added before the directory is set so they do not take new session numbers
+        while self.count() < len(numbers):
+            self.new_terminal()
+        self.cache_directory = directory
+        self.next_session = numbers[-1] + 1 if numbers else 1
+        for index, terminal in enumerate(self.terminals()):
+            if index < len(numbers):
+                terminal.cache = TerminalCache(os.path.join(directory, f"session-{numbers[index]}"))
+                terminal.restore_later(lambda cache=terminal.cache: cache.tail(line_count))
+            else:
+                terminal.cache = self.session_cache()
+        self.setCurrentIndex(0)
+
+    def update_title(self, terminal):
+        index = self.indexOf(terminal)
+        if index != -1:
+            name = os.path.basename(terminal.current_directory.rstrip("/\\")) or terminal.current_directory or "Terminal"
+            self.setTabText(index, name)
+            self.setTabToolTip(index, terminal.current_directory)
+
+    def close_terminal(self, index):
+        """Close a session and its shell, the last tab is replaced by a fresh session"""
+        terminal = self.widget(index)
+        terminal.close_session()
+        if terminal.cache is not None:
+            terminal.cache.discard()
+        self.removeTab(index)
+        terminal.deleteLater()
+        if self.count() == 0:
+            self.new_terminal()
+
+    def reset_all(self, directory):
+        """Restart with a single session in a newly opened folder, it continues the current session's scrollback"""
+        current = self.current_terminal()
+        cache = current.cache if current is not None else None
+        for terminal in self.terminals():
+            terminal.close_session()
+            if terminal.cache is not None and terminal.cache is not cache:
+                terminal.cache.discard()
+            terminal.deleteLater()
+        self.clear()
+        terminal = self.new_terminal(directory)
+        if cache is not None:
+            terminal.cache = cache
+
+    def close_all(self):
+        for terminal in self.terminals():
+            terminal.close_session()
+            if terminal.cache is not None:
+                terminal.cache.close()
+        self.history.close()
+
+class RunResourceMonitor(QObject):
+    """
+    Samples wall time, CPU time, peak RSS and I/O counters of a running child process
+    """
+    def __init__(self, parent=None, interval=100):
+        super().__init__(parent)
+        self.pid = None
+        self.start_time = None
+        self.rusage_start = None
+        self.stats = {}
+
+        # /proc is only sampled while the child is alive, so keep the interval short
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.sample)
+
+        try:
+            self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        except (AttributeError, ValueError, OSError):
+            self.clock_ticks = None
+
+    def start(self, pid):
+        """Start monitoring the process with the given pid"""
+        self.pid = pid
+        self.start_time = time.perf_counter()
+        self.stats = {
+            "user_cpu": None,
+            "sys_cpu": None,
+            "peak_rss": None,
+            "read_bytes": None,
+            "write_bytes": None
+        }
+        # Children usage is only reported once a child has been reaped, so diff it at the end
+        self.rusage_start = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+        self.sample()
+        self.timer.start()
+
+    def sample(self):
+        """Read the current counters of the child from /proc (Linux only)"""
+        if not self.pid or not os.path.isdir(f"/proc/{self.pid}"):
+            return
+        try:
+            with open(f"/proc/{self.pid}/stat", 'r') as f:
+                # The command name may contain spaces, so split after the closing parenthesis
+                fields = f.read().rsplit(')', 1)[1].split()
+            if self.clock_ticks:
+                self.stats["user_cpu"] = int(fields[11]) / self.clock_ticks
+                self.stats["sys_cpu"] = int(fields[12]) / self.clock_ticks
+            with open(f"/proc/{self.pid}/status", 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        peak_rss = int(line.split()[1]) * 1024
+                        self.stats["peak_rss"] = max(peak_rss, self.stats["peak_rss"] or 0)
+                        break
+        except (OSError, IndexError, ValueError):
+            return
+        try:
+            with open(f"/proc/{self.pid}/io", 'r') as f:
+                for line in f:
+                    key, _, value = line.partition(':')
+                    if key in ("read_bytes", "write_bytes"):
+                        self.stats[key] = int(value)
+        except (OSError, ValueError):
+            # /proc/<pid>/io can be restricted by ptrace permissions
+            pass
+
+    def finish(self):
+        """Stop monitoring and return the collected statistics"""
+        self.timer.stop()
+        if self.start_time is None:
+            return None
+        self.sample()
+        stats = dict(self.stats)
+        stats["wall_time"] = time.perf_counter() - self.start_time
+
+        # The exact CPU time of the reaped child (and anything it waited for) comes from rusage
+        if self.rusage_start is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            stats["user_cpu"] = usage.ru_utime - self.rusage_start.ru_utime
+            stats["sys_cpu"] = usage.ru_stime - self.rusage_start.ru_stime
+            if stats["peak_rss"] is None and usage.ru_maxrss > self.rusage_start.ru_maxrss:
+                # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+                scale = 1 if sys.platform == 'darwin' else 1024
+                stats["peak_rss"] = usage.ru_maxrss * scale
+
+        self.pid = None
+        self.start_time = None
+        return stats
+
+    @staticmethod
+    def format_stats(stats):
+        """Format collected statistics as a single footer line"""
+        def seconds(value):
+            return "n/a" if value is None else f"{value:.3f}s"
+
+        def size(value):
+            return "n/a" if value is None else format_byte_size(value)
+
+        return (f"[Stats] Wall {seconds(stats.get('wall_time'))} | "
+                f"CPU user {seconds(stats.get('user_cpu'))} sys {seconds(stats.get('sys_cpu'))} | "
+                f"Peak RSS {size(stats.get('peak_rss'))} | "
+                f"I/O read {size(stats.get('read_bytes'))} write {size(stats.get('write_bytes'))}")
+
+class RunHistoryStore:
+    """
+    Append-only run history with one JSON-lines file per executed script
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def history_path(self, file_path):
+        """Get the history file used for the given script"""
+        normalized = os.path.normcase(os.path.abspath(file_path))
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{os.path.basename(file_path)}-{digest}.jsonl")
+
+    def append(self, file_path, record):
+        """Append a run record to the script's history"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.history_path(file_path), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Error writing run history: {e}")
+
+    def recent(self, file_path, limit=20):
+        """Return up to `limit` most recent run records of the script, oldest first"""
+        path = self.history_path(file_path)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'rb') as f:
+                # Only read the tail of the file, records are small and appended in order
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - limit * 512))
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines[-limit:]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # The first line may be cut in half by the seek
+                continue
+        return records
+
+    @staticmethod
+    def compare_with_history(stats, previous):
+        """Describe how the wall time of a run compares with previous runs"""
+        times = [r["wall_time"] for r in previous if r.get("wall_time") and r.get("exit_code") == 0]
+        if not times or not stats.get("wall_time"):
+            return None
+        average = sum(times) / len(times)
+        change = (stats["wall_time"] - average) / average * 100
+        return f"[History] Wall time {change:+.0f}% vs average of last {len(times)} successful runs ({average:.3f}s)"
+
+
+class OutputLogIndex:
+    """
+    Line offset index over the output cache file, extended as output is appended
+    """
+    def __init__(self, path):
+        self.path = path
+        # Byte offset of the start of every line, line 0 starts at 0
+        self.line_offsets = array('Q', [0])
+        # (byte offset of the banner line, label) of every run, oldest first
+        self.runs = []
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.ready = self.size == 0
+        # Offsets and runs appended while the initial index is being built
+        self.pending_offsets = array('Q')
+        self.pending_runs = []
+
+    def append(self, data):
+        """Record the line starts of bytes that were just appended to the file"""
+        offsets = self.line_offsets if self.ready else self.pending_offsets
+        position = data.find(b"\n")
+        while position != -1:
+            offsets.append(self.size + position + 1)
+            position = data.find(b"\n", position + 1)
+        self.size += len(data)
+
+    def last_line_start(self):
+        if not self.ready and self.pending_offsets:
+            return self.pending_offsets[-1]
+        return self.line_offsets[-1]
+
+    def start_run(self, label):
+        """Mark the current last line as the banner of a new run"""
+        run = (self.last_line_start(), label)
+        (self.runs if self.ready else self.pending_runs).append(run)
+
+    def merge(self, offsets, runs):
+        """Install the offsets built by OutputIndexBuilder for the existing file"""
+        offsets.extend(self.pending_offsets)
+        self.line_offsets = offsets
+        self.runs = runs + self.pending_runs
+        self.pending_offsets = array('Q')
+        self.pending_runs = []
+        self.ready = True
+
+    def line_count(self):
+        return len(self.line_offsets)
+
+    def run_range(self, run_index):
+        """Byte range [start, end) of a run's output"""
+        start = self.runs[run_index][0]
+        end = self.runs[run_index + 1][0] if run_index + 1 < len(self.runs) else self.size
+        return start, end
+
+    def snapshot(self):
+        """Copy of the offsets and size, safe to hand to a search thread"""
+        return array('Q', self.line_offsets), self.size
+
+
+class RunLog:
+    """
+    Append-only JSON-lines log of runs, each record points at the run's bytes in the output cache
+    """
+    READ_BLOCK = 64 * 1024
+
+    def __init__(self, path, output_path):
+        self.path = path
+        self.output_path = output_path
+        # All records by id, only loaded when the full history is needed
+        self.records = None
+        tail = self.recent(1)
+        self.next_id = tail[-1]["id"] + 1 if tail else 1
+
+    def append(self, record):
+        """Append a finished run and assign it an id"""
+        record = dict(record, id=self.next_id)
+        self.next_id += 1
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Error writing run log: {e}")
+            return None
+        if self.records is not None:
+            self.records[record["id"]] = record
+        return record
+
+    def recent(self, limit=20):
+        """Return up to `limit` most recent runs, oldest first, reading the log backwards from the end"""
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                position = f.seek(0, os.SEEK_END)
+                # Start of the line cut by the previous block, completed by the next one
+                tail = b""
+                while position > 0 and len(records) < limit:
+                    start = max(0, position - self.READ_BLOCK)
+                    f.seek(start)
+                    lines = (f.read(position - start) + tail).split(b"\n")
+                    position = start
+                    tail = lines.pop(0) if position > 0 else b""
+                    for line in reversed(lines):
+                        if not line.strip():
+                            continue
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            # A line left half-written by a crash
+                            continue
+        except OSError:
+            return []
+        records = records[:limit]
+        records.reverse()
+        return records
+
+    def all(self):
+        """All runs by id"""
+        if self.records is None:
+            self.records = {}
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        self.records[record["id"]] = record
+            except OSError:
+                pass
+        return self.records
+
+    def get(self, run_id):
+        return self.all().get(run_id)
+
+    def read_output(self, record):
+        """Read a run's output straight from its byte range in the output cache"""
+        try:
+            with open(self.output_path, 'rb') as f:
+                f.seek(record["offset"])
+                data = f.read(record["length"])
+        except OSError:
+            return ""
+        return data.decode('utf-8', errors='replace').lstrip("\n")
+
+
+# Marker printed by a warm worker once its preloads are imported
+WARM_READY_MARKER = b"\0NUCLEOIDE-READY\n"
+
+# Python warm worker: preload modules, then wait for the script path on stdin
+PYTHON_WARM_WORKER = r"""
+import sys, os, runpy
+if sys.path and sys.path[0] == '':
+    sys.path.pop(0)
+for _name in sys.argv[1:]:
+    try:
+        __import__(_name)
+    except Exception:
+        pass
+sys.stdout.write("\0NUCLEOIDE-READY\n")
+sys.stdout.flush()
+_script = sys.stdin.readline().rstrip("\r\n")
+sys.argv = [_script]
+sys.path.insert(0, os.path.dirname(_script))
+runpy.run_path(_script, run_name="__main__")
+"""
+
+# Perl warm worker: preload modules, then wait for the script path on stdin
+PERL_WARM_WORKER = r"""
+for my $m (@ARGV) { eval "require $m"; }
+@ARGV = ();
+$| = 1;
+print "\0NUCLEOIDE-READY\n";
+my $script = <STDIN>;
+$script =~ s/[\r\n]+$//;
+$0 = $script;
+package main;
+do $script;
+if ($@) { print STDERR $@; exit 255; }
+"""
+
+
+class WarmInterpreterPool(QObject):
+    """
+    Keeps one pre-started interpreter per language with its preload modules already imported
+    """
+    DEFAULT_PRELOAD = {
+        "python": ["numpy", "pandas", "Bio"],
+        "perl": ["strict", "warnings", "List::Util", "Data::Dumper"],
+    }
+
+    def __init__(self, parent=None, settings=None):
+        super().__init__(parent)
+        self.settings = settings if settings is not None else {}
+        # language -> {"process", "interpreter", "spawned", "ready", "startup_ms", "buffer"}
+        self.workers = {}
+
+    def config(self):
+        return self.settings.get("warmPool", {})
+
+    def enabled(self):
+        return bool(self.config().get("enabled", False))
+
+    def preload(self, language):
+        return self.config().get("preload", {}).get(language, self.DEFAULT_PRELOAD.get(language, []))
+
+    def warm_up(self, language, interpreter):
+        """Start a worker for the language unless a matching one is already alive"""
+        if not self.enabled():
+            return
+        worker = self.workers.get(language)
+        if worker is not None:
+            if worker["interpreter"] == interpreter and worker["process"].state() != QProcess.NotRunning:
+                return
+            self.discard(language)
+
+        process = QProcess(self.parent())
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        if language == "perl":
+            args = ["-e", PERL_WARM_WORKER] + self.preload(language)
+        else:
+            args = ["-u", "-c", PYTHON_WARM_WORKER] + self.preload(language)
+        worker = {"process": process, "interpreter": interpreter, "spawned": time.perf_counter(),
+                  "ready": False, "startup_ms": 0, "buffer": b""}
+        self.workers[language] = worker
+        process.readyReadStandardOutput.connect(lambda: self.read_marker(language, process))
+        process.finished.connect(lambda: self.worker_died(language, process))
+        process.start(interpreter, args)
+
+    def read_marker(self, language, process):
+        """Wait for the ready marker, everything printed while preloading is dropped"""
+        worker = self.workers.get(language)
+        if worker is None or worker["process"] is not process:
+            return
+        worker["buffer"] += bytes(process.readAllStandardOutput())
+        if WARM_READY_MARKER in worker["buffer"]:
+            worker["ready"] = True
+            worker["startup_ms"] = (time.perf_counter() - worker["spawned"]) * 1000
+            worker["buffer"] = b""
+            process.readyReadStandardOutput.disconnect()
+
+    def worker_died(self, language, process):
+        worker = self.workers.get(language)
+        if worker is not None and worker["process"] is process:
+            del self.workers[language]
+        process.deleteLater()
+
+    def requires_isolation(self, language, file_path):
+        """Check whether the script's directory shadows one of the preloaded modules"""
+        if language != "python":
+            # Perl does not search the script directory for modules
+            return False
+        directory = os.path.dirname(os.path.abspath(file_path))
+        for name in self.preload(language):
+            top = name.split(".")[0]
+            if os.path.exists(os.path.join(directory, top + ".py")) or os.path.isdir(os.path.join(directory, top)):
+                return True
+        return False
+
+    def is_ready(self, language, interpreter, file_path):
+        """Check whether the script can be run by a warm worker"""
+        if not self.enabled():
+            return False
+        worker = self.workers.get(language)
+        return (worker is not None and worker["ready"]
+                and worker["interpreter"] == interpreter
+                and worker["process"].state() == QProcess.Running
+                and not self.requires_isolation(language, file_path))
+
+    def acquire(self, language, interpreter, file_path):
+        """Hand over a ready worker, returns (process, startup_ms) or (None, 0) for a cold start"""
+        if not self.is_ready(language, interpreter, file_path):
+            return None, 0
+        worker = self.workers.pop(language)
+        process = worker["process"]
+        process.finished.disconnect()
+        return process, worker["startup_ms"]
+
+    def discard(self, language):
+        worker = self.workers.pop(language, None)
+        if worker is None:
+            return
+        process = worker["process"]
+        process.finished.disconnect()
+        process.kill()
+        process.waitForFinished(1000)
+        process.deleteLater()
+
+    def shutdown(self):
+        """Stop all idle workers"""
+        for language in list(self.workers):
+            self.discard(language)
 
 class MainWindow(QMainWindow):
+    # Output restored into the Output panel on startup
+    RESTORED_RUNS = 20
+    MAX_RESTORED_OUTPUT = 4 * 1024 * 1024
+    # Terminal screens restored from the previous session
+    RESTORED_TERMINAL_SCREENS = 10
+    # Files from this size open in large file mode
+    LARGE_FILE_BYTES = 20 * 1024 * 1024
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Perl Editor")
@@ -977,31 +2721,66 @@ class MainWindow(QMainWindow):
         # Set cache paths
         self.output_cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output_cache.txt')
         self.terminal_cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'terminal_cache.txt')
+        self.terminal_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'terminal_cache')
+        self.run_history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_history')
+        self.run_log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_log.jsonl')
         
-        # Load settings
-        try:
-            with open(self.settings_path, 'r') as file:
-                self.settingsJson = json.load(file)
-        except FileNotFoundError:
-            # Create default settings if file doesn't exist
-            self.settingsJson = {
+        # Load settings, defaults are used when the file doesn't exist
+        self.settingsJson = SettingsStore(self.settings_path, {
                 "theme": "dark",
                 "themeColors": {
                     "sideBar": "#1a1a1a"
                 },
                 "openfiles": [],
-                "openMainFolder": ""
-            }
-            with open(self.settings_path, 'w') as file:
-                json.dump(self.settingsJson, file, indent=2)
+                "openMainFolder": "",
+                "terminalScrollback": CommandPromptEmulator.DEFAULT_SCROLLBACK,
+                "ignorePatterns": IgnoreRules.DEFAULT_PATTERNS,
+                "warmPool": {
+                    "enabled": False,
+                    "preload": WarmInterpreterPool.DEFAULT_PRELOAD
+                }
+            }, self)
+        self.settingsJson.write_failed.connect(lambda error: self.statusBar().showMessage(f"Could not save settings: {error}", 4000))
         
         # Initialize variables
         self.current_file = None
         self.process_output = None
-        self.tab_file_map = {}
-        self.modified_tabs = set()
-        self.original_content = {}
+        # Open tabs by stable document id, tab indices are only used for display
+        self.documents = DocumentRegistry()
+        # Saves run in the background, several documents at once for Save All
+        self.save_pool = QThreadPool(self)
+        self.save_pool.setMaxThreadCount(4)
         self.loading_file = False
+        # Paths of the open folder for Go to File, built in the background
+        self.file_index = None
+        self.project_indexer = None
+        
+        # Resource usage and timing history of runs started from run_code
+        self.run_monitor = RunResourceMonitor(self)
+        self.run_history = RunHistoryStore(self.run_history_path)
+        self.run_file_path = None
+        self.run_mode = "run"
+        self.profile_stats_path = None
+        self.profile_loaders = []
+        
+        # Line index over output_cache.txt for Find in Output
+        self.output_index = OutputLogIndex(self.output_cache_path)
+        self.output_index_builder = None
+        self.output_search_dialog = None
+        # Byte offset of the output log line shown in the first block of the Output panel (moves on Clear Output)
+        self.output_base_offset = 0
+        
+        # ANSI parsers for the running process, stderr defaults to red
+        self.output_ansi = AnsiParser()
+        self.error_ansi = AnsiParser(ERROR_OUTPUT_STYLE)
+        
+        # Structured per-run records pointing into output_cache.txt
+        self.run_log = RunLog(self.run_log_path, self.output_cache_path)
+        self.current_run = None
+        self.run_history_dialog = None
+        
+        # Pre-started interpreters for fast repeated runs (optional, see settings "warmPool")
+        self.warm_pool = WarmInterpreterPool(self, self.settingsJson)
         
         # Initialize panels
         self.settings_panel = SettingsPanel(self)
@@ -1068,27 +2847,53 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage(f"{joke}", 30000)
 
     def load_open_files(self):
-        """Load files that were open when the application was last closed"""
-        if 'openfiles' in self.settingsJson and self.settingsJson['openfiles']:
-            for file_path in self.settingsJson['openfiles']:
-                if os.path.exists(file_path):
-                    self.set_new_tab(Path(file_path))
-                else:
-                    # File no longer exists, remove it from settings
-                    self.settingsJson['openfiles'].remove(file_path)
-                    with open(self.settings_path, 'w') as file:
-                        json.dump(self.settingsJson, file, indent=2)
+        """Restore the tabs that were open when the application was last closed"""
+        open_files = self.settingsJson.get('openfiles') or []
+        existing = [file_path for file_path in open_files if os.path.exists(file_path)]
+        if len(existing) != len(open_files):
+            # Files that no longer exist are dropped from settings in one write
+            self.settingsJson['openfiles'] = existing
+        if not existing:
+            return
+        
+        # Only a placeholder per file, nothing is read until its tab is shown. Signals are held back
+        # so the first placeholder does not get loaded just for becoming current on insertion
+        self.tab_view.blockSignals(True)
+        for file_path in existing:
+            placeholder = PendingTab(file_path)
+            self.documents.add(placeholder, str(Path(file_path).absolute()))
+            index = self.tab_view.addTab(placeholder, os.path.basename(file_path))
+            self.tab_view.setTabToolTip(index, file_path)
+        self.tab_view.blockSignals(False)
+        # The last file was the active one, as when every tab was opened in turn
+        self.tab_view.setCurrentIndex(self.tab_view.count() - 1)
+        self.tab_changed(self.tab_view.currentIndex())
+
+    def load_pending_tab(self, placeholder):
+        """Read the file behind a restored tab into a real editor at the same position"""
+        index = self.tab_view.indexOf(placeholder)
+        if index == -1:
+            return  # Closed or already loaded
+        # Out of the registry first, otherwise set_new_tab finds the path open and just switches to it
+        document = self.documents.for_widget(placeholder)
+        if document is not None:
+            self.documents.remove(document)
+        self.set_new_tab(Path(placeholder.path), tab_index=index)
+        # The editor went in before the placeholder, which is now one to the right when it loaded
+        self.tab_view.removeTab(self.tab_view.indexOf(placeholder))
+        placeholder.deleteLater()
+        if not os.path.isfile(placeholder.path):
+            self.statusBar().showMessage(f"{os.path.basename(placeholder.path)} no longer exists", 4000)
 
     def save_open_files(self):
         """Save currently open files to settings.json"""
         open_files = []
         for index in range(self.tab_view.count()):
-            if index in self.tab_file_map and self.tab_file_map[index] is not None:
-                open_files.append(self.tab_file_map[index])
+            document = self.document_at(index)
+            if document is not None and document.path is not None:
+                open_files.append(document.path)
         
         self.settingsJson['openfiles'] = open_files
-        with open(self.settings_path, 'w') as file:
-            json.dump(self.settingsJson, file, indent=2)
 
     def init_ui(self):
         self.setWindowTitle("NucleoIDE")
@@ -1099,6 +2904,9 @@ class MainWindow(QMainWindow):
         self.window_font = QFont("Courier New", 12) 
         self.window_font.setPointSize(12)
         self.setFont(self.window_font)
+        # File type detection and lexers shared by all editors, configured once per language and theme
+        self.languages = LanguageRegistry.default()
+        self.lexers = LexerRegistry(self.window_font, self.languages)
         # Create main container
         central_widget = QWidget()
         main_layout = QVBoxLayout(central_widget)
@@ -1192,6 +3000,12 @@ class MainWindow(QMainWindow):
         open_folder_action.triggered.connect(self.open_folder)
         file_menu.addAction(open_folder_action)
         
+        # Go to file action
+        go_to_file_action = QAction("Go to File...", self)
+        go_to_file_action.setShortcut("Ctrl+P")
+        go_to_file_action.triggered.connect(self.go_to_file)
+        file_menu.addAction(go_to_file_action)
+        
         file_menu.addSeparator()
         
         # Save file action
@@ -1206,6 +3020,12 @@ class MainWindow(QMainWindow):
         save_as_action.triggered.connect(self.save_as)
         file_menu.addAction(save_as_action)
         
+        # Save all action
+        save_all_action = QAction("Save All", self)
+        save_all_action.setShortcut("Ctrl+Alt+S")
+        save_all_action.triggered.connect(self.save_all)
+        file_menu.addAction(save_all_action)
+        
         file_menu.addSeparator()
         
         # Exit action
@@ -1249,7 +3069,15 @@ class MainWindow(QMainWindow):
         paste_action.triggered.connect(self.paste)
         edit_menu.addAction(paste_action)
         
-        # View menu
+        edit_menu.addSeparator()
+        
+        # Find in files action
+        find_in_files_action = QAction("Find in Files...", self)
+        find_in_files_action.setShortcut("Ctrl+Shift+F")
+        find_in_files_action.triggered.connect(self.show_find_in_files)
+        edit_menu.addAction(find_in_files_action)
+        
+        # View menu
         view_menu = menubar.addMenu("View")
         
         # Theme submenu
@@ -1273,9 +3101,38 @@ class MainWindow(QMainWindow):
         # Run code action
         run_action = QAction("Run Code", self)
         run_action.setShortcut("F5")
-        run_action.triggered.connect(self.run_code)
+        run_action.triggered.connect(lambda: self.run_code())
         run_menu.addAction(run_action)
         
+        # Run with profiler actions
+        profile_action = QAction("Run with Profiler", self)
+        profile_action.setShortcut("Shift+F5")
+        profile_action.triggered.connect(lambda: self.run_code(mode="profile"))
+        run_menu.addAction(profile_action)
+        
+        sample_action = QAction("Run with Sampling Profiler", self)
+        sample_action.triggered.connect(lambda: self.run_code(mode="sample"))
+        run_menu.addAction(sample_action)
+        
+        clear_profile_action = QAction("Clear Profile Annotations", self)
+        clear_profile_action.triggered.connect(self.clear_profile_annotations)
+        run_menu.addAction(clear_profile_action)
+        
+        run_menu.addSeparator()
+        
+        # Past runs
+        run_history_action = QAction("Run History...", self)
+        run_history_action.triggered.connect(self.show_run_history)
+        run_menu.addAction(run_history_action)
+        
+        
+        # Warm interpreter pool toggle
+        warm_pool_action = QAction("Use Warm Interpreter Pool", self)
+        warm_pool_action.setCheckable(True)
+        warm_pool_action.setChecked(self.warm_pool.enabled())
+        warm_pool_action.triggered.connect(self.toggle_warm_pool)
+        run_menu.addAction(warm_pool_action)
+        
         # Tools menu
         tools_menu = menubar.addMenu("Tools")
         
@@ -1305,31 +3162,44 @@ class MainWindow(QMainWindow):
         tools_menu.addAction(git_action)
 
     def set_light_theme(self):
-        self.settingsJson['themeColors']['sideBar'] = "#4f596a"
-        self.settingsJson['theme'] = "light"
-        with open(self.settings_path, 'w') as file:
-            json.dump(self.settingsJson, file, indent=2)
+        self.settingsJson.update(theme="light", themeColors=dict(self.settingsJson['themeColors'], sideBar="#4f596a"))
         self.side_bar.setStyleSheet(f'''
             background-color:{self.settingsJson['themeColors']['sideBar']};
         ''') 
+        self.apply_editor_theme()
         self.light_action.setChecked(True)
         self.dark_action.setChecked(False)
 
     def set_dark_theme(self):
-        self.settingsJson['themeColors']['sideBar'] = "#1a1a1a"
-        self.settingsJson['theme'] = "dark"
-        with open(self.settings_path, 'w') as file:
-            json.dump(self.settingsJson, file, indent=2)
+        self.settingsJson.update(theme="dark", themeColors=dict(self.settingsJson['themeColors'], sideBar="#1a1a1a"))
         self.side_bar.setStyleSheet(f'''
             background-color:{self.settingsJson['themeColors']['sideBar']};
         ''') 
+        self.apply_editor_theme()
         self.dark_action.setChecked(True)
         self.light_action.setChecked(False)
 
-    def get_editor(self) -> QsciScintilla:
+    def get_editor(self, language="perl", large_file=False) -> QsciScintilla:
         editor = QsciScintilla()
         editor.setUtf8(True)
         editor.setFont(self.window_font)
+        editor.large_file = large_file
+        editor.loader = None
+        # Length and CRC-32 of the text at the save point
+        editor.saved_length = 0
+        editor.saved_crc = None
+        # Bumped on every change, tells a finished background save whether the text moved on
+        editor.revision = 0
+        theme = self.settingsJson.get('theme', 'dark')
+
+        if large_file:
+            # No lexer, brace matching or guides, they rescan text on every change and scroll
+            editor.language = None
+            editor.setEolMode(QsciScintilla.EolWindows)
+            self.lexers.apply_chrome(editor, theme)
+            editor.setMarginType(0, QsciScintilla.NumberMargin)
+            editor.setMarginWidth(0, "000000000")
+            return editor
 
         editor.setBraceMatching(QsciScintilla.SloppyBraceMatch)
 
@@ -1342,144 +3212,132 @@ class MainWindow(QMainWindow):
         editor.setEolMode(QsciScintilla.EolWindows)
         editor.setEolVisibility(False)
 
-        # We'll connect the textChanged signal later in set_new_tab
-        # This prevents the signal from triggering during initial file loading
-        
-        # Determine lexer based on file extension
-        current_index = self.tab_view.currentIndex()
-        file_path = None
-        
-        # First try to get file path from tab_file_map
-        if current_index in self.tab_file_map:
-            file_path = self.tab_file_map[current_index]
-        # Fallback to current_file
-        elif self.current_file:
-            file_path = str(self.current_file)
-            
-        # Set lexer based on file extension
-        if file_path and file_path.endswith('.py'):
-            # Python lexer
-            lexer = QsciLexerPython()
-            lexer.setFont(self.window_font)
-            lexer.setDefaultFont(self.window_font)
-            
-            lexer.setColor(QColor("#ffffff"))
-            lexer.setColor(QColor("#FF0000"), QsciLexerPython.Keyword)
-            lexer.setColor(QColor("#008000"), QsciLexerPython.Comment)
-            lexer.setColor(QColor("#008000"), QsciLexerPython.DoubleQuotedString)
-            lexer.setColor(QColor("#008000"), QsciLexerPython.SingleQuotedString)
-            lexer.setColor(QColor(255, 165, 0), QsciLexerPython.Identifier)
-            lexer.setColor(QColor("pink"), QsciLexerPython.Operator)
-            lexer.setColor(QColor("cyan"), QsciLexerPython.ClassName)
-            lexer.setColor(QColor("yellow"), QsciLexerPython.FunctionMethodName)
-            
-            lexer.setDefaultPaper(QColor("#2f343e"))
-            lexer.setPaper(QColor("#2f343e"))
-        else:
-            # Default to Perl lexer
-            lexer = QsciLexerPerl()
-            lexer.setFont(self.window_font) 
-            lexer.setDefaultFont(self.window_font) 
-            
-            lexer.setColor(QColor(255, 165, 0), QsciLexerPerl.Identifier)
-            lexer.setColor(QColor("#ffffff"))
-            lexer.setColor(QColor("#FF0000"), QsciLexerPerl.Keyword) 
-            lexer.setColor(QColor("#008000"), QsciLexerPerl.Comment)
-            lexer.setColor(QColor("#008000"), QsciLexerPerl.POD)
-            lexer.setColor(QColor("#008000"), QsciLexerPerl.DoubleQuotedString)
-            lexer.setColor(QColor("#008000"), QsciLexerPerl.DoubleQuotedString)  
-            lexer.setColor(QColor("green"), QsciLexerPerl.Scalar) 
-            lexer.setColor(QColor("green"), QsciLexerPerl.Hash)        
-            lexer.setColor(QColor(255, 165, 0), QsciLexerPerl.Array)
-            lexer.setColor(QColor("pink"), QsciLexerPerl.Operator)
-            
-            lexer.setDefaultPaper(QColor("#2f343e"))
-            lexer.setPaper(QColor("#2f343e"))
-
-        editor.setMarginsBackgroundColor(QColor("#2f343e"))
-        editor.setMarginsForegroundColor(QColor("white"))
+        # Lexer for the detected language, None (plain text) for unknown or huge files
+        editor.language = language
+        editor.setLexer(self.lexers.lexer(language, theme, editor))
+        self.lexers.apply_chrome(editor, theme)
         
-        editor.setLexer(lexer)
         editor.setMarginType(0, QsciScintilla.NumberMargin)
-        
         editor.setMarginWidth(0, "00000")
-        editor.setCaretForegroundColor(QColor("white")) 
         editor.setCaretLineVisible(True) 
-        editor.setCaretLineBackgroundColor(QColor("#363b45")) 
         return editor
 
+    def apply_editor_theme(self):
+        """Recolor all open editors for the current theme in one pass"""
+        theme = self.settingsJson.get('theme', 'dark')
+        for index in range(self.tab_view.count()):
+            editor = self.tab_view.widget(index)
+            if not isinstance(editor, QsciScintilla):
+                continue
+            self.set_editor_language(editor, editor.language, theme)
+
+    def set_editor_language(self, editor, language, theme=None):
+        """Switch an editor's lexer, e.g. for a new theme or after Save As changed the extension"""
+        theme = theme or self.settingsJson.get('theme', 'dark')
+        editor.language = language
+        lexer = self.lexers.lexer(language, theme, editor) if language else None
+        previous = editor.lexer()
+        if previous is not lexer:
+            editor.setLexer(lexer)
+            if isinstance(previous, QsciLexerCustom):
+                previous.deleteLater()
+        self.lexers.apply_chrome(editor, theme)
+
     def is_binary(self, path):
         '''
-        Check if file is binary or a known non-text type by extension, but allow images
+        Check if the file is a known non-text type by extension, but allow images. Content is
+        sniffed for NULs when the file is read
         '''
-        # List of known image file extensions
-        image_exts = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.svg']
-        # List of known non-text file extensions (excluding images)
-        non_text_exts = [
-            '.pdf', '.exe', '.dll', '.zip', '.rar', '.7z', '.tar', '.gz', '.mp3', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.wav', '.ogg', '.bin', '.obj', '.class', '.so', '.dylib', '.psd', '.ai', '.eps', '.ttf', '.otf', '.woff', '.woff2', '.apk', '.iso', '.img', '.msi', '.cab', '.sys', '.dat', '.db', '.sqlite', '.mdb', '.accdb', '.ppt', '.pptx', '.xls', '.xlsx', '.doc', '.docx', '.rtf', '.chm', '.swf', '.fla', '.jar', '.crx', '.xpi', '.vbs', '.scr', '.msu', '.msp', '.bat', '.com', '.pif', '.cpl', '.msc', '.lnk', '.tmp', '.torrent', '.sav']
-        ext = os.path.splitext(str(path))[1].lower()
-        if ext in image_exts:
-            return False  # Allow images
-        if ext in non_text_exts:
-            return True
-        try:
-            with open(path, 'rb') as f:
-                return b'\0' in f.read(1024)
-        except Exception:
-            return True  # If we can't read the file, treat as binary
+        return is_binary_path(path)
 
     def check_for_modifications(self, index):
-        """Check if content has been modified compared to original/saved version"""
+        """Update the tab's modified marker from the editor's save point"""
         if index == -1 or self.loading_file:
             return
         
         editor = self.tab_view.widget(index)
-        if not editor:
+        if not isinstance(editor, QsciScintilla):
             return
-            
-        current_content = editor.text()
         
-        # For untitled files, any content means it's modified
-        if index not in self.tab_file_map or self.tab_file_map[index] is None:
-            if current_content.strip():  # If there's any non-whitespace content
-                self.mark_tab_as_modified(index)
-            else:
-                self.mark_tab_as_saved(index)
-            return
-            
-        # For existing files, compare with original content
-        if index in self.original_content:
-            if current_content != self.original_content[index]:
-                self.mark_tab_as_modified(index)
-            else:
-                self.mark_tab_as_saved(index)
+        # Edited back to the saved text: same length and checksum, move the save point here
+        if editor.isModified() and editor.saved_crc is not None and editor.length() == editor.saved_length:
+            if self.document_crc(editor) == editor.saved_crc:
+                editor.setModified(False)
+        
+        if editor.isModified():
+            self.mark_tab_as_modified(index)
+        else:
+            self.mark_tab_as_saved(index)
+
+    @staticmethod
+    def document_crc(editor):
+        length = editor.length()
+        # bytes() includes a terminating NUL
+        return zlib.crc32(memoryview(editor.bytes(0, length))[:length])
+
+    def remember_saved_state(self, editor, crc=None):
+        """Make the editor's current text its save point"""
+        editor.setModified(False)
+        editor.saved_length = editor.length()
+        editor.saved_crc = self.document_crc(editor) if crc is None else crc
 
-    def set_new_tab(self, path: Path, is_new_file=False):
-        editor = self.get_editor()
+    def track_modifications(self, editor):
+        """Follow the save point, a debounced checksum catches edits that restore the saved text"""
+        editor.modificationChanged.connect(lambda modified: self.check_for_modifications(self.tab_view.indexOf(editor)))
+        timer = QTimer(editor)
+        timer.setSingleShot(True)
+        timer.setInterval(300)
+        timer.timeout.connect(lambda: self.check_for_modifications(self.tab_view.indexOf(editor)))
+        editor.textChanged.connect(lambda: self.text_edited(editor, timer))
 
+    def text_edited(self, editor, timer):
+        editor.revision += 1
+        if editor.isModified():
+            timer.start()
+
+    @staticmethod
+    def eol_mode(eol):
+        return {"\r\n": QsciScintilla.EolWindows, "\r": QsciScintilla.EolMac}.get(eol, QsciScintilla.EolUnix)
+
+    @staticmethod
+    def detect_eol(content):
+        """Line ending of the first line, new lines typed in the editor use the same"""
+        newline = content.find("\n")
+        if newline > 0 and content[newline - 1] == "\r":
+            return "\r\n"
+        if newline == -1 and "\r" in content:
+            return "\r"
+        return "\n" if newline != -1 else ("\r\n" if os.name == 'nt' else "\n")
+
+    def insert_tab(self, widget, title, tab_index=None):
+        """Append a tab, or put it at tab_index when it replaces a restored placeholder"""
+        if tab_index is None:
+            return self.tab_view.addTab(widget, title)
+        return self.tab_view.insertTab(tab_index, widget, title)
+
+    def set_new_tab(self, path: Path, is_new_file=False, tab_index=None):
         if is_new_file:
+            editor = self.get_editor()
+            self.documents.add(editor)  # No file associated yet
             new_tab_index = self.tab_view.addTab(editor, "untitled")
-            self.tab_file_map[new_tab_index] = None  # No file associated yet
-            self.original_content[new_tab_index] = ""  # Empty content for new files
             self.setWindowTitle("untitled")
             self.statusBar().showMessage("Opened untitled")
             self.tab_view.setCurrentIndex(new_tab_index)
             self.current_file = None
-            editor.textChanged.connect(lambda: self.check_for_modifications(new_tab_index))
+            self.remember_saved_state(editor)
+            self.track_modifications(editor)
             return
 
         if not path.is_file():
             return
 
         # Handle image files
-        image_exts = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.svg']
         ext = os.path.splitext(str(path))[1].lower()
-        if ext in image_exts:
+        if ext in IMAGE_EXTENSIONS:
             try:
                 viewer = ImageViewer(str(path))
-                new_tab_index = self.tab_view.addTab(viewer, path.name)
-                self.tab_file_map[new_tab_index] = str(path.absolute())
-                self.original_content[new_tab_index] = None  # Not used for images
+                self.documents.add(viewer, str(path.absolute()))
+                new_tab_index = self.insert_tab(viewer, path.name, tab_index)
                 self.tab_view.setCurrentIndex(new_tab_index)
                 self.setWindowTitle(path.name)
                 self.statusBar().showMessage(f"Opened image: {path.name}", 2000)
@@ -1493,55 +3351,139 @@ class MainWindow(QMainWindow):
             return
 
         # Check if the file is already open in a tab
-        for i in range(self.tab_view.count()):
-            if i in self.tab_file_map and self.tab_file_map[i] == str(path.absolute()):
-                self.tab_view.setCurrentIndex(i)
-                self.current_file = path
-                return
+        document = self.documents.for_path(str(path.absolute()))
+        if document is not None:
+            self.tab_view.setCurrentWidget(document.widget)
+            self.current_file = path
+            return
 
         self.current_file = path
-        editor = self.get_editor()  # Now that current_file is set, get_editor will use the right lexer
-        
-        # Try different encodings to read the file
-        encodings = ['utf-8', 'cp1252', 'latin1', 'iso-8859-1']
-        original_content = None
-        
-        for encoding in encodings:
-            try:
-                with open(path, 'r', encoding=encoding) as f:
-                    original_content = f.read()
-                break
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                self.statusBar().showMessage(f"Error reading file: {str(e)}", 2000)
+        try:
+            if path.stat().st_size >= self.LARGE_FILE_BYTES:
+                self.open_large_file(path, tab_index)
                 return
-        
-        if original_content is None:
-            self.statusBar().showMessage("Could not read file with any supported encoding", 2000)
+        except OSError as e:
+            self.statusBar().showMessage(f"Error reading file: {str(e)}", 2000)
             return
+        # Read once, then sniff BOM, binary content and encoding from the bytes. Line endings are
+        # kept as they are so saving writes them back unchanged
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            self.statusBar().showMessage(f"Error reading file: {str(e)}", 2000)
+            return
+        decoded = decode_text(data)
+        del data
+        if decoded is None:
+            self.statusBar().showMessage("This file is not readable as text.", 4000)
+            return
+        content, encoding, bom = decoded
         
-        new_tab_index = self.tab_view.addTab(editor, path.name)
-        self.tab_file_map[new_tab_index] = str(path.absolute())  # Store the file path
-        self.original_content[new_tab_index] = original_content  # Store for comparison
+        # Lexer by extension or shebang, plain text when unknown
+        language = self.languages.detect(str(path), content[:256].split("\n", 1)[0], path.stat().st_size)
+        editor = self.get_editor(language)
+        
+        document = self.documents.add(editor, str(path.absolute()))
+        document.encoding = encoding
+        document.bom = bom
+        editor.setEolMode(self.eol_mode(self.detect_eol(content)))
+        new_tab_index = self.insert_tab(editor, path.name, tab_index)
         
         # Set loading flag to prevent modification marking during file loading
         self.loading_file = True
-        editor.setText(original_content)
+        editor.setText(content)
         self.loading_file = False
         
-        # Explicitly ensure the tab is not marked as modified
-        if new_tab_index in self.modified_tabs:
-            self.mark_tab_as_saved(new_tab_index)
+        # The loaded text is the save point, only its checksum is kept
+        self.remember_saved_state(editor)
         
         self.setWindowTitle(path.name)
         self.tab_view.setCurrentIndex(new_tab_index)
         
-        # Connect the textChanged signal with specific tab index
-        editor.textChanged.connect(lambda: self.check_for_modifications(new_tab_index))
+        # Follow the save point for the modified marker
+        self.track_modifications(editor)
         
         self.statusBar().showMessage(f"Opened {path.name}", 2000)
 
+    def open_large_file(self, path: Path, tab_index=None):
+        """Open a file above LARGE_FILE_BYTES: no lexer, no copy of the content, loaded in chunks in the background"""
+        editor = self.get_editor(large_file=True)
+        size = path.stat().st_size
+        # Read-only and without undo history until the last chunk is in. Modification notifications
+        # are muted too, handling them per append costs far more than the appends themselves
+        editor.setReadOnly(True)
+        editor.SendScintilla(QsciScintilla.SCI_SETUNDOCOLLECTION, False)
+        editor.mod_event_mask = editor.SendScintilla(QsciScintilla.SCI_GETMODEVENTMASK)
+        editor.SendScintilla(QsciScintilla.SCI_SETMODEVENTMASK, 0)
+        editor.SendScintilla(QsciScintilla.SCI_ALLOCATE, size + 1)
+        
+        self.documents.add(editor, str(path.absolute()))
+        new_tab_index = self.insert_tab(editor, path.name, tab_index)
+        self.setWindowTitle(path.name)
+        self.tab_view.setCurrentIndex(new_tab_index)
+        
+        loader = LargeFileLoader(str(path), self)
+        editor.loader = loader
+        loader.chunk_loaded.connect(lambda data, done: self.append_large_file_chunk(editor, path, data, done, size))
+        loader.restarted.connect(lambda encoding: self.restart_large_file(editor, encoding))
+        loader.loaded.connect(lambda encoding: self.large_file_loaded(editor, path, encoding))
+        loader.failed.connect(lambda error: self.large_file_failed(editor, path, error))
+        loader.finished.connect(loader.deleteLater)
+        loader.start()
+        self.statusBar().showMessage(f"Loading {path.name} (large file mode, highlighting off)...")
+
+    def append_large_file_chunk(self, editor, path, data, done, size):
+        editor.setReadOnly(False)
+        editor.SendScintilla(QsciScintilla.SCI_APPENDTEXT, len(data), data)
+        editor.setReadOnly(True)
+        editor.loader.chunk_done()
+        self.statusBar().showMessage(f"Loading {path.name}... {done * 100 // max(size, 1)}%")
+
+    def restart_large_file(self, editor, encoding):
+        editor.setReadOnly(False)
+        editor.SendScintilla(QsciScintilla.SCI_CLEARALL)
+        editor.setReadOnly(True)
+
+    def large_file_loaded(self, editor, path, encoding):
+        crc = editor.loader.crc
+        eol = editor.loader.eol
+        bom = editor.loader.bom
+        editor.loader = None
+        editor.setReadOnly(False)
+        editor.SendScintilla(QsciScintilla.SCI_SETMODEVENTMASK, editor.mod_event_mask)
+        editor.SendScintilla(QsciScintilla.SCI_EMPTYUNDOBUFFER)
+        editor.SendScintilla(QsciScintilla.SCI_SETUNDOCOLLECTION, True)
+        editor.SendScintilla(QsciScintilla.SCI_GOTOPOS, 0)
+        document = self.documents.for_widget(editor)
+        if document is not None:
+            document.encoding = encoding
+            document.bom = bom
+        editor.setEolMode(self.eol_mode(eol))
+        # The loader summed the chunks, no need to read the text back
+        self.remember_saved_state(editor, crc)
+        self.track_modifications(editor)
+        self.statusBar().showMessage(f"Opened {path.name} ({encoding}, large file mode)", 4000)
+
+    def large_file_failed(self, editor, path, error):
+        self.cancel_large_file_load(editor)
+        self.close_tab(self.tab_view.indexOf(editor))
+        self.statusBar().showMessage(f"Could not open {path.name}: {error}", 4000)
+
+    def cancel_large_file_load(self, editor, wait=False):
+        """Stop a large file that is still loading, e.g. when its tab closes"""
+        loader = getattr(editor, 'loader', None)
+        if loader is None:
+            return
+        editor.loader = None
+        for signal in (loader.chunk_loaded, loader.restarted, loader.loaded, loader.failed):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass
+        loader.cancel()
+        if wait:
+            loader.wait()
+
     def set_up_body(self):
         # Create main widget and layout
         main_widget = QWidget()
@@ -1577,7 +3519,7 @@ class MainWindow(QMainWindow):
         run_button = QToolButton()
         run_button.setIcon(QIcon(self.get_resource_path('icons/run.png')))
         run_button.setToolTip('Run Code (F5)')
-        run_button.clicked.connect(self.run_code)
+        run_button.clicked.connect(lambda: self.run_code())
         toolbar.addWidget(run_button)
         
         # Add toolbar to main layout
@@ -1617,10 +3559,15 @@ class MainWindow(QMainWindow):
             }
         ''')
         
-        # Create file system model
-        self.file_model = QFileSystemModel()
-        self.file_model.setRootPath("")
-        self.tree_view.setModel(self.file_model)
+        # One model for the open project only, nothing is read or watched outside of it
+        self.model = ProjectTreeModel(self, self.settingsJson.get('ignorePatterns'))
+        self.model.watching_stopped.connect(lambda count: self.statusBar().showMessage(
+            f"{count} folders loaded, the file tree no longer updates by itself", 4000))
+        self.tree_view.setModel(self.model)
+        # Keep the Go to File index in step with changes seen in watched folders
+        self.model.source.rowsInserted.connect(lambda parent, first, last: self.project_rows_changed(parent, first, last, True))
+        self.model.source.rowsAboutToBeRemoved.connect(lambda parent, first, last: self.project_rows_changed(parent, first, last, False))
+        self.model.source.fileRenamed.connect(self.project_file_renamed)
         
         # Hide unnecessary columns
         for i in range(1, 4):
@@ -1725,6 +3672,8 @@ class MainWindow(QMainWindow):
         # Create output text edit
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
+        # Nothing to undo in the output, and no undo history growing with it
+        self.output_text.setUndoRedoEnabled(False)
         self.output_text.setContextMenuPolicy(Qt.CustomContextMenu)
         self.output_text.customContextMenuRequested.connect(self.show_output_context_menu)
         self.output_text.setStyleSheet('''
@@ -1739,15 +3688,14 @@ class MainWindow(QMainWindow):
         ''')
         
         # Create terminal emulator
-        self.terminal = CommandPromptEmulator(self, self.settingsJson)
+        self.terminal = TerminalTabs(self, self.settingsJson)
         self.terminal.setStyleSheet('''
-            QTextEdit {
+            CommandPromptEmulator {
                 background-color: #2D3748;
                 color: white;
                 border: none;
                 font-family: 'Courier New';
                 font-size: 14px;
-                padding: 10px;
             }
         ''')
         
@@ -1755,6 +3703,12 @@ class MainWindow(QMainWindow):
         self.bottom_tab_widget.addTab(self.output_text, "Output")
         self.bottom_tab_widget.addTab(self.terminal, "Terminal")
         
+        # Find in Files searches the open folder
+        self.find_panel = FindInFilesPanel(self.current_project, self.open_document_texts)
+        self.find_panel.match_activated.connect(self.open_file_at_line)
+        self.find_panel.replace_confirmed.connect(self.apply_replacements)
+        self.bottom_tab_widget.addTab(self.find_panel, "Search")
+        
         # Add bottom tab widget to bottom panel
         bottom_layout.addWidget(self.bottom_tab_widget)
         
@@ -1786,8 +3740,11 @@ class MainWindow(QMainWindow):
         clear_action = context_menu.addAction("Clear Output")
         copy_action = context_menu.addAction("Copy")
         select_all_action = context_menu.addAction("Select All")
+        context_menu.addSeparator()
+        find_action = context_menu.addAction("Find in Output...")
         
         # Connect actions to functions
+        find_action.triggered.connect(self.show_output_search)
         clear_action.triggered.connect(self.clear_output)
         copy_action.triggered.connect(self.output_widget.copy)
         select_all_action.triggered.connect(self.output_widget.selectAll)
@@ -1810,9 +3767,14 @@ class MainWindow(QMainWindow):
         error = self.process.readAllStandardError().data().decode('utf-8')
         self.output_area.appendPlainText(error)
 
+    def document_at(self, index):
+        """Document shown in the tab at index, None for -1"""
+        return self.documents.for_widget(self.tab_view.widget(index))
+
     def close_tab(self, index):
+        document = self.document_at(index)
         # Check for unsaved changes
-        if index in self.modified_tabs:
+        if document is not None and document.modified:
             tab_text = self.tab_view.tabText(index)
             if tab_text.startswith('• '):
                 tab_text = tab_text[2:]  # Remove the dot for display
@@ -1828,7 +3790,7 @@ class MainWindow(QMainWindow):
                 # Save the current tab before closing
                 current_tab = self.tab_view.currentIndex()
                 self.tab_view.setCurrentIndex(index)
-                saved = self.save_file()
+                saved = self.save_file(wait=True)
                 # If saving was cancelled, don't close the tab
                 if not saved:
                     return
@@ -1836,43 +3798,12 @@ class MainWindow(QMainWindow):
             elif reply == QMessageBox.Cancel:
                 return  # Don't close the tab
         
-        # Remove the file path from our mapping
-        if index in self.tab_file_map:
-            del self.tab_file_map[index]
+        # Stop loading a large file
+        self.cancel_large_file_load(self.tab_view.widget(index))
         
-        # Remove from modified tabs set if present
-        if index in self.modified_tabs:
-            self.modified_tabs.remove(index)
-            
-        # Remove from original content
-        if index in self.original_content:
-            del self.original_content[index]
-            
-        # Remap indices after tab is closed
-        new_map = {}
-        new_modified = set()
-        new_original = {}
-        for i in range(self.tab_view.count()):
-            if i >= index and i+1 in self.tab_file_map:
-                new_map[i] = self.tab_file_map[i+1]
-            elif i in self.tab_file_map:
-                new_map[i] = self.tab_file_map[i]
-                
-            # Update modified tabs indices
-            if i >= index and i+1 in self.modified_tabs:
-                new_modified.add(i)
-            elif i in self.modified_tabs:
-                new_modified.add(i)
-                
-            # Update original content
-            if i >= index and i+1 in self.original_content:
-                new_original[i] = self.original_content[i+1]
-            elif i in self.original_content:
-                new_original[i] = self.original_content[i]
-                
-        self.tab_file_map = new_map
-        self.modified_tabs = new_modified
-        self.original_content = new_original
+        # Other documents keep their ids, nothing needs remapping
+        if document is not None:
+            self.documents.remove(document)
         
         self.tab_view.removeTab(index)
 
@@ -2164,11 +4095,10 @@ class MainWindow(QMainWindow):
                 self.model.setRootPath(self.model.rootPath())
                 
                 # If the renamed file is open in a tab, update the tab
-                for tab_index in range(self.tab_view.count()):
-                    if tab_index in self.tab_file_map and self.tab_file_map[tab_index] == path:
-                        self.tab_file_map[tab_index] = new_path
-                        self.tab_view.setTabText(tab_index, new_name)
-                        break
+                document = self.documents.for_path(path)
+                if document is not None:
+                    self.documents.set_path(document, new_path)
+                    self.tab_view.setTabText(self.tab_view.indexOf(document.widget), f'• {new_name}' if document.modified else new_name)
                 
                 self.statusBar().showMessage(f"Renamed to {new_name}", 2000)
                 
@@ -2200,10 +4130,9 @@ class MainWindow(QMainWindow):
                 # Check if it's a file or directory
                 if os.path.isfile(path):
                     # If the file is open in a tab, close it first
-                    for tab_index in range(self.tab_view.count()):
-                        if tab_index in self.tab_file_map and self.tab_file_map[tab_index] == path:
-                            self.close_tab(tab_index)
-                            break
+                    document = self.documents.for_path(path)
+                    if document is not None:
+                        self.close_tab(self.tab_view.indexOf(document.widget))
                     os.remove(path)
                 else:
                     # For directories, use shutil.rmtree to remove recursively
@@ -2232,35 +4161,23 @@ class MainWindow(QMainWindow):
         self.set_new_tab(None, is_new_file=True)
         self.loading_file = False
 
-    def save_file(self):
+    def save_file(self, wait=False):
+        """Save the current tab, `wait` blocks until the file is written (e.g. before running it)"""
         current_index = self.tab_view.currentIndex()
         if current_index == -1:
             return False  # No open tabs
-            
-        editor = self.tab_view.currentWidget()
+        
+        document = self.document_at(current_index)
         
         # Check if this is an unsaved file
-        if current_index not in self.tab_file_map or self.tab_file_map[current_index] is None:
+        if document is None or document.path is None:
             return self.save_as()
         
-        # Get the file path from our mapping
-        file_path = self.tab_file_map[current_index]
-        file_obj = Path(file_path)
-        
-        # Save the file
-        current_content = editor.text()
-        file_obj.write_text(current_content)
-        
-        # Update the original content for this tab
-        self.original_content[current_index] = current_content
-        
-        self.statusBar().showMessage(f"Saved {file_obj.name}", 2000)
-        
-        # Mark the tab as saved (remove the dot)
-        self.mark_tab_as_saved(current_index)
+        if not self.save_document(document, wait=wait):
+            return False
         
         # Update current_file to match the active tab
-        self.current_file = file_obj
+        self.current_file = Path(document.path)
         return True
 
     def save_as(self):
@@ -2269,7 +4186,9 @@ class MainWindow(QMainWindow):
             return False  # No open tabs
             
         editor = self.tab_view.currentWidget()
-        if editor is None:
+        document = self.document_at(current_index)
+        # Profile results, run output and diff tabs have no document to save
+        if document is None or not isinstance(editor, QsciScintilla):
             return False
         
         file_path = QFileDialog.getSaveFileName(self, "Save As", os.getcwd())[0]
@@ -2277,30 +4196,111 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage("Cancelled", 2000)
             return False
         
+        # The document only moves to the new file once it is written there
         path = Path(file_path)
-        current_content = editor.text()
-        path.write_text(current_content)
+        if not self.save_document(document, wait=True, path=str(path.absolute())):
+            return False
+        self.documents.set_path(document, str(path.absolute()))
         
-        # Update tab text and mapping
-        tab_text = path.name
+        # The new name may mean another language
+        if not editor.large_file:
+            self.set_editor_language(editor, self.languages.detect(str(path), editor.text(0), editor.length()))
+        
+        # Update tab text
+        tab_text = f'• {path.name}' if document.modified else path.name
         
         # Set loading flag to prevent triggering modification detection
         self.loading_file = True
         self.tab_view.setTabText(current_index, tab_text)
         self.loading_file = False
         
-        self.tab_file_map[current_index] = str(path.absolute())
-        
-        # Update the original content for this tab
-        self.original_content[current_index] = current_content
-        
-        # Mark the tab as saved
-        self.mark_tab_as_saved(current_index)
-        
-        self.statusBar().showMessage(f"Saved {path.name}", 2000)
         self.current_file = path
         return True
 
+    def save_all(self):
+        """Save every modified document, files with a path are written concurrently"""
+        started = 0
+        for document in sorted(self.documents.modified(), key=lambda document: self.tab_view.indexOf(document.widget)):
+            if document.path is None:
+                # Untitled files need a name first
+                self.tab_view.setCurrentWidget(document.widget)
+                self.save_as()
+            elif self.save_document(document):
+                started += 1
+        if started:
+            self.statusBar().showMessage(f"Saving {started} file(s)...", 2000)
+
+    def save_document(self, document, wait=False, path=None):
+        """
+        Write a snapshot of the document on the save pool, atomically and in its original encoding.
+        `path` writes to another file (Save As), the document keeps its own path
+        """
+        editor = document.widget
+        if not isinstance(editor, QsciScintilla) or editor.loader is not None:
+            return False
+        if document.saving:
+            if not wait:
+                # The running save has an older snapshot, save again once it is done
+                document.save_queued = True
+                return True
+            # The older write must not land after this one
+            self.save_pool.waitForDone()
+            QApplication.processEvents()
+        
+        # One copy of the UTF-8 buffer on the GUI thread, transcoding and writing happen in the worker
+        length = editor.length()
+        data = editor.bytes(0, length)
+        data.chop(1)  # Terminating NUL
+        path = path or document.path
+        task = SaveTask(document.id, editor.revision, path, data, document.encoding, document.bom)
+        task.signals.finished.connect(self.save_finished)
+        task.signals.failed.connect(self.save_failed)
+        document.saving = True
+        if wait:
+            task.setAutoDelete(False)
+            task.run()
+            return task.error is None
+        self.save_pool.start(task)
+        self.statusBar().showMessage(f"Saving {os.path.basename(path)}...")
+        return True
+
+    def save_finished(self, document_id, revision, length, crc, encoding, path):
+        document = self.documents.get(document_id)
+        if document is None:
+            return  # Tab closed while saving
+        document.saving = False
+        # Results of an older snapshot arriving after a newer save are ignored
+        if revision >= document.saved_revision:
+            document.saved_revision = revision
+            editor = document.widget
+            if editor.revision == revision:
+                self.remember_saved_state(editor, crc)
+            else:
+                # Edited while saving, the tab stays modified but knows what is on disk
+                editor.saved_length = length
+                editor.saved_crc = crc
+            name = os.path.basename(path)
+            if encoding != document.encoding:
+                self.statusBar().showMessage(f"Saved {name} as {encoding}, the text does not fit {document.encoding}", 4000)
+                document.encoding = encoding
+            else:
+                self.statusBar().showMessage(f"Saved {name}", 2000)
+        if document.save_queued:
+            document.save_queued = False
+            self.save_document(document)
+
+    def save_failed(self, document_id, error, path):
+        document = self.documents.get(document_id)
+        if document is None:
+            return
+        document.saving = False
+        document.save_queued = False
+        QMessageBox.critical(
+            self,
+            "Error",
+            f"Failed to save '{path}': {error}"
+        )
+
 
     def open_file(self):
         ops=QFileDialog.Options()
@@ -2314,6 +4314,182 @@ class MainWindow(QMainWindow):
         f=Path(new_file)
         self.set_new_tab(f)
 
+    def start_project_index(self, folder):
+        """Index the files of a newly opened folder for Go to File"""
+        if self.project_indexer is not None:
+            self.project_indexer.cancel()
+        self.file_index = None
+        indexer = ProjectIndexer(os.path.abspath(folder), self.model.rules, self)
+        indexer.indexed.connect(self.project_indexed)
+        indexer.finished.connect(lambda: self.project_indexer_finished(indexer))
+        self.project_indexer = indexer
+        indexer.start()
+
+    def project_indexed(self, file_index):
+        if self.sender() is not self.project_indexer:
+            return  # A folder that is no longer open
+        self.file_index = file_index
+        self.statusBar().showMessage(f"Indexed {len(file_index)} files", 2000)
+
+    def project_indexer_finished(self, indexer):
+        if self.project_indexer is indexer:
+            self.project_indexer = None
+        indexer.deleteLater()
+
+    def project_relative_path(self, path):
+        """Path relative to the indexed folder with forward slashes, None when outside of it"""
+        if self.file_index is None:
+            return None
+        root = QDir.fromNativeSeparators(self.file_index.root).rstrip("/")
+        path = QDir.fromNativeSeparators(path)
+        if not path.startswith(root + "/"):
+            return None
+        return path[len(root) + 1:]
+
+    def project_rows_changed(self, parent, first, last, added):
+        """Files the tree model saw appear or disappear, only folders loaded in the tree are watched"""
+        if self.file_index is None:
+            return
+        source = self.model.source
+        for row in range(first, last + 1):
+            index = source.index(row, 0, parent)
+            relative = self.project_relative_path(source.filePath(index))
+            if relative is None:
+                continue
+            is_dir = source.isDir(index)
+            if not added:
+                if is_dir:
+                    self.file_index.remove_tree(relative)
+                else:
+                    self.file_index.remove(relative)
+            elif not is_dir and not self.model.rules.ignored(relative):
+                self.file_index.add(relative)
+
+    def project_file_renamed(self, directory, old_name, new_name):
+        old_path = self.project_relative_path(os.path.join(directory, old_name))
+        new_path = self.project_relative_path(os.path.join(directory, new_name))
+        if old_path is None or new_path is None:
+            return
+        if old_path not in self.file_index.ids:
+            # A folder, whatever was below it has new paths now
+            self.start_project_index(self.file_index.root)
+            return
+        self.file_index.remove(old_path)
+        if not self.model.rules.ignored(new_path):
+            self.file_index.add(new_path)
+
+    def current_project(self):
+        """(root, ignore rules, file index or None) of the open folder, None without one"""
+        if not self.model.root:
+            return None
+        return self.model.root, self.model.rules, self.file_index
+
+    def open_document_texts(self, root):
+        """Text of the open editors below root by project-relative path, unsaved edits included"""
+        texts = {}
+        for document in self.documents:
+            editor = document.widget
+            if document.path is None or not isinstance(editor, QsciScintilla) or editor.loader is not None:
+                continue
+            relative = os.path.relpath(document.path, root)
+            if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+                continue
+            texts[relative.replace(os.sep, "/")] = editor.text()
+        return texts
+
+    def apply_replacements(self, root, replacements):
+        """Replace in Files: open editors are changed in one undo step each, other files are rewritten in the background"""
+        batch = {"edited": 0, "written": 0, "pending": 0, "skipped": [], "failed": []}
+        writes = []
+        for replacement in replacements:
+            path = os.path.join(root, *replacement.path.split("/"))
+            document = self.documents.for_path(path)
+            editor = document.widget if document is not None else None
+            if isinstance(editor, QsciScintilla):
+                if editor.loader is not None or editor.text() != replacement.text:
+                    batch["skipped"].append(replacement.path)  # Edited since the preview
+                    continue
+                self.replace_in_editor(editor, replacement)
+                batch["edited"] += 1
+                continue
+            if document is not None and not isinstance(editor, PendingTab):
+                batch["skipped"].append(replacement.path)
+                continue
+            # Not loaded in an editor: only rewritten if the file is still the one that was previewed
+            try:
+                info = os.stat(path)
+            except OSError:
+                info = None
+            if info is None or replacement.stat != (info.st_mtime_ns, info.st_size):
+                batch["skipped"].append(replacement.path)
+                continue
+            writes.append((path, replacement))
+        
+        batch["pending"] = len(writes)
+        for path, replacement in writes:
+            # The same atomic write as Save, transcoded back to the file's encoding on the pool
+            task = SaveTask(-1, 0, path, replacement.new_text.encode('utf-8'), replacement.encoding, replacement.bom)
+            task.signals.finished.connect(lambda *args: self.replacement_written(batch, None))
+            task.signals.failed.connect(lambda document_id, error, path=replacement.path: self.replacement_written(batch, f"{path}: {error}"))
+            self.save_pool.start(task)
+        if not writes:
+            self.report_replacements(batch)
+
+    def replace_in_editor(self, editor, replacement):
+        """Apply the replaced spans from the end so earlier positions stay valid, undone in one step"""
+        spans = []
+        position, byte_position = 0, 0
+        for start, end, text in replacement.spans:
+            byte_position += len(replacement.text[position:start].encode('utf-8'))
+            byte_end = byte_position + len(replacement.text[start:end].encode('utf-8'))
+            spans.append((byte_position, byte_end, text.encode('utf-8')))
+            position, byte_position = end, byte_end
+        editor.beginUndoAction()
+        for start, end, data in reversed(spans):
+            editor.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, start)
+            editor.SendScintilla(QsciScintilla.SCI_SETTARGETEND, end)
+            editor.SendScintilla(QsciScintilla.SCI_REPLACETARGET, len(data), data)
+        editor.endUndoAction()
+
+    def replacement_written(self, batch, error):
+        if error is None:
+            batch["written"] += 1
+        else:
+            batch["failed"].append(error)
+        batch["pending"] -= 1
+        if batch["pending"] == 0:
+            self.report_replacements(batch)
+
+    def report_replacements(self, batch):
+        message = f"Replaced in {batch['edited'] + batch['written']} files ({batch['edited']} open in editors, not saved yet)"
+        self.find_panel.status_label.setText(message)
+        self.statusBar().showMessage(message, 4000)
+        problems = [f"Changed since the preview, not replaced: {path}" for path in batch["skipped"]] + batch["failed"]
+        if problems:
+            more = f"\n...and {len(problems) - 20} more" if len(problems) > 20 else ""
+            QMessageBox.warning(self, "Replace in Files", "\n".join(problems[:20]) + more)
+
+    def show_find_in_files(self):
+        """Ctrl+Shift+F: search the open folder, starting from the selected text"""
+        editor = self.tab_view.currentWidget()
+        if isinstance(editor, QsciScintilla) and editor.hasSelectedText() and "\n" not in editor.selectedText():
+            self.find_panel.pattern_input.setText(editor.selectedText())
+        self.bottom_tab_widget.setCurrentWidget(self.find_panel)
+        self.find_panel.pattern_input.setFocus()
+        self.find_panel.pattern_input.selectAll()
+
+    def go_to_file(self):
+        """Ctrl+P: fuzzy search the open folder by path"""
+        if self.file_index is None:
+            if self.project_indexer is not None:
+                self.statusBar().showMessage("Still indexing the folder, try again in a moment", 2000)
+            else:
+                self.statusBar().showMessage("Open a folder to use Go to File", 2000)
+            return
+        dialog = GoToFileDialog(self.file_index, self)
+        dialog.file_selected.connect(lambda path: self.set_new_tab(Path(path)))
+        dialog.exec_()
+
     def open_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
         if folder:
@@ -2321,10 +4497,8 @@ class MainWindow(QMainWindow):
             while self.tab_view.count() > 0:
                 self.close_tab(0)
             
-            # Clear the tab file map and modified tabs
-            self.tab_file_map.clear()
-            self.modified_tabs.clear()
-            self.original_content.clear()
+            # Forget documents whose tabs were closed
+            self.documents.clear()
             
             # Reset the current file
             self.current_file = None
@@ -2334,20 +4508,18 @@ class MainWindow(QMainWindow):
             
             # Update the model
             self.model.setRootPath(folder)
-            self.tree_view.setRootIndex(self.model.index(folder))
+            self.tree_view.setRootIndex(self.model.path_index(folder))
+            self.start_project_index(folder)
             self.tree_view.show()
             self.open_folder_btn.hide()
             
             # Update settings
             self.settingsJson['openMainFolder'] = folder
-            with open(self.settings_path, 'w') as file:
-                json.dump(self.settingsJson, file, indent=2)
             
             # Update terminal
             if hasattr(self, 'cmd_widget'):
                 self.cmd_widget.settings = self.settingsJson
-                self.cmd_widget.current_directory = folder
-                self.cmd_widget.clear_and_reset()
+                self.cmd_widget.reset_all(folder)
             
             self.statusBar().showMessage(f"Opened folder: {folder}")
             self.save_last_directory()
@@ -2384,17 +4556,18 @@ class MainWindow(QMainWindow):
         else:
             self.statusBar().showMessage("Welcome Web Page missing")
 
-    def run_code(self):
+    def run_code(self, mode="run"):
+        """Run the current file, `mode` is "run", "profile" (cProfile) or "sample" (sampling profiler)"""
         if not (self.bottom_panel.isVisible()):
             self.toggle_output_panel()  # Use the toggle method for consistency
         self.bottom_panel.setCurrentWidget(self.output_widget)
         current_index = self.tab_view.currentIndex()
         if current_index == -1:
-            self.output_widget.append("\n\nNo file open to run.")
+            self.append_output("\n\nNo file open to run.")
             return
 
-        # Always save the current file before running
-        saved = self.save_file()
+        # Always save the current file before running, it has to be on disk before it starts
+        saved = self.save_file(wait=True)
         if not saved:
             # If save was cancelled, don't run the code
             self.statusBar().showMessage("Code execution cancelled - file not saved", 3000)
@@ -2416,77 +4589,124 @@ class MainWindow(QMainWindow):
             
             # Determine which interpreter to use based on file extension
             if file_path.endswith(".pl"):
+                if mode == "sample":
+                    self.append_output("\n\nThe sampling profiler is only available for Python (.py) files. Use Run with Profiler for Perl.")
+                    return
+
                 # Use the Perl interpreter from src/interpretor/perl/perl/bin
-                interpreter = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpretor", "perl", "perl", "bin", "perl.exe")
+                interpreter = self.interpreter_path("perl")
                 if not os.path.exists(interpreter):
-                    self.output_widget.append("\n\nError: Perl interpreter not found at " + interpreter)
+                    self.append_output("\n\nError: Perl interpreter not found at " + interpreter)
                     return
                 
-                # For Perl, we'll create a temporary file with autoflush enabled
-                import tempfile
-                with open(file_path, 'r') as original_file:
-                    content = original_file.read()
+                if mode == "profile":
+                    # The profiler module enables autoflush itself, and the line numbers
+                    # it reports must match the original file
+                    interpreter_args = [file_path]
+                elif mode == "run" and self.warm_pool.is_ready("perl", interpreter, file_path):
+                    # The warm worker enables autoflush itself
+                    interpreter_args = [file_path]
+                else:
+                    # For Perl, we'll create a temporary file with autoflush enabled
+                    import tempfile
+                    with open(file_path, 'r') as original_file:
+                        content = original_file.read()
                 
-                # Create temp file with STDOUT autoflush
-                temp_perl_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pl', mode='w')
-                autoflush_code = """
+                    # Create temp file with STDOUT autoflush
+                    temp_perl_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pl', mode='w')
+                    autoflush_code = """
 # Added by NucleoIDE for real-time output
 use IO::Handle;
 STDOUT->autoflush(1);
 STDERR->autoflush(1);
 """
-                # Add autoflush code right after "use" statements if any, or at the beginning
-                if "use " in content:
-                    # Find the last 'use' statement
-                    lines = content.split('\n')
-                    last_use_idx = 0
-                    for i, line in enumerate(lines):
-                        if line.strip().startswith('use '):
-                            last_use_idx = i
+                    # Add autoflush code right after "use" statements if any, or at the beginning
+                    if "use " in content:
+                        # Find the last 'use' statement
+                        lines = content.split('\n')
+                        last_use_idx = 0
+                        for i, line in enumerate(lines):
+                            if line.strip().startswith('use '):
+                                last_use_idx = i
                     
-                    # Insert autoflush after the last use statement
-                    lines.insert(last_use_idx + 1, autoflush_code)
-                    modified_content = '\n'.join(lines)
-                else:
-                    # Add to the beginning of the file
-                    modified_content = autoflush_code + content
+                        # Insert autoflush after the last use statement
+                        lines.insert(last_use_idx + 1, autoflush_code)
+                        modified_content = '\n'.join(lines)
+                    else:
+                        # Add to the beginning of the file
+                        modified_content = autoflush_code + content
                 
-                temp_perl_file.write(modified_content)
-                temp_perl_file.close()
+                    temp_perl_file.write(modified_content)
+                    temp_perl_file.close()
                 
-                # Use the temporary file instead
-                interpreter_args = [temp_perl_file.name]
+                    # Use the temporary file instead
+                    interpreter_args = [temp_perl_file.name]
                 
             elif file_path.endswith(".py"):
                 # Use the Python interpreter from src/interpretor/python
-                interpreter = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpretor", "python", "python.exe")
+                interpreter = self.interpreter_path("python")
                 if not os.path.exists(interpreter):
-                    self.output_widget.append("\n\nError: Python interpreter not found at " + interpreter)
+                    self.append_output("\n\nError: Python interpreter not found at " + interpreter)
                     return
                 # Add -u flag to Python to force unbuffered output
                 interpreter_args = ["-u", file_path]
             else:
-                self.output_widget.append("\n\nUnsupported file type. Only .pl (Perl) and .py (Python) files can be executed.")
+                self.append_output("\n\nUnsupported file type. Only .pl (Perl) and .py (Python) files can be executed.")
                 return
 
-            # Add a separator line between executions
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.output_widget.append("\n\n" + "=" * 50)
-            self.output_widget.append(f"[{current_time}] Running {os.path.basename(interpreter)}: {file_path}")
-            self.output_widget.append("=" * 50 + "\n")
-            QApplication.processEvents()  # Force immediate update
-            
-            # Set up process for live output
+            # Only one process at a time, checked before the banner and the new output run
             if self.process_output is not None and self.process_output.state() == QProcess.Running:
                 # If there's already a process running, inform the user
-                self.output_widget.append("A process is already running. Please wait for it to complete or terminate it.")
+                self.append_output("\n\nA process is already running. Please wait for it to complete or terminate it.")
                 # Clean up temp file if it exists
                 if temp_perl_file and os.path.exists(temp_perl_file.name):
                     os.unlink(temp_perl_file.name)
                 return
                 
+            # Add a separator line between executions
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            run_offset = self.output_index.size
+            self.output_ansi = AnsiParser()
+            self.error_ansi = AnsiParser(ERROR_OUTPUT_STYLE)
+            profiler_name = "line profiler" if file_path.endswith(".pl") else "cProfile"
+            action = {"profile": f"Profiling ({profiler_name})", "sample": "Profiling (sampling)"}.get(mode, "Running")
+            self.append_output("\n\n" + "=" * 50)
+            self.append_output(f"[{current_time}] {action} {os.path.basename(interpreter)}: {file_path}")
+            self.output_index.start_run(f"[{current_time}] {action} {os.path.basename(interpreter)}: {file_path}")
+            self.append_output("=" * 50 + "\n")
+            QApplication.processEvents()  # Force immediate update
+            
+            # Run Python scripts under the profiler bootstrap, which writes its stats to a temp file
+            self.run_mode = mode
+            self.profile_stats_path = None
+            self.perl_profile_dir = None
+            if mode == "profile" and file_path.endswith(".pl"):
+                # Perl scripts are profiled with a line profiler loaded through -d:NucleoProf
+                import tempfile
+                self.perl_profile_dir = tempfile.mkdtemp(prefix='nucleoide-perlprof-')
+                os.makedirs(os.path.join(self.perl_profile_dir, 'Devel'))
+                with open(os.path.join(self.perl_profile_dir, 'Devel', 'NucleoProf.pm'), 'w') as f:
+                    f.write(PERL_PROFILER_MODULE)
+                interpreter_args = ["-I" + self.perl_profile_dir, "-d:NucleoProf", file_path]
+            elif mode in ("profile", "sample"):
+                import tempfile
+                stats_fd, self.profile_stats_path = tempfile.mkstemp(prefix='nucleoide-profile-', suffix='.json')
+                os.close(stats_fd)
+                profiler = "cprofile" if mode == "profile" else "sampling"
+                interpreter_args = ["-u", "-c", PYTHON_PROFILER_BOOTSTRAP, profiler, self.profile_stats_path, file_path]
+
+            # Take a pre-started interpreter from the warm pool when possible, otherwise cold start
+            language = "perl" if file_path.endswith(".pl") else "python"
+            warm_process, startup_saved = None, 0
+            if mode == "run":
+                warm_process, startup_saved = self.warm_pool.acquire(language, interpreter, file_path)
+
             # Create a new process for this run
-            self.process_output = QProcess(self)
+            self.process_output = warm_process if warm_process is not None else QProcess(self)
+            if self.perl_profile_dir:
+                env = QProcessEnvironment.systemEnvironment()
+                env.insert("NUCLEOIDE_PROFILE_OUT", os.path.join(self.perl_profile_dir, 'profile.tsv'))
+                self.process_output.setProcessEnvironment(env)
             
             # Store temp file reference for cleanup
             self.temp_perl_file = temp_perl_file
@@ -2499,7 +4719,13 @@ STDERR->autoflush(1);
             self.process_output.readyReadStandardOutput.connect(self.handle_output)
             self.process_output.readyReadStandardError.connect(self.handle_error)
             self.process_output.finished.connect(self.process_finished)
-            
+
+            # Sample resource usage of the child once it has a pid
+            self.run_file_path = file_path
+            self.current_run = {"file": file_path, "interpreter": interpreter, "mode": mode,
+                                "start": datetime.now().isoformat(timespec='seconds'), "offset": run_offset}
+            self.process_output.started.connect(lambda: self.run_monitor.start(self.process_output.processId()))
+
             # Create and show the terminate button
             if not hasattr(self, 'terminate_button') or self.terminate_button is None:
                 # Create a new button if it doesn't exist
@@ -2523,16 +4749,27 @@ STDERR->autoflush(1);
             self.terminate_button.show()
             
             # Start the process with proper arguments
-            self.process_output.start(interpreter, interpreter_args)
+            if warm_process is not None:
+                # The warm worker is already running and waits for the script path on stdin
+                self.run_monitor.start(self.process_output.processId())
+                self.process_output.write((file_path + "\n").encode('utf-8'))
+                self.process_output.closeWriteChannel()
+                self.append_output(f"[Warm start] Interpreter was preloaded, saved ~{startup_saved:.0f} ms of startup\n")
+            else:
+                self.process_output.start(interpreter, interpreter_args)
             
             # Print command for debugging
-            if file_path.endswith(".pl"):
+            if warm_process is not None:
+                self.statusBar().showMessage(f"Running: {os.path.basename(interpreter)} {file_path} (warm start)", 5000)
+            elif file_path.endswith(".pl") and not self.perl_profile_dir:
                 self.statusBar().showMessage(f"Running: {os.path.basename(interpreter)} (with autoflush enabled)", 5000)
+            elif self.profile_stats_path or self.perl_profile_dir:
+                self.statusBar().showMessage(f"Profiling: {os.path.basename(interpreter)} {file_path}", 5000)
             else:
                 self.statusBar().showMessage(f"Running: {os.path.basename(interpreter)} {' '.join(interpreter_args)}", 5000)
 
         except Exception as e:
-            self.output_widget.append(f"\n\nExecution failed:\n{str(e)}")
+            self.append_output(f"\n\nExecution failed:\n{str(e)}")
             # Clean up temp file if it exists
             if temp_perl_file and os.path.exists(temp_perl_file.name):
                 os.unlink(temp_perl_file.name)
@@ -2550,17 +4787,9 @@ STDERR->autoflush(1);
                     output = data.decode('cp1252')
                 except UnicodeDecodeError:
                     output = data.decode('utf-8', errors='replace')
-            # Append text to output widget
+            # Append text to output widget, ANSI colors become formats
             if output:
-                self.output_widget.moveCursor(QTextCursor.End)
-                self.output_widget.insertPlainText(output)
-                self.output_widget.ensureCursorVisible()
-                # Append to OutputCache file
-                try:
-                    with open(self.output_cache_path, 'a', encoding='utf-8') as f:
-                        f.write(output)
-                except Exception:
-                    pass
+                self.insert_ansi_output(output, self.output_ansi)
                 # Force UI update immediately
                 QApplication.processEvents()
         except Exception as e:
@@ -2582,33 +4811,61 @@ STDERR->autoflush(1);
                     error = data.decode('utf-8', errors='replace')
             # Append error text in red to output widget
             if error:
-                cursor = self.output_widget.textCursor()
-                cursor.movePosition(QTextCursor.End)
-                self.output_widget.setTextCursor(cursor)
-                # Use red color for errors
-                error_format = QTextCharFormat()
-                error_format.setForeground(QColor("red"))
-                cursor.setCharFormat(error_format)
-                cursor.insertText(error)
-                # Reset format to default
-                cursor.setCharFormat(QTextCharFormat())
-                self.output_widget.ensureCursorVisible()
-                # Append to OutputCache file
-                try:
-                    with open(self.output_cache_path, 'a', encoding='utf-8') as f:
-                        f.write(error)
-                except Exception:
-                    pass
+                self.insert_ansi_output(error, self.error_ansi)
                 # Force UI update immediately
                 QApplication.processEvents()
         except Exception as e:
             # Log any errors that occur during error handling
             print(f"Error handling process error output: {e}")
             
+    def insert_ansi_output(self, text, parser):
+        """Insert process output as batched format runs, the cache gets the text without escape codes"""
+        runs = parser.feed(text)
+        if not runs:
+            return
+        cursor = self.output_widget.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for run_text, style in runs:
+            cursor.insertText(run_text, AnsiParser.char_format(style))
+        cursor.endEditBlock()
+        self.output_widget.setTextCursor(cursor)
+        # Reset format to default so later messages are not colored
+        self.output_widget.setCurrentCharFormat(QTextCharFormat())
+        self.output_widget.ensureCursorVisible()
+        self.append_output_cache("".join(run_text for run_text, _ in runs))
+
     def process_finished(self):
         exit_code = self.process_output.exitCode()
-        self.output_widget.append(f"\n[Done] Exit Code: {exit_code}")
+        stats = self.run_monitor.finish()
+        self.output_ansi.flush()
+        self.error_ansi.flush()
+        self.append_output(f"\n[Done] Exit Code: {exit_code}")
+
+        # Show resource usage and compare against previous runs of the same file
+        if stats is not None:
+            self.append_output(RunResourceMonitor.format_stats(stats))
+            if self.run_file_path:
+                previous = self.run_history.recent(self.run_file_path, limit=5)
+                comparison = RunHistoryStore.compare_with_history(stats, previous)
+                if comparison:
+                    self.append_output(comparison)
+                record = dict(stats)
+                record["timestamp"] = datetime.now().isoformat(timespec='seconds')
+                record["exit_code"] = exit_code
+                self.run_history.append(self.run_file_path, record)
         self.output_widget.ensureCursorVisible()
+
+        # Record where this run's output lives in the output cache
+        if self.current_run is not None:
+            run = self.current_run
+            run["end"] = datetime.now().isoformat(timespec='seconds')
+            run["exit_code"] = exit_code
+            if stats is not None:
+                run["duration"] = round(stats["wall_time"], 3)
+            run["length"] = self.output_index.size - run["offset"]
+            self.run_log.append(run)
+            self.current_run = None
         
         # Remove the terminate button when process finishes and show the clear output button
         if hasattr(self, 'terminate_button'):
@@ -2642,9 +4899,140 @@ STDERR->autoflush(1);
             except Exception as e:
                 print(f"Error cleaning up temporary file: {e}")
             
+        # Load profiler results in the background and show them in a new tab
+        if getattr(self, 'profile_stats_path', None):
+            self.load_profile_results(self.profile_stats_path, self.run_file_path)
+            self.profile_stats_path = None
+        if getattr(self, 'perl_profile_dir', None):
+            self.load_perl_profile(self.perl_profile_dir, self.run_file_path)
+            self.perl_profile_dir = None
+
+        # Prepare a warm interpreter for the next run
+        if self.run_file_path:
+            self.warm_up_interpreter(self.run_file_path)
+
         # Update status bar
         self.statusBar().showMessage("Process completed.", 3000)
 
+    def interpreter_path(self, language):
+        """Get the path of the bundled interpreter for the given language"""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        if language == "perl":
+            return os.path.join(base_dir, "interpretor", "perl", "perl", "bin", "perl.exe")
+        return os.path.join(base_dir, "interpretor", "python", "python.exe")
+
+    def warm_up_interpreter(self, file_path):
+        """Start a warm interpreter for the language of the given file if the pool is enabled"""
+        if not self.warm_pool.enabled():
+            return
+        if file_path.endswith(".py"):
+            language = "python"
+        elif file_path.endswith(".pl"):
+            language = "perl"
+        else:
+            return
+        interpreter = self.interpreter_path(language)
+        if os.path.exists(interpreter):
+            self.warm_pool.warm_up(language, interpreter)
+
+    def toggle_warm_pool(self, checked):
+        """Enable or disable the warm interpreter pool"""
+        self.settingsJson['warmPool'] = dict(self.settingsJson.get('warmPool', {}), enabled=checked)
+        if checked:
+            if self.current_file:
+                self.warm_up_interpreter(str(self.current_file))
+        else:
+            self.warm_pool.shutdown()
+
+    def load_profile_results(self, stats_path, script_path):
+        """Parse a profiler stats file in a worker thread"""
+        loader = ProfileStatsLoader(stats_path, script_path)
+        loader.loaded.connect(self.show_profile_results)
+        loader.error_occurred.connect(lambda message: self.append_output(f"\n[Profiler] {message}"))
+        loader.finished.connect(lambda: self.profile_loaders.remove(loader))
+        # Keep a reference so the thread isn't garbage collected while running
+        self.profile_loaders.append(loader)
+        loader.start()
+
+    def load_perl_profile(self, profile_dir, script_path):
+        """Parse a Perl line profile in a worker thread"""
+        parser = PerlProfileParser(profile_dir, script_path)
+        parser.loaded.connect(self.annotate_perl_profile)
+        parser.error_occurred.connect(lambda message: self.append_output(f"\n[Profiler] {message}"))
+        parser.finished.connect(lambda: self.profile_loaders.remove(parser))
+        self.profile_loaders.append(parser)
+        parser.start()
+
+    def annotate_perl_profile(self, profile):
+        """Show per-line exclusive/inclusive times in the margin of open editors"""
+        self.perl_profile = profile
+        # Make sure the profiled script itself is visible
+        if profile.get("script"):
+            self.set_new_tab(Path(profile["script"]))
+        annotated = 0
+        for index in range(self.tab_view.count()):
+            editor = self.tab_view.widget(index)
+            document = self.document_at(index)
+            file_path = document.path if document is not None else None
+            if not isinstance(editor, QsciScintilla) or not file_path:
+                continue
+            lines = profile["files"].get(os.path.normcase(os.path.abspath(file_path)))
+            if lines:
+                self.apply_profile_margin(editor, lines, profile["total"])
+                annotated += 1
+        self.append_output(f"\n[Profiler] Total {profile['total']:.3f}s, annotated {annotated} open file(s)")
+
+    def apply_profile_margin(self, editor, lines, total):
+        """Write "exclusive / inclusive" times into a text margin, coloring hot lines"""
+        if not hasattr(self, 'profile_margin_styles'):
+            font = QFont(self.window_font)
+            font.setPointSize(max(font.pointSize() - 2, 6))
+            self.profile_margin_styles = [
+                QsciStyle(-1, "Profile cool", QColor("#a0a8b8"), QColor("#2f343e"), font),
+                QsciStyle(-1, "Profile warm", QColor("black"), QColor("#e5c07b"), font),
+                QsciStyle(-1, "Profile hot", QColor("white"), QColor("#c0392b"), font)
+            ]
+        cool, warm, hot = self.profile_margin_styles
+        editor.clearMarginText()
+        editor.setMarginType(PROFILE_MARGIN, QsciScintilla.TextMarginRightJustified)
+        widest = ""
+        for line, (calls, exclusive, inclusive) in lines.items():
+            text = f"{exclusive * 1000:.2f} / {inclusive * 1000:.2f} ms "
+            share = exclusive / total if total else 0
+            style = hot if share >= 0.10 else warm if share >= 0.01 else cool
+            editor.setMarginText(line - 1, text, style)
+            widest = max(widest, text, key=len)
+        editor.setMarginWidth(PROFILE_MARGIN, widest + "0")
+        editor.setMarginSensitivity(PROFILE_MARGIN, False)
+
+    def clear_profile_annotations(self):
+        """Remove profiler annotations from all editors"""
+        for index in range(self.tab_view.count()):
+            editor = self.tab_view.widget(index)
+            if isinstance(editor, QsciScintilla):
+                editor.clearMarginText()
+                editor.setMarginWidth(PROFILE_MARGIN, 0)
+
+    def show_profile_results(self, results):
+        """Open profiler results in a new editor tab"""
+        widget = ProfileResultsWidget(results)
+        widget.frame_activated.connect(self.open_file_at_line)
+        tab_name = f"Profile: {os.path.basename(results.get('script') or 'script')}"
+        tab_index = self.tab_view.addTab(widget, tab_name)
+        self.tab_view.setCurrentIndex(tab_index)
+
+    def open_file_at_line(self, file_path, line):
+        """Open a file in an editor tab and move the cursor to the given 1-based line"""
+        if not file_path or not os.path.isfile(file_path):
+            self.statusBar().showMessage(f"Source not available: {file_path}", 3000)
+            return
+        self.set_new_tab(Path(file_path))
+        editor = self.tab_view.currentWidget()
+        if isinstance(editor, QsciScintilla):
+            editor.setCursorPosition(max(line - 1, 0), 0)
+            editor.ensureLineVisible(max(line - 1, 0))
+            editor.setFocus()
+
     def tab_changed(self, index):
         """Update current_file when the user switches tabs"""
         if index == -1:
@@ -2652,42 +5040,44 @@ STDERR->autoflush(1);
             self.setWindowTitle("NucleoIDE")
             return
             
-        if index in self.tab_file_map and self.tab_file_map[index] is not None:
-            self.current_file = Path(self.tab_file_map[index])
+        document = self.document_at(index)
+        if document is not None and isinstance(document.widget, PendingTab):
+            # Restored tab shown for the first time, read it after this switch has painted
+            QTimer.singleShot(0, lambda placeholder=document.widget: self.load_pending_tab(placeholder))
+        if document is not None and document.path is not None:
+            self.current_file = Path(document.path)
             self.setWindowTitle(self.current_file.name)
+            # Get an interpreter ready while the user is editing
+            self.warm_up_interpreter(document.path)
         else:
             self.current_file = None
             self.setWindowTitle("untitled")
 
     def mark_tab_as_modified(self, index):
         """Mark a tab as having unsaved changes by adding a dot to the tab name"""
-        if index == -1:
-            return
-        
-        # Get the current tab text without any modification indicator
-        tab_text = self.tab_view.tabText(index)
-        if tab_text.startswith('• '):
+        document = self.document_at(index)
+        if document is None or document.modified:
             return  # Already marked as modified
         
-        # Add the tab to our set of modified tabs
-        self.modified_tabs.add(index)
+        document.modified = True
         
         # Update the tab text to show it's modified
-        self.tab_view.setTabText(index, f'• {tab_text}')
+        tab_text = self.tab_view.tabText(index)
+        if not tab_text.startswith('• '):
+            self.tab_view.setTabText(index, f'• {tab_text}')
 
     def mark_tab_as_saved(self, index):
         """Remove the modification indicator from a tab name"""
-        if index == -1 or index not in self.modified_tabs:
+        document = self.document_at(index)
+        if document is None or not document.modified:
             return
         
+        document.modified = False
+        
         tab_text = self.tab_view.tabText(index)
         if tab_text.startswith('• '):
             # Remove the indicator
             self.tab_view.setTabText(index, tab_text[2:])
-            
-        # Remove from the set of modified tabs
-        if index in self.modified_tabs:
-            self.modified_tabs.remove(index)
 
     def toggle_output_panel(self):
         if self.bottom_panel.isVisible():
@@ -2720,9 +5110,116 @@ STDERR->autoflush(1);
             self.bottom_panel.show()
             self.bottom_panel.setCurrentWidget(self.cmd_widget)
 
+    def append_output(self, text):
+        """Append a line to the Output panel and the output cache"""
+        # QTextEdit.append starts a new block unless the document is empty
+        separator = "" if self.output_widget.document().isEmpty() else "\n"
+        self.output_widget.append(text)
+        self.append_output_cache(separator + text)
+
+    def append_output_cache(self, text):
+        """Append text to output_cache.txt and extend its line index"""
+        data = text.encode('utf-8')
+        try:
+            with open(self.output_cache_path, 'ab') as f:
+                f.write(data)
+        except OSError:
+            return
+        self.output_index.append(data)
+
+    def build_output_index(self):
+        """Index the existing output cache in the background"""
+        if self.output_index.ready:
+            return
+        self.output_index_builder = OutputIndexBuilder(self.output_index.path, self.output_index.size)
+        self.output_index_builder.loaded.connect(self.output_index_loaded)
+        self.output_index_builder.error_occurred.connect(lambda message: self.statusBar().showMessage(message, 5000))
+        self.output_index_builder.start()
+
+    def output_index_loaded(self, offsets, runs):
+        self.output_index.merge(offsets, runs)
+        if self.output_search_dialog is not None:
+            self.output_search_dialog.refresh_runs()
+
+    def show_output_search(self):
+        """Open the Find in Output dialog"""
+        if self.output_search_dialog is None:
+            self.output_search_dialog = OutputSearchDialog(self.output_index, self)
+            self.output_search_dialog.line_activated.connect(self.jump_to_output_line)
+        else:
+            self.output_search_dialog.refresh_runs()
+        selected = self.output_widget.textCursor().selectedText()
+        if selected:
+            self.output_search_dialog.pattern_input.setText(selected)
+        self.output_search_dialog.show()
+        self.output_search_dialog.raise_()
+        self.output_search_dialog.pattern_input.setFocus()
+
+    def jump_to_output_line(self, line):
+        """Scroll the Output panel to a line of the output log and select it"""
+        base_line = bisect.bisect_right(self.output_index.line_offsets, self.output_base_offset) - 1
+        block = self.output_widget.document().findBlockByNumber(line - base_line)
+        if line < base_line or not block.isValid():
+            self.statusBar().showMessage(f"Line {line + 1} is no longer shown in the Output panel", 3000)
+            return
+        self.bottom_panel.show()
+        self.bottom_panel.setCurrentWidget(self.output_widget)
+        cursor = QTextCursor(block)
+        cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+        self.output_widget.setTextCursor(cursor)
+        self.output_widget.ensureCursorVisible()
+
+    def show_run_history(self):
+        """Open the Run History dialog"""
+        if self.run_history_dialog is None:
+            self.run_history_dialog = RunHistoryDialog(self.run_log, self)
+            self.run_history_dialog.open_requested.connect(self.open_run_output)
+            self.run_history_dialog.diff_requested.connect(self.diff_run_outputs)
+        else:
+            self.run_history_dialog.refresh()
+        self.run_history_dialog.show()
+        self.run_history_dialog.raise_()
+
+    def open_run_output(self, record):
+        """Show a past run's output in a read-only tab"""
+        title = f"Run #{record['id']}: {os.path.basename(record.get('file', ''))}"
+        self.show_text_tab(title, self.run_log.read_output(record))
+
+    def diff_run_outputs(self, old, new):
+        """Show a unified diff of two runs' output in a read-only tab"""
+        diff = difflib.unified_diff(
+            self.run_log.read_output(old).splitlines(),
+            self.run_log.read_output(new).splitlines(),
+            fromfile=f"run #{old['id']} ({old.get('start', '')})",
+            tofile=f"run #{new['id']} ({new.get('start', '')})",
+            lineterm="")
+        text = "\n".join(diff) or "The outputs of both runs are identical."
+        self.show_text_tab(f"Diff: run #{old['id']} vs #{new['id']}", text)
+
+    def show_text_tab(self, title, text):
+        """Add a read-only text tab to the editor area"""
+        view = QPlainTextEdit()
+        view.setReadOnly(True)
+        view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        view.setStyleSheet('''
+            QPlainTextEdit {
+                background-color: #2D3748;
+                color: white;
+                border: none;
+                font-family: 'Courier New';
+                font-size: 14px;
+                padding: 10px;
+            }
+        ''')
+        view.setPlainText(text)
+        tab_index = self.tab_view.addTab(view, title)
+        self.tab_view.setCurrentIndex(tab_index)
+
     def clear_output(self):
         """Clear the output panel"""
         self.output_widget.clear()
+        # Output keeps going to the cache, the panel now starts at its last line
+        self.output_base_offset = self.output_index.last_line_start()
         self.statusBar().showMessage("Output panel cleared", 2000)
 
     def terminate_process(self):
@@ -2744,7 +5241,7 @@ STDERR->autoflush(1);
                     # If it doesn't terminate in time, kill it
                     self.process_output.kill()
                 
-                self.output_widget.append("\n\n[Process terminated by user]")
+                self.append_output("\n\n[Process terminated by user]")
                 
                 # Remove the terminate button
                 if hasattr(self, 'terminate_button'):
@@ -2753,11 +5250,16 @@ STDERR->autoflush(1);
 
     def closeEvent(self, event):
         """Handle window close event"""
-        # Check if there are any unsaved changes
-        if self.modified_tabs:
+        # Let background saves finish writing and update the modified markers
+        self.save_pool.waitForDone()
+        QApplication.processEvents()
+        
+        # Check if there are any unsaved changes, in tab order
+        modified_documents = sorted(self.documents.modified(), key=lambda document: self.tab_view.indexOf(document.widget))
+        if modified_documents:
             unsaved_tabs = []
-            for index in self.modified_tabs:
-                tab_text = self.tab_view.tabText(index)
+            for document in modified_documents:
+                tab_text = self.tab_view.tabText(self.tab_view.indexOf(document.widget))
                 if tab_text.startswith('• '):
                     tab_text = tab_text[2:]  # Remove the dot for display
                 unsaved_tabs.append(tab_text)
@@ -2774,11 +5276,9 @@ STDERR->autoflush(1);
                     )
                     
                     if reply == QMessageBox.Save:
-                        # Find the index in modified_tabs and save it
-                        for index in self.modified_tabs:
-                            self.tab_view.setCurrentIndex(index)
-                            self.save_file()
-                            break
+                        # Save the one modified document
+                        self.tab_view.setCurrentWidget(modified_documents[0].widget)
+                        self.save_file(wait=True)
                     elif reply == QMessageBox.Cancel:
                         event.ignore()
                         return
@@ -2798,16 +5298,33 @@ STDERR->autoflush(1);
                     
                     if reply == QMessageBox.SaveAll:
                         # Save all modified tabs
-                        for index in sorted(self.modified_tabs):
-                            self.tab_view.setCurrentIndex(index)
-                            self.save_file()
+                        for document in modified_documents:
+                            self.tab_view.setCurrentWidget(document.widget)
+                            self.save_file(wait=True)
                     elif reply == QMessageBox.Cancel:
                         event.ignore()
                         return
         
+        # Stop searching and indexing the project
+        self.find_panel.cancel_search()
+        if self.project_indexer is not None:
+            self.project_indexer.cancel()
+            self.project_indexer.wait()
+        
+        # Stop the warm interpreters
+        self.warm_pool.shutdown()
+        
+        # Stop large files that are still loading
+        for i in range(self.tab_view.count()):
+            self.cancel_large_file_load(self.tab_view.widget(i), wait=True)
+        
+        # Stop the terminal's shell and finish writing its scrollback
+        self.cmd_widget.close_all()
+        
         # Save open files and current directory before closing
         self.save_open_files()
         self.save_last_directory()
+        self.settingsJson.flush()
         
         # Continue with the close event if not cancelled
         event.accept()
@@ -2851,21 +5368,21 @@ STDERR->autoflush(1);
     def load_last_directory(self):
         """Load the last open directory from settings"""
         try:
-            with open(self.settings_path, 'r') as f:
-                settings = json.load(f)
-                last_dir = settings.get('openMainFolder')
-                if last_dir and os.path.exists(last_dir):
-                    # If there's a valid saved directory, open it
-                    self.model.setRootPath(last_dir)
-                    self.tree_view.setRootIndex(self.model.index(last_dir))
-                    self.tree_view.show()
-                    self.open_folder_btn.hide()
-                    self.statusBar().showMessage(f"Loaded last directory: {last_dir}")
-                else:
-                    # If no valid directory is saved, show Open Folder button
-                    self.tree_view.hide()
-                    self.open_folder_btn.show()
-                    self.statusBar().showMessage("No directory loaded")
+            # Already in memory, no need to read settings.json again
+            last_dir = self.settingsJson.get('openMainFolder')
+            if last_dir and os.path.exists(last_dir):
+                # If there's a valid saved directory, open it
+                self.model.setRootPath(last_dir)
+                self.tree_view.setRootIndex(self.model.path_index(last_dir))
+                self.start_project_index(last_dir)
+                self.tree_view.show()
+                self.open_folder_btn.hide()
+                self.statusBar().showMessage(f"Loaded last directory: {last_dir}")
+            else:
+                # If no valid directory is saved, show Open Folder button
+                self.tree_view.hide()
+                self.open_folder_btn.show()
+                self.statusBar().showMessage("No directory loaded")
         except Exception as e:
             print(f"Error loading last directory: {e}")
             # If there's an error, show Open Folder button
@@ -2880,46 +5397,1126 @@ STDERR->autoflush(1);
             current_dir = self.model.filePath(self.tree_view.rootIndex())
             if current_dir:
                 self.settingsJson['openMainFolder'] = current_dir
-                with open(self.settings_path, 'w') as file:
-                    json.dump(self.settingsJson, file, indent=2)
 
     def load_output_and_terminal_cache(self):
-        # Load Output tab content
+        # Load Output tab content, only the most recent runs are shown, older ones are in Run History
         if os.path.exists(self.output_cache_path):
             try:
-                with open(self.output_cache_path, 'r', encoding='utf-8') as f:
-                    self.output_widget.setPlainText(f.read())
+                recent_runs = self.run_log.recent(self.RESTORED_RUNS)
+                start = recent_runs[0]["offset"] if recent_runs else 0
+                with open(self.output_cache_path, 'rb') as f:
+                    f.seek(0, os.SEEK_END)
+                    size = f.tell()
+                    if size - start > self.MAX_RESTORED_OUTPUT:
+                        # Start at the first full line of the tail
+                        f.seek(size - self.MAX_RESTORED_OUTPUT)
+                        f.readline()
+                        start = f.tell()
+                    f.seek(start)
+                    self.output_widget.setPlainText(f.read().decode('utf-8', errors='replace'))
+                self.output_base_offset = start
             except Exception:
                 pass
-        # Load Terminal tab content
-        if os.path.exists(self.terminal_cache_path):
+            self.build_output_index()
+        # Terminal tab content is restored when the terminal is first shown, new lines go to the cache
+        if not hasattr(self, 'cmd_widget'):
+            return
+        if self.cmd_widget.cache_directory is None:
+            self.import_legacy_terminal_cache()
+            line_count = max(self.cmd_widget.current_terminal().visible_rows(), 25) * self.RESTORED_TERMINAL_SCREENS
+            self.cmd_widget.set_cache_directory(self.terminal_cache_dir, line_count)
+
+    def import_legacy_terminal_cache(self):
+        """Move the scrollback of older versions into the first session: shared segments and terminal_cache.txt"""
+        first_session = os.path.join(self.terminal_cache_dir, "session-1")
+        shared_segments = TerminalCache(self.terminal_cache_dir).segments()
+        if shared_segments and not os.path.exists(first_session):
             try:
-                with open(self.terminal_cache_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    self.cmd_widget.setPlainText(content)
-                    # Always show the shell prompt at the end
-                    last_line = content.splitlines()[-1] if content.splitlines() else ''
-                    prompt = f"{self.cmd_widget.current_directory}>" if self.cmd_widget.current_directory else ">"
-                    if not last_line.strip().endswith(prompt):
-                        self.cmd_widget.append(prompt)
-            except Exception:
-                pass
+                os.makedirs(first_session)
+                for path in shared_segments:
+                    os.replace(path, os.path.join(first_session, os.path.basename(path)))
+            except OSError as e:
+                print(f"Error importing terminal cache: {e}")
+        if not os.path.exists(self.terminal_cache_path):
+            return
+        try:
+            with open(self.terminal_cache_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                start = max(0, f.tell() - TerminalCache.SEGMENT_BYTES)
+                f.seek(start)
+                if start:
+                    f.readline()
+                content = f.read().decode('utf-8', errors='replace')
+            lines = content.splitlines()
+            if lines:
+                cache = TerminalCache(first_session)
+                cache.write("\n".join(lines) + "\n")
+                cache.close()
+            os.remove(self.terminal_cache_path)
+        except OSError as e:
+            print(f"Error importing terminal cache: {e}")
 
-class ImageViewer(QWidget):
-    def __init__(self, image_path, parent=None):
-        super().__init__(parent)
-        self.image_path = image_path
-        self.pixmap = QPixmap(image_path)
-        self.scale_factor = 1.0
+class LineLexer(QsciLexerCustom):
+    """
+    Base of the lightweight sequence file lexers: each line is styled on its own from its bytes
+    """
+    LANGUAGE = "Text"
+    STYLES = ["Default"]
+    Default = 0
 
-        self.label = QLabel()
-        self.label.setAlignment(Qt.AlignCenter)
-        self.label.setPixmap(self.pixmap)
-        self.label.setBackgroundRole(QPalette.Base)
-        self.label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
-        # self.label.setScaledContents(True)  # REMOVE THIS: do not auto-fit
+    def language(self):
+        return self.LANGUAGE
 
-        self.scroll = QScrollArea()
+    def description(self, style):
+        return self.STYLES[style] if 0 <= style < len(self.STYLES) else ""
+
+    def styleText(self, start, end):
+        editor = self.editor()
+        if editor is None:
+            return
+        # Restart at the beginning of the line, positions are byte offsets
+        line_number = editor.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, start)
+        start = editor.SendScintilla(QsciScintilla.SCI_POSITIONFROMLINE, line_number)
+        data = editor.bytes(start, end)
+        data.chop(1)  # Terminating NUL
+        self.startStyling(start)
+        lines = bytes(data).split(b"\n")
+        for index, line in enumerate(lines):
+            for length, style in self.style_line(line, line_number + index):
+                if length:
+                    self.setStyling(length, style)
+            if index < len(lines) - 1:
+                self.setStyling(1, self.Default)
+
+    def style_line(self, line, line_number):
+        """(length, style) spans covering the line"""
+        return [(len(line), self.Default)]
+
+class FastaLexer(LineLexer):
+    LANGUAGE = "FASTA"
+    STYLES = ["Default", "Header", "Comment"]
+    Header = 1
+    Comment = 2
+
+    def style_line(self, line, line_number):
+        if line.startswith(b">"):
+            return [(len(line), self.Header)]
+        if line.startswith(b";"):
+            return [(len(line), self.Comment)]
+        return [(len(line), self.Default)]
+
+class FastqLexer(LineLexer):
+    """Four-line records: @header, sequence, + separator, quality"""
+    LANGUAGE = "FASTQ"
+    STYLES = ["Default", "Header", "Separator", "Quality"]
+    Header = 1
+    Separator = 2
+    Quality = 3
+
+    def style_line(self, line, line_number):
+        part = line_number % 4
+        if part == 0 and line.startswith(b"@"):
+            return [(len(line), self.Header)]
+        if part == 2 and line.startswith(b"+"):
+            return [(len(line), self.Separator)]
+        if part == 3:
+            return [(len(line), self.Quality)]
+        return [(len(line), self.Default)]
+
+class GenBankLexer(LineLexer):
+    LANGUAGE = "GenBank"
+    STYLES = ["Default", "Keyword", "FeatureKey", "Qualifier", "String", "Number"]
+    Keyword = 1
+    FeatureKey = 2
+    Qualifier = 3
+    String = 4
+    Number = 5
+    KEYWORD_PATTERN = re.compile(rb'^ {0,3}[A-Z][A-Z]+|^//')
+    FEATURE_PATTERN = re.compile(rb'^ {5}(\S+)')
+    QUALIFIER_PATTERN = re.compile(rb'^ {21}(/\w+=?)')
+    SEQUENCE_PATTERN = re.compile(rb'^ *\d+')
+
+    def style_line(self, line, line_number):
+        length = len(line)
+        match = self.KEYWORD_PATTERN.match(line)
+        if match:
+            return [(match.end(), self.Keyword), (length - match.end(), self.Default)]
+        match = self.QUALIFIER_PATTERN.match(line)
+        if match:
+            value = length - match.end()
+            value_style = self.String if line[match.end():match.end() + 1] == b'"' else self.Default
+            return [(match.start(1), self.Default), (match.end() - match.start(1), self.Qualifier), (value, value_style)]
+        match = self.FEATURE_PATTERN.match(line)
+        if match:
+            return [(match.start(1), self.Default), (match.end() - match.start(1), self.FeatureKey), (length - match.end(), self.Default)]
+        match = self.SEQUENCE_PATTERN.match(line)
+        if match:
+            return [(match.end(), self.Number), (length - match.end(), self.Default)]
+        return [(length, self.Default)]
+
+class LanguageRegistry:
+    """
+    Maps file extensions and shebang interpreters to languages and their lexer classes
+    """
+    PLAIN_TEXT = "text"
+    # Files above this size are not lexed whatever their type
+    MAX_LEXED_BYTES = 5 * 1024 * 1024
+
+    def __init__(self):
+        self.lexer_classes = {self.PLAIN_TEXT: None}
+        self.extensions = {}
+        self.interpreters = {}
+
+    @classmethod
+    def default(cls):
+        registry = cls()
+        registry.register("python", QsciLexerPython, (".py", ".pyw"), ("python",))
+        registry.register("perl", QsciLexerPerl, (".pl", ".pm", ".t", ".cgi"), ("perl",))
+        registry.register("bash", QsciLexerBash, (".sh", ".bash", ".zsh", ".ksh"), ("sh", "bash", "zsh", "ksh", "dash"))
+        registry.register("json", QsciLexerJSON, (".json", ".geojson", ".ipynb"))
+        registry.register("yaml", QsciLexerYAML, (".yaml", ".yml"))
+        registry.register("fasta", FastaLexer, (".fa", ".fasta", ".fna", ".faa", ".ffn", ".frn", ".fas", ".mpfa"))
+        registry.register("fastq", FastqLexer, (".fq", ".fastq"))
+        registry.register("genbank", GenBankLexer, (".gb", ".gbk", ".gbff", ".genbank"))
+        return registry
+
+    def register(self, language, lexer_class, extensions=(), interpreters=()):
+        self.lexer_classes[language] = lexer_class
+        for extension in extensions:
+            self.extensions[extension.lower()] = language
+        for interpreter in interpreters:
+            self.interpreters[interpreter] = language
+
+    def lexer_class(self, language):
+        return self.lexer_classes.get(language)
+
+    def detect(self, path=None, first_line="", size=0):
+        """Language for a file: by extension, then shebang, plain text when unknown or too big to lex"""
+        if size > self.MAX_LEXED_BYTES:
+            return self.PLAIN_TEXT
+        language = self.extensions.get(os.path.splitext(path)[1].lower()) if path else None
+        if language is None and first_line.startswith("#!"):
+            language = self.for_shebang(first_line)
+        return language or self.PLAIN_TEXT
+
+    def for_shebang(self, line):
+        parts = line[2:].split()
+        if not parts:
+            return None
+        interpreter = os.path.basename(parts[0])
+        if interpreter == "env":
+            # "#!/usr/bin/env -S python3 -u"
+            interpreter = next((part for part in parts[1:] if not part.startswith("-")), "")
+        # python3, perl5.36
+        return self.interpreters.get(interpreter.rstrip("0123456789."))
+
+# Editor colors per theme: the editor chrome and the token colors of each language's lexer
+EDITOR_THEMES = {
+    "dark": {
+        "paper": "#2f343e",
+        "text": "#ffffff",
+        "caret": "#ffffff",
+        "caretLine": "#363b45",
+        "marginPaper": "#2f343e",
+        "marginText": "#ffffff",
+        "python": {
+            "Keyword": "#ff0000",
+            "Comment": "#008000",
+            "DoubleQuotedString": "#008000",
+            "SingleQuotedString": "#008000",
+            "Identifier": "#ffa500",
+            "Operator": "pink",
+            "ClassName": "cyan",
+            "FunctionMethodName": "yellow",
+        },
+        "perl": {
+            "Identifier": "#ffa500",
+            "Keyword": "#ff0000",
+            "Comment": "#008000",
+            "POD": "#008000",
+            "DoubleQuotedString": "#008000",
+            "Scalar": "#008000",
+            "Hash": "#008000",
+            "Array": "#ffa500",
+            "Operator": "pink",
+        },
+        "bash": {
+            "Keyword": "#ff0000",
+            "Comment": "#008000",
+            "DoubleQuotedString": "#98c379",
+            "SingleQuotedString": "#98c379",
+            "Scalar": "#ffa500",
+            "ParameterExpansion": "#ffa500",
+            "Backticks": "cyan",
+            "Number": "#d19a66",
+            "Operator": "pink",
+            "Error": "#ff5555",
+        },
+        "json": {
+            "Property": "#ffa500",
+            "String": "#98c379",
+            "UnclosedString": "#ff5555",
+            "Number": "#d19a66",
+            "Keyword": "#ff0000",
+            "Operator": "pink",
+            "CommentLine": "#008000",
+            "CommentBlock": "#008000",
+            "Error": "#ff5555",
+        },
+        "yaml": {
+            "Identifier": "#ffa500",
+            "Keyword": "#ff0000",
+            "Number": "#d19a66",
+            "Comment": "#008000",
+            "Reference": "cyan",
+            "DocumentDelimiter": "yellow",
+            "TextBlockMarker": "pink",
+            "Operator": "pink",
+            "SyntaxErrorMarker": "#ff5555",
+        },
+        "fasta": {
+            "Header": "yellow",
+            "Comment": "#008000",
+        },
+        "fastq": {
+            "Header": "yellow",
+            "Separator": "pink",
+            "Quality": "#7f8796",
+        },
+        "genbank": {
+            "Keyword": "#ff0000",
+            "FeatureKey": "cyan",
+            "Qualifier": "#ffa500",
+            "String": "#98c379",
+            "Number": "#7f8796",
+        },
+    },
+    "light": {
+        "paper": "#ffffff",
+        "text": "#1f2328",
+        "caret": "#000000",
+        "caretLine": "#eef1f5",
+        "marginPaper": "#f0f2f5",
+        "marginText": "#6e7781",
+        "python": {
+            "Keyword": "#cf222e",
+            "Comment": "#1a7f37",
+            "DoubleQuotedString": "#0a3069",
+            "SingleQuotedString": "#0a3069",
+            "Identifier": "#953800",
+            "Operator": "#8250df",
+            "ClassName": "#0550ae",
+            "FunctionMethodName": "#8250df",
+        },
+        "perl": {
+            "Identifier": "#953800",
+            "Keyword": "#cf222e",
+            "Comment": "#1a7f37",
+            "POD": "#1a7f37",
+            "DoubleQuotedString": "#0a3069",
+            "Scalar": "#116329",
+            "Hash": "#116329",
+            "Array": "#953800",
+            "Operator": "#8250df",
+        },
+        "bash": {
+            "Keyword": "#cf222e",
+            "Comment": "#1a7f37",
+            "DoubleQuotedString": "#0a3069",
+            "SingleQuotedString": "#0a3069",
+            "Scalar": "#953800",
+            "ParameterExpansion": "#953800",
+            "Backticks": "#0550ae",
+            "Number": "#0550ae",
+            "Operator": "#8250df",
+            "Error": "#d1242f",
+        },
+        "json": {
+            "Property": "#953800",
+            "String": "#0a3069",
+            "UnclosedString": "#d1242f",
+            "Number": "#0550ae",
+            "Keyword": "#cf222e",
+            "Operator": "#8250df",
+            "CommentLine": "#1a7f37",
+            "CommentBlock": "#1a7f37",
+            "Error": "#d1242f",
+        },
+        "yaml": {
+            "Identifier": "#953800",
+            "Keyword": "#cf222e",
+            "Number": "#0550ae",
+            "Comment": "#1a7f37",
+            "Reference": "#0550ae",
+            "DocumentDelimiter": "#8250df",
+            "TextBlockMarker": "#8250df",
+            "Operator": "#8250df",
+            "SyntaxErrorMarker": "#d1242f",
+        },
+        "fasta": {
+            "Header": "#0550ae",
+            "Comment": "#1a7f37",
+        },
+        "fastq": {
+            "Header": "#0550ae",
+            "Separator": "#8250df",
+            "Quality": "#6e7781",
+        },
+        "genbank": {
+            "Keyword": "#cf222e",
+            "FeatureKey": "#0550ae",
+            "Qualifier": "#953800",
+            "String": "#0a3069",
+            "Number": "#6e7781",
+        },
+    },
+}
+
+class LexerRegistry:
+    """
+    Lexers built and colored once per (language, theme) and shared by every editor of that language.
+    Custom lexers style the editor they are attached to, so those are built per editor
+    """
+    def __init__(self, font, languages):
+        self.font = font
+        self.languages = languages
+        self.lexers = {}
+
+    def lexer(self, language, theme, editor=None):
+        """Lexer for an editor of the language, None for plain text"""
+        lexer_class = self.languages.lexer_class(language)
+        if lexer_class is None:
+            return None
+        if issubclass(lexer_class, QsciLexerCustom):
+            # Owned by its editor, nothing else keeps it alive
+            return self.build(lexer_class, language, theme, editor)
+        key = (language, theme)
+        lexer = self.lexers.get(key)
+        if lexer is None:
+            lexer = self.lexers[key] = self.build(lexer_class, language, theme)
+        return lexer
+
+    def build(self, lexer_class, language, theme, parent=None):
+        colors = EDITOR_THEMES.get(theme, EDITOR_THEMES["dark"])
+        lexer = lexer_class(parent)
+        lexer.setFont(self.font)
+        lexer.setDefaultFont(self.font)
+        # Default color for every style first, then the token colors
+        lexer.setColor(QColor(colors["text"]))
+        for style_name, color in colors.get(language, {}).items():
+            lexer.setColor(QColor(color), getattr(lexer_class, style_name))
+        lexer.setDefaultPaper(QColor(colors["paper"]))
+        lexer.setPaper(QColor(colors["paper"]))
+        return lexer
+
+    @staticmethod
+    def apply_chrome(editor, theme):
+        """Margin, caret and, for editors without a lexer, text colors"""
+        colors = EDITOR_THEMES.get(theme, EDITOR_THEMES["dark"])
+        if editor.lexer() is None:
+            editor.setPaper(QColor(colors["paper"]))
+            editor.setColor(QColor(colors["text"]))
+        editor.setMarginsBackgroundColor(QColor(colors["marginPaper"]))
+        editor.setMarginsForegroundColor(QColor(colors["marginText"]))
+        editor.setCaretForegroundColor(QColor(colors["caret"]))
+        editor.setCaretLineBackgroundColor(QColor(colors["caretLine"]))
+
+class Document:
+    """
+    An open tab: its widget, file and modified state, identified by an id that survives tab moves and closes
+    """
+    def __init__(self, document_id, widget, path=None):
+        self.id = document_id
+        self.widget = widget
+        self.path = path  # Absolute path, None for untitled files
+        self.modified = False
+        # Encoding the file was read with and whether it had a BOM, saves write it back the same way
+        self.encoding = 'utf-8'
+        self.bom = False
+        # Background save state: one save in flight per document, a newer request waits for it
+        self.saving = False
+        self.save_queued = False
+        self.saved_revision = -1
+
+class DocumentRegistry:
+    """
+    Open documents by id, indexed by widget and by normalized path for O(1) lookups
+    """
+    def __init__(self):
+        self.documents = {}
+        self.by_widget = {}
+        self.by_path = {}
+        self.next_id = 1
+
+    def __iter__(self):
+        return iter(self.documents.values())
+
+    def __len__(self):
+        return len(self.documents)
+
+    @staticmethod
+    def path_key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def add(self, widget, path=None):
+        document = Document(self.next_id, widget, path)
+        self.next_id += 1
+        self.documents[document.id] = document
+        self.by_widget[widget] = document
+        if path is not None:
+            self.by_path[self.path_key(path)] = document
+        return document
+
+    def remove(self, document):
+        self.documents.pop(document.id, None)
+        self.by_widget.pop(document.widget, None)
+        if document.path is not None and self.by_path.get(self.path_key(document.path)) is document:
+            del self.by_path[self.path_key(document.path)]
+
+    def clear(self):
+        self.documents.clear()
+        self.by_widget.clear()
+        self.by_path.clear()
+
+    def get(self, document_id):
+        return self.documents.get(document_id)
+
+    def for_widget(self, widget):
+        return self.by_widget.get(widget) if widget is not None else None
+
+    def for_path(self, path):
+        return self.by_path.get(self.path_key(path))
+
+    def set_path(self, document, path):
+        """Point a document at a new file, e.g. after Save As or a rename"""
+        if document.path is not None and self.by_path.get(self.path_key(document.path)) is document:
+            del self.by_path[self.path_key(document.path)]
+        document.path = path
+        if path is not None:
+            self.by_path[self.path_key(path)] = document
+
+    def modified(self):
+        return [document for document in self.documents.values() if document.modified]
+
+class LargeFileLoader(QThread):
+    """
+    Streams a memory-mapped file to an editor in line-aligned chunks of UTF-8 for SCI_APPENDTEXT
+    """
+    chunk_loaded = pyqtSignal(bytes, int)  # UTF-8 data, bytes of the file read so far
+    restarted = pyqtSignal(str)  # the file did not decode, loading again with this encoding
+    loaded = pyqtSignal(str)  # encoding of the file
+    failed = pyqtSignal(str)
+
+    CHUNK_BYTES = 1024 * 1024
+    # Chunks handed to the GUI thread but not yet appended, keeps memory bounded
+    MAX_PENDING_CHUNKS = 8
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.cancelled = False
+        self.pending = threading.Semaphore(self.MAX_PENDING_CHUNKS)
+        # CRC-32 of the UTF-8 text handed to the editor, used for dirty tracking
+        self.crc = 0
+        # Line ending of the first line and whether the file starts with a BOM
+        self.eol = "\n"
+        self.bom = False
+
+    def chunk_done(self):
+        """Called by the GUI thread once a chunk is in the editor"""
+        self.pending.release()
+
+    def cancel(self):
+        self.cancelled = True
+        self.pending.release()
+
+    def run(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    self.loaded.emit(TEXT_ENCODINGS[0])
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    newline = data.find(b"\n")
+                    if newline > 0 and data[newline - 1] == 13:
+                        self.eol = "\r\n"
+                    bom = sniff_bom(data[:4])
+                    if bom is not None:
+                        # The BOM names the encoding, nothing to guess
+                        self.bom = True
+                        if self.stream(data, bom[0], bom[1], 'replace'):
+                            self.loaded.emit(bom[0])
+                        return
+                    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+                        self.failed.emit("This file is not readable as text.")
+                        return
+                    for index, encoding in enumerate(TEXT_ENCODINGS):
+                        if index:
+                            self.restarted.emit(encoding)
+                        try:
+                            if self.stream(data, encoding):
+                                self.loaded.emit(encoding)
+                            return
+                        except UnicodeDecodeError:
+                            continue
+        except (OSError, ValueError) as e:
+            self.failed.emit(str(e))
+
+    def stream(self, data, encoding, start=0, errors='strict'):
+        """Emit the whole file chunk by chunk, returns False when cancelled"""
+        size = len(data)
+        position = start
+        self.crc = 0
+        # Chunks end at a line feed byte, which may split a UTF-16/32 character, the decoder carries it over
+        decoder = codecs.getincrementaldecoder(encoding)(errors) if encoding != 'utf-8' or errors != 'strict' else None
+        while position < size:
+            self.pending.acquire()
+            if self.cancelled:
+                return False
+            end = min(size, position + self.CHUNK_BYTES)
+            if end < size:
+                newline = data.rfind(b"\n", position, end)
+                if newline != -1:
+                    end = newline + 1
+                elif encoding == 'utf-8':
+                    # No line break in the chunk, at least do not split a character
+                    while end > position + 1 and data[end] & 0xC0 == 0x80:
+                        end -= 1
+            chunk = data[position:end]
+            if decoder is None:
+                # Only validated, the bytes go to the editor as they are
+                chunk.decode('utf-8')
+            else:
+                chunk = decoder.decode(chunk, end == size).encode('utf-8')
+            self.crc = zlib.crc32(chunk, self.crc)
+            self.chunk_loaded.emit(chunk, end)
+            position = end
+        return True
+
+class SaveSignals(QObject):
+    finished = pyqtSignal(int, int, int, object, str, str)  # document id, revision, length, CRC-32, encoding written, path
+    failed = pyqtSignal(int, str, str)  # document id, error, path
+
+class SaveTask(QRunnable):
+    """
+    Writes a snapshot of an editor to disk atomically: temp file in the same folder, fsync, os.replace
+    """
+    def __init__(self, document_id, revision, path, data, encoding, bom=False):
+        super().__init__()
+        self.document_id = document_id
+        self.revision = revision
+        self.path = path
+        # UTF-8 bytes of the editor, transcoded here rather than on the GUI thread
+        self.data = data
+        self.encoding = encoding
+        self.bom = bom
+        self.error = None
+        self.signals = SaveSignals()
+
+    def run(self):
+        try:
+            crc = zlib.crc32(self.data)
+            encoding = self.encoding
+            if codecs.lookup(encoding).name == 'utf-8':
+                payload = self.data
+            else:
+                text = bytes(self.data).decode('utf-8')
+                try:
+                    payload = text.encode(encoding)
+                except UnicodeEncodeError:
+                    # Characters the original encoding cannot hold, keep them by switching to UTF-8
+                    encoding = 'utf-8'
+                    payload = self.data
+            bom = b""
+            if self.bom:
+                bom = next(mark for mark, name in TEXT_BOMS if name == codecs.lookup(encoding).name)
+            self.write_atomic(self.path, payload, bom)
+        except Exception as e:
+            self.error = str(e)
+            self.signals.failed.emit(self.document_id, self.error, self.path)
+            return
+        self.signals.finished.emit(self.document_id, self.revision, len(self.data), crc, encoding, self.path)
+
+    @staticmethod
+    def write_atomic(path, payload, bom=b""):
+        """Readers see either the old or the new file, never a partial write"""
+        import tempfile
+        import shutil
+        # Through symlinks to the real file, replacing the link itself would leave the target unchanged
+        path = os.path.realpath(path)
+        directory = os.path.dirname(path)
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            info = None
+        if info is not None and (info.st_nlink > 1 or (hasattr(os, 'getuid') and info.st_uid != os.getuid())):
+            # A new inode would split hard links or change the owner, these files are rewritten in place
+            with open(path, 'r+b') as f:
+                f.write(bom)
+                f.write(payload)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+            return
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(bom)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if info is not None:
+                shutil.copymode(path, temp_path)
+            else:
+                # mkstemp creates 0600, new files get the permissions open() would have given them
+                os.chmod(temp_path, 0o666 & ~PROCESS_UMASK)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        if hasattr(os, 'O_DIRECTORY'):
+            # Make the rename itself durable
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError:
+                pass
+
+class SettingsStore(QObject):
+    """
+    settings.json held in memory, changes are coalesced and written atomically in the background
+    """
+    WRITE_DELAY_MS = 500
+    changed = pyqtSignal(str)  # top-level key that was set
+    write_failed = pyqtSignal(str)
+
+    def __init__(self, path, defaults=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.dirty = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.WRITE_DELAY_MS)
+        self.timer.timeout.connect(self.write_later)
+        # A single writer so writes reach the disk in the order they were made
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        try:
+            with open(self.path, 'r') as file:
+                self.data = json.load(file)
+        except FileNotFoundError:
+            # First run, the defaults are written out like any other change
+            self.data = defaults if defaults is not None else {}
+            self.mark_dirty()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        if key in self.data and self.data[key] == value:
+            return  # Nothing to write
+        self.data[key] = value
+        self.mark_dirty(key)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, **values):
+        for key, value in values.items():
+            self[key] = value
+
+    def mark_dirty(self, key=None):
+        """Schedule a write, for nested values changed in place pass their top-level key"""
+        self.dirty = True
+        self.timer.start()
+        if key is not None:
+            self.changed.emit(key)
+
+    def write_later(self):
+        if not self.dirty:
+            return
+        # Serialized here so the writer never sees a dict that is still being changed
+        payload = json.dumps(self.data, indent=2).encode('utf-8')
+        self.dirty = False
+        self.pool.start(lambda: self.write(payload))
+
+    def write(self, payload):
+        try:
+            SaveTask.write_atomic(self.path, payload)
+        except OSError as e:
+            self.write_failed.emit(str(e))
+
+    def flush(self):
+        """Write pending changes now and wait for them, used on exit"""
+        self.timer.stop()
+        self.write_later()
+        self.pool.waitForDone()
+
+class PendingTab(QLabel):
+    """Placeholder for a restored tab, the file is only read once the tab is activated"""
+    def __init__(self, path, parent=None):
+        super().__init__(f"Loading {os.path.basename(path)}...", parent)
+        self.path = path
+        self.setAlignment(Qt.AlignCenter)
+
+class IgnoreRules:
+    """
+    .gitignore style patterns, the last matching pattern decides and "!" patterns bring paths back
+    """
+    DEFAULT_PATTERNS = [".git/", "node_modules/", "__pycache__/", ".venv/", "*.pyc", ".DS_Store"]
+
+    def __init__(self, patterns=()):
+        # (regex, negated, directories only)
+        self.rules = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    @classmethod
+    def for_project(cls, root, patterns=None):
+        """Configured patterns followed by the project's top-level .gitignore"""
+        rules = cls(cls.DEFAULT_PATTERNS if patterns is None else patterns)
+        try:
+            with open(os.path.join(root, ".gitignore"), 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    rules.add(line)
+        except OSError:
+            pass
+        return rules
+
+    def add(self, pattern):
+        pattern = pattern.rstrip("\r\n")
+        if not pattern.strip() or pattern.startswith("#"):
+            return
+        pattern = pattern.rstrip(" ")
+        negated = pattern.startswith("!")
+        if negated:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\"):
+            pattern = pattern[1:]  # Escaped leading "!" or "#"
+        directories_only = pattern.endswith("/")
+        if directories_only:
+            pattern = pattern[:-1]
+        # A slash anywhere but the end ties the pattern to the project root, otherwise it matches at any depth
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if not pattern:
+            return
+        regex = self.translate(pattern)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self.rules.append((re.compile(regex + r"\Z"), negated, directories_only))
+
+    @staticmethod
+    def translate(pattern):
+        """Glob to regex where * and ? stop at slashes and ** crosses them"""
+        parts = []
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if pattern.startswith("**/", i):
+                parts.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("**", i):
+                parts.append(".*")
+                i += 2
+            elif c == "*":
+                parts.append("[^/]*")
+                i += 1
+            elif c == "?":
+                parts.append("[^/]")
+                i += 1
+            elif c == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 2) if pattern[i + 1:i + 2] == "]" else pattern.index("]", i + 1)
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end + 1
+            else:
+                parts.append(re.escape(c))
+                i += 1
+        return "".join(parts)
+
+    def ignored(self, relative_path, is_dir=False):
+        """relative_path uses forward slashes and is relative to the project root"""
+        ignored = False
+        for regex, negated, directories_only in self.rules:
+            if directories_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                ignored = not negated
+        return ignored
+
+class ProjectTreeModel(QSortFilterProxyModel):
+    """
+    File tree of one project folder: ignored paths are filtered out, directories are read when
+    expanded and file watching stops once MAX_WATCHED_DIRS have been loaded
+    """
+    MAX_WATCHED_DIRS = 2000
+    watching_stopped = pyqtSignal(int)
+
+    def __init__(self, parent=None, patterns=None):
+        super().__init__(parent)
+        self.patterns = patterns
+        self.rules = IgnoreRules()
+        self.root = None  # Until a folder is set, "" is the filesystem root
+        self.loaded_dirs = set()
+        self.source = QFileSystemModel(self)
+        self.source.setReadOnly(True)
+        self.source.directoryLoaded.connect(self.directory_loaded)
+        self.setSourceModel(self.source)
+
+    def setRootPath(self, path):
+        """Scope the tree to path and re-read .gitignore, a new folder also resumes watching"""
+        root = QDir.fromNativeSeparators(os.path.abspath(path)).rstrip("/")
+        self.rules = IgnoreRules.for_project(path, self.patterns)
+        if root != self.root:
+            # The same folder again (a refresh after a file operation) keeps its loaded directories
+            # and watching state, or the watch cap would never be reached
+            self.root = root
+            self.loaded_dirs.clear()
+            self.source.setOption(QFileSystemModel.DontWatchForChanges, False)
+            self.source.setRootPath(path)
+        self.invalidateFilter()
+
+    def rootPath(self):
+        return self.source.rootPath()
+
+    def filePath(self, index):
+        return self.source.filePath(self.mapToSource(index))
+
+    def isDir(self, index):
+        return self.source.isDir(self.mapToSource(index))
+
+    def path_index(self, path):
+        return self.mapFromSource(self.source.index(path))
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.root:
+            return True
+        index = self.source.index(source_row, 0, source_parent)
+        path = self.source.filePath(index)
+        if not path.startswith(self.root + "/"):
+            return True  # The root itself and the folders above it
+        return not self.rules.ignored(path[len(self.root) + 1:], self.source.isDir(index))
+
+    def directory_loaded(self, path):
+        if self.source.testOption(QFileSystemModel.DontWatchForChanges):
+            return
+        self.loaded_dirs.add(path)
+        if len(self.loaded_dirs) > self.MAX_WATCHED_DIRS:
+            # Every loaded directory holds a watch, past the cap the tree is refreshed by hand
+            self.source.setOption(QFileSystemModel.DontWatchForChanges, True)
+            self.watching_stopped.emit(len(self.loaded_dirs))
+
+# Set bits of every byte value, for walking the ids in a FileIndex bitset
+BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+NONZERO_BYTE = re.compile(rb'[^\x00]')
+
+class FileIndex:
+    """
+    Project-relative paths for Go to File. Ids are handed out shortest path first and results are
+    ranked by how the query matches, then by id: as a file name prefix, inside the file name, inside
+    the path, in order within the file name, in order anywhere in the path. Substring matches are
+    found with str.find over all names or paths joined, the in order matches from a bitset of path
+    ids per character (and per doubled character) of the path and of the file name. Only the last,
+    weakest kind stops early when a search runs out of time
+    """
+    SEARCH_SECONDS = 0.008
+
+    def __init__(self, root, paths=()):
+        self.root = root
+        self.paths = []  # None where a path was removed, ids are never reused
+        # NUL and the lowered path or file name per id, a lone NUL where a path was removed
+        self.path_rows = []
+        self.name_rows = []
+        self.ids = {}
+        self.char_bytes = {}  # key -> bytearray bitset, the bits of path id i are in byte i // 8
+        self.char_bits = {}  # same bitsets as ints for fast intersection, rebuilt when stale
+        self.stale = set()
+        self.texts = None  # joined rows and the offset of each row, rebuilt after changes
+        for path in sorted(paths, key=lambda path: (len(path), path)):
+            self.add(path)
+        self.joined()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, path):
+        if path in self.ids:
+            return
+        path_id = len(self.paths)
+        self.paths.append(path)
+        lowered = path.lower()
+        name = lowered[lowered.rfind("/") + 1:]
+        self.path_rows.append("\0" + lowered)
+        self.name_rows.append("\0" + name)
+        self.ids[path] = path_id
+        self.texts = None
+        byte, bit = path_id >> 3, 1 << (path_id & 7)
+        for c in self.row_keys(lowered, name):
+            bits = self.char_bytes.get(c)
+            if bits is None:
+                bits = self.char_bytes[c] = bytearray()
+            if len(bits) <= byte:
+                bits.extend(bytes(max(byte + 1 - len(bits), len(bits))))
+            bits[byte] |= bit
+            self.stale.add(c)
+
+    def remove(self, path):
+        path_id = self.ids.pop(path, None)
+        if path_id is None:
+            return
+        byte, bit = path_id >> 3, 1 << (path_id & 7)
+        for c in self.row_keys(self.path_rows[path_id][1:], self.name_rows[path_id][1:]):
+            self.char_bytes[c][byte] &= ~bit
+            self.stale.add(c)
+        self.paths[path_id] = None
+        self.path_rows[path_id] = "\0"
+        self.name_rows[path_id] = "\0"
+        self.texts = None
+
+    @staticmethod
+    def keys(text):
+        """Bitset keys of a path or query: each character, and the character twice if it repeats"""
+        keys = set(text)
+        keys.update([c + c for c in keys if text.count(c) > 1])
+        return keys
+
+    @classmethod
+    def row_keys(cls, lowered, name):
+        """Keys of the path, and the keys of the file name behind a slash, which no name contains"""
+        return cls.keys(lowered) | {"/" + c for c in cls.keys(name)}
+
+    def remove_tree(self, directory):
+        """Remove everything below a directory"""
+        prefix = directory + "/"
+        for path in [path for path in self.ids if path.startswith(prefix)]:
+            self.remove(path)
+
+    def bits(self, c):
+        if c in self.stale:
+            self.char_bits[c] = int.from_bytes(self.char_bytes[c], 'little')
+            self.stale.discard(c)
+        return self.char_bits.get(c, 0)
+
+    def mask(self, keys):
+        mask = -1
+        for c in keys:
+            mask &= self.bits(c)
+            if not mask:
+                break
+        return mask
+
+    def joined(self):
+        """The name and path rows joined, each with the offsets where its rows start"""
+        if self.texts is None:
+            self.texts = [("".join(rows), list(accumulate(map(len, rows), initial=0)))
+                          for rows in (self.name_rows, self.path_rows)]
+        return self.texts
+
+    def search(self, query, limit=50):
+        """Paths containing the query characters in order, best first"""
+        query = "".join(query.lower().replace("\\", "/").split())
+        if not query:
+            return [path for path in self.paths[:limit * 2] if path is not None][:limit]
+        found = []
+        seen = set()
+
+        def take(path_id):
+            if path_id not in seen:
+                seen.add(path_id)
+                found.append(path_id)
+            return len(found) >= limit
+
+        names, paths = self.joined()
+        for needle, (text, starts) in (("\0" + query, names), (query, names), (query, paths)):
+            position = text.find(needle)
+            while position != -1:
+                path_id = bisect.bisect_right(starts, position) - 1
+                if take(path_id):
+                    return [self.paths[path_id] for path_id in found]
+                position = text.find(needle, starts[path_id + 1])
+        # [^c]*c per character matches a subsequence without backtracking
+        pattern = re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in query))
+        keys = self.keys(query)
+        for rows, mask, deadline in ((self.name_rows, self.mask("/" + c for c in keys), None),
+                                     (self.path_rows, self.mask(keys), time.perf_counter() + self.SEARCH_SECONDS)):
+            data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+            for match in NONZERO_BYTE.finditer(data):
+                base = match.start() * 8
+                for bit in BYTE_BITS[data[match.start()]]:
+                    if pattern.match(rows[base + bit], 1) is not None and take(base + bit):
+                        return [self.paths[path_id] for path_id in found]
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+        return [self.paths[path_id] for path_id in found]
+
+class ProjectIndexer(QThread):
+    """Walks a project folder once with os.scandir, skipping ignored paths and not following links"""
+    indexed = pyqtSignal(object)  # FileIndex
+
+    def __init__(self, root, rules, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.rules = rules
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        paths = list(self.walk(self.root, self.rules, lambda: self.cancelled))
+        if not self.cancelled:
+            self.indexed.emit(FileIndex(self.root, paths))
+
+    @staticmethod
+    def walk(root, rules, cancelled=lambda: False):
+        """Project-relative paths of the files below root that the rules keep"""
+        pending = [""]
+        while pending and not cancelled():
+            directory = pending.pop()
+            try:
+                with os.scandir(os.path.join(root, directory)) as entries:
+                    for entry in entries:
+                        path = f"{directory}/{entry.name}" if directory else entry.name
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if rules.ignored(path, is_dir):
+                            continue
+                        if is_dir:
+                            pending.append(path)
+                        else:
+                            yield path
+            except OSError:
+                continue  # Unreadable folder, index the rest
+
+class ImageViewer(QWidget):
+    def __init__(self, image_path, parent=None):
+        super().__init__(parent)
+        self.image_path = image_path
+        self.pixmap = QPixmap(image_path)
+        self.scale_factor = 1.0
+
+        self.label = QLabel()
+        self.label.setAlignment(Qt.AlignCenter)
+        self.label.setPixmap(self.pixmap)
+        self.label.setBackgroundRole(QPalette.Base)
+        self.label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        # self.label.setScaledContents(True)  # REMOVE THIS: do not auto-fit
+
+        self.scroll = QScrollArea()
         self.scroll.setWidget(self.label)
         self.scroll.setWidgetResizable(True)
 
@@ -2985,6 +6582,1249 @@ class ImageViewer(QWidget):
                 return
         super().keyPressEvent(event)
 
+# Runs a script under cProfile or a sampling profiler and writes the stats as JSON.
+# Passed to the interpreter with -c: <mode> <stats path> <script>
+PYTHON_PROFILER_BOOTSTRAP = r'''
+import sys, os, json, runpy, threading, time
+mode, stats_path, script = sys.argv[1:4]
+script = os.path.abspath(script)
+sys.argv = [script]
+sys.path[0] = os.path.dirname(script)
+result = {"mode": mode, "script": script, "functions": [], "stacks": []}
+
+def run_script():
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        return e.code
+    return 0
+
+def write_result():
+    with open(stats_path, "w") as f:
+        json.dump(result, f)
+
+if mode == "cprofile":
+    import cProfile, pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        code = run_script()
+    finally:
+        profiler.disable()
+        for (filename, line, name), (cc, nc, tt, ct, callers) in pstats.Stats(profiler).stats.items():
+            result["functions"].append({
+                "file": filename, "line": line, "name": name, "calls": nc, "tottime": tt, "cumtime": ct,
+                "callers": [[c[0], c[1], c[2], edge[3]] for c, edge in callers.items()]
+            })
+        write_result()
+else:
+    interval = 0.005
+    main_id = threading.get_ident()
+    seconds = {}
+    stop = threading.Event()
+
+    def sample():
+        last = start
+        while not stop.wait(interval):
+            # Each stack gets the time since the previous sample, waits overshoot the interval
+            # when the script holds the GIL
+            now = time.perf_counter()
+            frame = sys._current_frames().get(main_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            seconds[tuple(stack)] = seconds.get(tuple(stack), 0.0) + now - last
+            last = now
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        code = run_script()
+    finally:
+        stop.set()
+        sampler.join()
+        result["wall_time"] = time.perf_counter() - start
+        for stack, elapsed in seconds.items():
+            # Drop the bootstrap and runpy frames above the script's module frame
+            for i, frame in enumerate(stack):
+                if frame[0] == script:
+                    stack = stack[i:]
+                    break
+            result["stacks"].append([[list(frame) for frame in stack], elapsed])
+        write_result()
+sys.exit(code)
+'''
+
+# Line profiler loaded with perl -d:NucleoProf. Everything lives in package DB so the
+# profiler's own statements are not traced. Writes "file, line, calls, exclusive, inclusive"
+# rows (times in seconds) to $ENV{NUCLEOIDE_PROFILE_OUT}, similar to nytprofcsv line reports.
+PERL_PROFILER_MODULE = r'''package DB;
+use strict;
+no strict 'refs';
+use Time::HiRes ();
+
+our ($sub, $trace, $single);
+our (%calls, %exclusive, %sub_time, %active);
+our ($last_file, $last_line, $last_time);
+
+BEGIN {
+    $| = 1;
+    $trace = 1;
+    $last_time = Time::HiRes::time();
+}
+
+sub DB {
+    my $now = Time::HiRes::time();
+    my (undef, $file, $line) = caller;
+    $exclusive{"$last_file\t$last_line"} += $now - $last_time if defined $last_file;
+    $calls{"$file\t$line"}++;
+    ($last_file, $last_line) = ($file, $line);
+    # Don't charge the profiler's own overhead to the line
+    $last_time = Time::HiRes::time();
+}
+
+sub sub {
+    my $key = defined $last_file ? "$last_file\t$last_line" : undef;
+    # Recursive calls from the same line are only timed once
+    my $outer = defined $key && !$active{$key};
+    local $active{$key} = 1 if defined $key;
+    my $start = Time::HiRes::time();
+    my (@ret, $ret);
+    if (wantarray) {
+        @ret = &$sub;
+    } elsif (defined wantarray) {
+        $ret = &$sub;
+    } else {
+        &$sub;
+    }
+    $sub_time{$key} += Time::HiRes::time() - $start if $outer;
+    return wantarray ? @ret : $ret;
+}
+
+END {
+    $exclusive{"$last_file\t$last_line"} += Time::HiRes::time() - $last_time if defined $last_file;
+    my $out = $ENV{NUCLEOIDE_PROFILE_OUT} or return;
+    open(my $fh, '>', $out) or return;
+    print $fh "# file\tline\tcalls\texclusive\tinclusive\n";
+    for my $key (keys %calls) {
+        my $exclusive = $exclusive{$key} || 0;
+        my $inclusive = $exclusive + ($sub_time{$key} || 0);
+        printf $fh "%s\t%d\t%.9f\t%.9f\n", $key, $calls{$key}, $exclusive, $inclusive;
+    }
+    close($fh);
+}
+
+1;
+'''
+
+# Editor margin used for profiler annotations (0 is line numbers, 1 is symbols)
+PROFILE_MARGIN = 2
+
+class PerlProfileParser(QThread):
+    """Worker thread that parses the per-line report written by the Perl line profiler"""
+    loaded = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, profile_dir, script_path=None):
+        super().__init__()
+        self.profile_dir = profile_dir
+        self.script_path = script_path
+
+    def run(self):
+        import shutil
+        files = {}
+        try:
+            with open(os.path.join(self.profile_dir, 'profile.tsv'), 'r', encoding='utf-8', errors='replace') as f:
+                for row in f:
+                    if row.startswith('#'):
+                        continue
+                    parts = row.rstrip('\n').split('\t')
+                    # Skip evals and other pseudo files such as "(eval 12)"
+                    if len(parts) != 5 or parts[0].startswith('('):
+                        continue
+                    file_name, line, calls, exclusive, inclusive = parts
+                    key = os.path.normcase(os.path.abspath(file_name))
+                    files.setdefault(key, {})[int(line)] = (int(calls), float(exclusive), float(inclusive))
+        except OSError:
+            self.error_occurred.emit("No profile was written (the script may have been terminated)")
+            return
+        except ValueError as e:
+            self.error_occurred.emit(f"Could not parse the Perl profile: {e}")
+            return
+        finally:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+        total = sum(exclusive for lines in files.values() for _, exclusive, _ in lines.values())
+        self.loaded.emit({"script": self.script_path, "files": files, "total": total})
+
+class ProfileStatsLoader(QThread):
+    """Worker thread that parses a profiler stats file into a table and a flame tree"""
+    loaded = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    # Flame graph nodes below this share of the total time are pruned
+    MIN_NODE_SHARE = 0.002
+    MAX_DEPTH = 64
+
+    def __init__(self, stats_path, script_path=None):
+        super().__init__()
+        self.stats_path = stats_path
+        self.script_path = script_path
+
+    def run(self):
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.error_occurred.emit(f"No profiler results were written: {e}")
+            return
+        finally:
+            try:
+                os.unlink(self.stats_path)
+            except OSError:
+                pass
+
+        try:
+            script = data.get("script") or self.script_path
+            if data.get("mode") == "cprofile":
+                functions = data["functions"]
+                flame = self.build_call_tree(functions, script)
+            else:
+                functions, flame = self.build_sample_tree(data["stacks"], data.get("wall_time"))
+            self.loaded.emit({
+                "mode": data.get("mode"),
+                "script": script,
+                "functions": functions,
+                "flame": flame
+            })
+        except (KeyError, TypeError, ValueError) as e:
+            self.error_occurred.emit(f"Could not parse profiler results: {e}")
+
+    def build_call_tree(self, functions, script):
+        """Build a flame tree from cProfile's caller graph, splitting time proportionally across call paths"""
+        by_key = {(f["file"], f["line"], f["name"]): f for f in functions}
+        callees = {}
+        for key, function in by_key.items():
+            for caller_file, caller_line, caller_name, edge_time in function["callers"]:
+                callees.setdefault((caller_file, caller_line, caller_name), []).append((key, edge_time))
+
+        # Start at the script's module frame, which hides the bootstrap and runpy frames
+        script_key = os.path.normcase(os.path.abspath(script)) if script else None
+        roots = [key for key in by_key
+                 if key[2] == '<module>' and script_key and os.path.normcase(os.path.abspath(key[0])) == script_key]
+        if not roots:
+            roots = [key for key, function in by_key.items() if not function["callers"]]
+
+        total = sum(by_key[key]["cumtime"] for key in roots)
+        threshold = total * self.MIN_NODE_SHARE
+
+        def expand(key, value, path, depth):
+            function = by_key[key]
+            node = {"name": function["name"], "file": function["file"], "line": function["line"],
+                    "value": value, "children": []}
+            if depth >= self.MAX_DEPTH or not function["cumtime"]:
+                return node
+            scale = value / function["cumtime"]
+            for child, edge_time in sorted(callees.get(key, ()), key=lambda c: -c[1]):
+                child_value = edge_time * scale
+                if child in path or child not in by_key or child_value < threshold:
+                    continue
+                node["children"].append(expand(child, child_value, path | {child}, depth + 1))
+            return node
+
+        children = [expand(key, by_key[key]["cumtime"], {key}, 1) for key in roots]
+        return {"name": "all", "file": "", "line": 0, "value": total, "children": children}
+
+    def build_sample_tree(self, stacks, wall_time=None):
+        """Build the function table and flame tree from sampled stacks and the seconds spent in each"""
+        root = {"name": "all", "file": "", "line": 0, "value": 0.0, "children": [], "index": {}}
+        own = {}
+        cumulative = {}
+        for frames, seconds in stacks:
+            root["value"] += seconds
+            node = root
+            for file_name, line, name in frames:
+                key = (file_name, line, name)
+                child = node["index"].get(key)
+                if child is None:
+                    child = {"name": name, "file": file_name, "line": line, "value": 0.0,
+                             "children": [], "index": {}}
+                    node["index"][key] = child
+                    node["children"].append(child)
+                child["value"] += seconds
+                node = child
+            # Recursive functions are only counted once per stack for cumulative time
+            for key in {tuple(frame) for frame in frames}:
+                cumulative[key] = cumulative.get(key, 0.0) + seconds
+            if frames:
+                leaf = tuple(frames[-1])
+                own[leaf] = own.get(leaf, 0.0) + seconds
+
+        # The run's wall time includes what came after the last sample
+        root["value"] = max(root["value"], wall_time or 0.0)
+
+        def strip_index(node):
+            node.pop("index", None)
+            node["children"].sort(key=lambda c: -c["value"])
+            for child in node["children"]:
+                strip_index(child)
+        strip_index(root)
+
+        functions = [{"file": key[0], "line": key[1], "name": key[2], "calls": None,
+                      "tottime": own.get(key, 0.0), "cumtime": value}
+                     for key, value in cumulative.items()]
+        return functions, root
+
+class FlameGraphWidget(QWidget):
+    """
+    Draws a flame tree as nested frames (root at the top); clicking a frame emits its source location
+    """
+    frame_activated = pyqtSignal(str, int)
+    ROW_HEIGHT = 20
+
+    def __init__(self, root, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.frames = []
+        self.setMouseTracking(True)
+        self.setMinimumHeight((self.tree_depth(root) + 1) * self.ROW_HEIGHT)
+
+    def tree_depth(self, node):
+        return 1 + max((self.tree_depth(child) for child in node["children"]), default=0)
+
+    def layout_frames(self):
+        """Compute the rectangle of every frame wide enough to be visible"""
+        self.frames = []
+        total = self.root["value"] or 1.0
+        width = self.width()
+
+        def place(node, x, depth):
+            node_width = node["value"] / total * width
+            if node_width < 1:
+                return
+            self.frames.append((QRectF(x, depth * self.ROW_HEIGHT, node_width, self.ROW_HEIGHT - 1), node))
+            child_x = x
+            for child in node["children"]:
+                place(child, child_x, depth + 1)
+                child_x += child["value"] / total * width
+
+        place(self.root, 0.0, 0)
+
+    def frame_at(self, pos):
+        for rect, node in self.frames:
+            if rect.contains(QPointF(pos)):
+                return node
+        return None
+
+    def paintEvent(self, event):
+        self.layout_frames()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#2f343e"))
+        metrics = painter.fontMetrics()
+        for rect, node in self.frames:
+            # Stable warm color per function name
+            hue = zlib.crc32(node["name"].encode('utf-8')) % 50
+            painter.fillRect(rect, QColor.fromHsv(hue, 170, 230))
+            if rect.width() > 30:
+                text = metrics.elidedText(node["name"], Qt.ElideRight, int(rect.width()) - 6)
+                painter.setPen(QColor("black"))
+                painter.drawText(rect.adjusted(3, 0, -3, 0), Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        node = self.frame_at(event.pos())
+        if node is not None:
+            share = node["value"] / (self.root["value"] or 1.0) * 100
+            location = f"{node['file']}:{node['line']}" if node["file"] else ""
+            QToolTip.showText(event.globalPos(), f"{node['name']}\n{location}\n{node['value']:.4f}s ({share:.1f}%)", self)
+        else:
+            QToolTip.hideText()
+        super().mouseMoveEvent(event)
+
+    def mousePressEvent(self, event):
+        node = self.frame_at(event.pos())
+        if node is not None and node["file"] and event.button() == Qt.LeftButton:
+            self.frame_activated.emit(node["file"], node["line"])
+        super().mousePressEvent(event)
+
+class ProfileResultsWidget(QWidget):
+    """Tab showing a sortable hot-function table and a flame graph of a profiled run"""
+    frame_activated = pyqtSignal(str, int)
+
+    def __init__(self, results, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        mode = "cProfile" if results.get("mode") == "cprofile" else "sampling profiler"
+        title = QLabel(f"{results.get('script')} ({mode}, total {results['flame']['value']:.3f}s)")
+        title.setStyleSheet("font-weight: bold; color: white;")
+        layout.addWidget(title)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        # Hot-function table, sorted by own time
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Function", "File", "Line", "Calls", "Own time (s)", "Total time (s)"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        functions = results["functions"]
+        self.table.setRowCount(len(functions))
+        for row, function in enumerate(functions):
+            values = [function["name"], function["file"], function["line"], function["calls"],
+                      round(function["tottime"], 6), round(function["cumtime"], 6)]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                # Store numbers as numbers so sorting is numeric
+                item.setData(Qt.DisplayRole, value if value is not None else "")
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(4, Qt.DescendingOrder)
+        self.table.cellDoubleClicked.connect(self.row_activated)
+        splitter.addWidget(self.table)
+
+        # Flame graph in a scroll area, deep stacks can be taller than the tab
+        self.flame_graph = FlameGraphWidget(results["flame"])
+        self.flame_graph.frame_activated.connect(self.frame_activated)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(self.flame_graph)
+        splitter.addWidget(scroll)
+
+        layout.addWidget(splitter)
+
+    def row_activated(self, row, column):
+        file_name = self.table.item(row, 1).text()
+        line = self.table.item(row, 2).data(Qt.DisplayRole)
+        if file_name and isinstance(line, int):
+            self.frame_activated.emit(file_name, line)
+
+# Banner line written by run_code at the start of every run
+RUN_BANNER_PATTERN = re.compile(rb'^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] (?:Running|Profiling)[^\n]*', re.M)
+# Lines that look like errors in Python/Perl output
+ERROR_LINE_PATTERN = re.compile(
+    rb'\b\w*(?:error|exception)\b|\b(?:traceback|fatal|failed|died|warning)\b|^\s*File ".*", line \d+| at \S+ line \d+',
+    re.I | re.M)
+
+class OutputIndexBuilder(QThread):
+    """Builds the line offset index of an existing output cache file"""
+    loaded = pyqtSignal(object, object)
+    error_occurred = pyqtSignal(str)
+
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, path, size):
+        super().__init__()
+        self.path = path
+        self.size = size
+
+    def run(self):
+        offsets = array('Q', [0])
+        runs = []
+        try:
+            with open(self.path, 'rb') as f:
+                position = 0
+                while position < self.size:
+                    chunk = f.read(min(self.CHUNK_SIZE, self.size - position))
+                    if not chunk:
+                        break
+                    # Line starts from the cumulative lengths of the split lines
+                    start = position
+                    for line in chunk.split(b"\n")[:-1]:
+                        start += len(line) + 1
+                        offsets.append(start)
+                    position += len(chunk)
+                if self.size:
+                    f.seek(0)
+                    with mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ) as mm:
+                        for match in RUN_BANNER_PATTERN.finditer(mm):
+                            runs.append((match.start(), match.group().decode('utf-8', errors='replace')))
+        except (OSError, ValueError) as e:
+            self.error_occurred.emit(f"Could not index output: {e}")
+        self.loaded.emit(offsets, runs)
+
+class OutputSearchWorker(QThread):
+    """Searches the output cache file and streams matching lines in batches"""
+    matches_found = pyqtSignal(list)
+    search_finished = pyqtSignal(int, bool)
+    error_occurred = pyqtSignal(str)
+
+    MAX_RESULTS = 10000
+    BATCH_SIZE = 200
+
+    def __init__(self, path, offsets, size, pattern, use_regex=False, match_case=False,
+                 errors_only=False, byte_range=None):
+        super().__init__()
+        self.path = path
+        self.offsets = offsets
+        self.size = size
+        self.pattern = pattern
+        self.use_regex = use_regex
+        self.match_case = match_case
+        self.errors_only = errors_only
+        self.byte_range = byte_range
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            needle = self.pattern.encode('utf-8')
+            if needle:
+                flags = 0 if self.match_case else re.I
+                regex = re.compile(needle if self.use_regex else re.escape(needle), flags | re.M)
+            else:
+                regex = ERROR_LINE_PATTERN if self.errors_only else None
+        except re.error as e:
+            self.error_occurred.emit(f"Invalid regular expression: {e}")
+            self.search_finished.emit(0, False)
+            return
+        if regex is None or self.size == 0:
+            self.search_finished.emit(0, False)
+            return
+
+        start, end = self.byte_range or (0, self.size)
+        end = min(end, self.size)
+        count, batch, last_line = 0, [], -1
+        try:
+            with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ) as mm:
+                for match in regex.finditer(mm, start, end):
+                    if self.cancelled:
+                        break
+                    line = bisect.bisect_right(self.offsets, match.start()) - 1
+                    if line == last_line:
+                        continue
+                    last_line = line
+                    line_start = self.offsets[line]
+                    line_end = self.offsets[line + 1] - 1 if line + 1 < len(self.offsets) else self.size
+                    text = mm[line_start:line_end]
+                    if self.errors_only and needle and not ERROR_LINE_PATTERN.search(text):
+                        continue
+                    batch.append((line, text.decode('utf-8', errors='replace').rstrip("\r")))
+                    count += 1
+                    if len(batch) >= self.BATCH_SIZE:
+                        self.matches_found.emit(batch)
+                        batch = []
+                    if count >= self.MAX_RESULTS:
+                        break
+        except (OSError, ValueError) as e:
+            self.error_occurred.emit(f"Search failed: {e}")
+        if batch:
+            self.matches_found.emit(batch)
+        self.search_finished.emit(count, count >= self.MAX_RESULTS)
+
+class FindInFilesWorker(QThread):
+    """
+    Searches the files of a project on a thread pool and streams the matches per file. Each file is
+    scanned in one go with a bytes regex, big files through mmap, and lines are only worked out
+    around the matches
+    """
+    matches_found = pyqtSignal(list)  # [(relative path, match count, [(line number, column, length, line text)])]
+    search_finished = pyqtSignal(int, int, bool)  # matches, files with matches, stopped at MAX_RESULTS
+    error_occurred = pyqtSignal(str)
+
+    MAX_RESULTS = 20000
+    MAX_PER_FILE = 1000
+    MMAP_BYTES = 1024 * 1024
+    EMIT_SECONDS = 0.1
+    WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+    def __init__(self, root, rules, pattern, paths=None, use_regex=False, match_case=False,
+                 whole_word=False, include="", exclude=""):
+        super().__init__()
+        self.root = root
+        self.rules = rules
+        self.pattern = pattern
+        # Paths from the project index when it is ready, otherwise the folder is walked
+        self.paths = paths
+        self.use_regex = use_regex
+        self.match_case = match_case
+        self.whole_word = whole_word
+        self.include = self.glob_rules(include)
+        self.exclude = self.glob_rules(exclude)
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @staticmethod
+    def glob_rules(text):
+        """Comma separated globs, "*.py" matches names anywhere and "src/" whole folders"""
+        patterns = [pattern.strip() for pattern in text.split(",") if pattern.strip()]
+        return IgnoreRules(patterns) if patterns else None
+
+    @staticmethod
+    def glob_matches(rules, path):
+        if rules.ignored(path):
+            return True
+        parts = path.split("/")
+        return any(rules.ignored("/".join(parts[:i]), True) for i in range(1, len(parts)))
+
+    def compile(self, pattern):
+        if not self.use_regex:
+            pattern = re.escape(pattern)
+        if self.whole_word:
+            pattern = r"\b(?:" + pattern + r")\b"
+        return re.compile(pattern, (0 if self.match_case else re.I) | re.M)
+
+    def prepare(self):
+        """Compile the search, reports an invalid regex and returns False"""
+        try:
+            # bytes for UTF-8 and single byte files, str for the UTF-16/32 ones that have a BOM
+            self.text_regex = self.compile(self.pattern)
+            self.regex = re.compile(self.text_regex.pattern.encode('utf-8'), self.text_regex.flags & ~re.U)
+        except re.error as e:
+            self.error_occurred.emit(f"Invalid regular expression: {e}")
+            return False
+        # A plain find rules out most files for text searches, much faster than a case-insensitive
+        # or whole word regex, which cannot skip ahead to a literal prefix
+        self.literal = None
+        if not self.use_regex and self.pattern.isascii():
+            self.literal = (self.pattern if self.match_case else self.pattern.lower()).encode('ascii')
+        return True
+
+    def candidate_paths(self):
+        paths = self.paths if self.paths is not None else ProjectIndexer.walk(self.root, self.rules, lambda: self.cancelled)
+        for path in paths:
+            if self.cancelled:
+                return
+            if is_binary_path(path) or (self.include and not self.glob_matches(self.include, path)) \
+                    or (self.exclude and self.glob_matches(self.exclude, path)):
+                continue
+            yield path
+
+    def map_files(self, function):
+        """(path, result) of function for every candidate file, run on the pool and yielded in walk order"""
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            try:
+                for path in self.candidate_paths():
+                    pending.append((path, pool.submit(function, path)))
+                    # A bounded window of files in flight
+                    while pending and (len(pending) >= self.WORKERS * 4 or pending[0][1].done()):
+                        path, future = pending.popleft()
+                        yield path, future.result()
+                while pending and not self.cancelled:
+                    path, future = pending.popleft()
+                    yield path, future.result()
+            finally:
+                for path, future in pending:
+                    future.cancel()
+
+    def run(self):
+        if not self.prepare():
+            self.search_finished.emit(0, 0, False)
+            return
+        count, files, batch, last_emit = 0, 0, [], time.perf_counter()
+        results = self.map_files(self.search_file)
+        for path, result in results:
+            if result:
+                file_count, matches = result
+                batch.append((path, file_count, matches))
+                count += file_count
+                files += 1
+            if batch and time.perf_counter() - last_emit > self.EMIT_SECONDS:
+                self.matches_found.emit(batch)
+                batch, last_emit = [], time.perf_counter()
+            if count >= self.MAX_RESULTS:
+                break
+        results.close()
+        if batch:
+            self.matches_found.emit(batch)
+        self.search_finished.emit(count, files, count >= self.MAX_RESULTS)
+
+    def search_file(self, path):
+        if self.cancelled:
+            return None
+        full_path = os.path.join(self.root, path)
+        try:
+            with open(full_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return None
+                head = f.read(BINARY_SNIFF_BYTES)
+                bom = sniff_bom(head[:4])
+                if bom is None and b"\0" in head:
+                    return None  # Binary content
+                if bom is not None and bom[0] != 'utf-8':
+                    f.seek(bom[1])
+                    return self.search_data(f.read().decode(bom[0], errors='replace'), self.text_regex, "\n")
+                if size < self.MMAP_BYTES:
+                    data = head + f.read()
+                    if self.literal is not None and self.literal not in (data if self.match_case else data.lower()):
+                        return None
+                    return self.search_data(data, self.regex, b"\n")
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self.search_data(mm, self.regex, b"\n")
+        except (OSError, ValueError):
+            return None  # Unreadable or gone since it was listed
+
+    def text_encoding(self, data):
+        """First of TEXT_ENCODINGS that decodes the whole file, as decode_text picks it, checked in blocks
+        so a mapped file is not copied at once"""
+        for encoding in TEXT_ENCODINGS:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                for start in range(0, len(data), self.MMAP_BYTES):
+                    decoder.decode(data[start:start + self.MMAP_BYTES])
+                decoder.decode(b"", final=True)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return TEXT_ENCODINGS[0]
+
+    def search_data(self, data, regex, newline):
+        """Returns (match count, one row per matching line), every match is counted"""
+        matches = []
+        count = 0
+        line, counted_to, last_line_start = 1, 0, -1
+        # Bytes are decoded the way the editor opens the file, worked out at the first match
+        encoding = None
+        for match in regex.finditer(data):
+            if self.cancelled or count >= self.MAX_PER_FILE:
+                break
+            count += 1
+            start = match.start()
+            line_start = data.rfind(newline, 0, start) + 1
+            if line_start == last_line_start:
+                continue  # Listed once per line
+            line += data[counted_to:line_start].count(newline)
+            counted_to = last_line_start = line_start
+            line_end = data.find(newline, start)
+            if line_end == -1:
+                line_end = len(data)
+            if isinstance(newline, bytes):
+                if encoding is None:
+                    encoding = self.text_encoding(data)
+                if line_start == 0 and data[:3] == codecs.BOM_UTF8:
+                    line_start = 3
+                # Character column, the byte offset is only right for ASCII text
+                column = len(data[line_start:start].decode(encoding, errors='replace'))
+                text = data[line_start:min(line_end, line_start + 500)].decode(encoding, errors='replace')
+            else:
+                column = start - line_start
+                text = data[line_start:min(line_end, line_start + 500)]
+            matches.append((line, column, match.end() - start, text.rstrip("\r")))
+        return (count, matches) if matches else None
+
+class FindInFilesPanel(QWidget):
+    """Find in Files tab of the bottom panel, matches are listed per file as they come in"""
+    match_activated = pyqtSignal(str, int)
+    replace_confirmed = pyqtSignal(str, list)  # project root, FileReplacement objects to apply
+
+    def __init__(self, project, open_texts, parent=None):
+        super().__init__(parent)
+        # Returns (root, ignore rules, file index or None), or None without an open folder
+        self.project = project
+        # Returns the text of open editors below a root by relative path
+        self.open_texts = open_texts
+        self.worker = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        search_row = QHBoxLayout()
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("Find in files...")
+        self.pattern_input.returnPressed.connect(self.start_search)
+        search_row.addWidget(self.pattern_input)
+        self.search_button = QPushButton("Search")
+        self.search_button.clicked.connect(self.start_search)
+        search_row.addWidget(self.search_button)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.cancel_search)
+        search_row.addWidget(self.stop_button)
+        layout.addLayout(search_row)
+
+        replace_row = QHBoxLayout()
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace with...")
+        replace_row.addWidget(self.replace_input)
+        self.replace_button = QPushButton("Replace All...")
+        self.replace_button.clicked.connect(self.start_replace)
+        replace_row.addWidget(self.replace_button)
+        layout.addLayout(replace_row)
+
+        options_row = QHBoxLayout()
+        self.regex_check = QCheckBox("Regex")
+        self.case_check = QCheckBox("Match case")
+        self.word_check = QCheckBox("Whole word")
+        for widget in (self.regex_check, self.case_check, self.word_check):
+            options_row.addWidget(widget)
+        self.include_input = QLineEdit()
+        self.include_input.setPlaceholderText("Files to include, e.g. *.py, src/")
+        self.include_input.returnPressed.connect(self.start_search)
+        self.exclude_input = QLineEdit()
+        self.exclude_input.setPlaceholderText("Files to exclude")
+        self.exclude_input.returnPressed.connect(self.start_search)
+        options_row.addWidget(self.include_input)
+        options_row.addWidget(self.exclude_input)
+        layout.addLayout(options_row)
+
+        self.results_tree = QTreeWidget()
+        self.results_tree.setHeaderHidden(True)
+        self.results_tree.setUniformRowHeights(True)
+        self.results_tree.itemActivated.connect(self.item_activated)
+        layout.addWidget(self.results_tree)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+    def start_search(self):
+        self.start_worker(replace=False)
+
+    def start_replace(self):
+        """Work out every replacement in the background and preview them before anything is written"""
+        self.start_worker(replace=True)
+
+    def start_worker(self, replace):
+        pattern = self.pattern_input.text()
+        if not pattern:
+            return
+        project = self.project()
+        if project is None:
+            self.status_label.setText("Open a folder to search in files")
+            return
+        root, rules, file_index = project
+        self.cancel_search()
+        self.results_tree.clear()
+        options = dict(
+            paths=list(file_index.ids) if file_index is not None else None,
+            use_regex=self.regex_check.isChecked(),
+            match_case=self.case_check.isChecked(),
+            whole_word=self.word_check.isChecked(),
+            include=self.include_input.text(),
+            exclude=self.exclude_input.text())
+        if replace:
+            self.worker = ReplacePreviewWorker(root, rules, pattern, self.replace_input.text(),
+                                               open_texts=self.open_texts(root), **options)
+            self.worker.previewed.connect(self.preview_replacements)
+        else:
+            self.worker = FindInFilesWorker(root, rules, pattern, **options)
+            self.worker.matches_found.connect(self.add_matches)
+        self.worker.search_finished.connect(self.search_finished)
+        self.worker.error_occurred.connect(self.status_label.setText)
+        self.search_started = time.perf_counter()
+        self.status_label.setText("Preparing replacements..." if replace else "Searching...")
+        self.stop_button.setEnabled(True)
+        self.worker.start()
+
+    def preview_replacements(self, replacements):
+        if self.sender() is not self.worker:
+            return
+        if not replacements:
+            return
+        dialog = ReplacePreviewDialog(replacements, self)
+        if dialog.exec_() == QDialog.Accepted:
+            selected = dialog.selected()
+            if selected:
+                self.replace_confirmed.emit(self.worker.root, selected)
+
+    def add_matches(self, batch):
+        if self.sender() is not self.worker:
+            return
+        root = self.worker.root
+        for path, count, matches in batch:
+            file_item = QTreeWidgetItem([f"{path} ({count})"])
+            file_item.setData(0, Qt.UserRole, (os.path.join(root, *path.split("/")), matches[0][0]))
+            for line, column, length, text in matches:
+                item = QTreeWidgetItem(file_item, [f"{line}: {text.strip()[:300]}"])
+                item.setData(0, Qt.UserRole, (os.path.join(root, *path.split("/")), line))
+            self.results_tree.addTopLevelItem(file_item)
+            # Expanded while the list is short, a long list stays scannable by file
+            file_item.setExpanded(self.results_tree.topLevelItemCount() <= 50)
+
+    def search_finished(self, count, files, truncated):
+        if self.sender() is not self.worker:
+            return
+        self.stop_button.setEnabled(False)
+        if self.status_label.text().startswith("Invalid"):
+            return
+        elapsed = time.perf_counter() - self.search_started
+        stopped = " (stopped)" if self.worker.cancelled else ""
+        more = ", showing the first matches only" if truncated else ""
+        self.status_label.setText(f"{count} matches in {files} files, {elapsed:.2f} s{stopped}{more}")
+
+    def item_activated(self, item, column):
+        path, line = item.data(0, Qt.UserRole)
+        self.match_activated.emit(path, line)
+
+    def cancel_search(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+class FileReplacement:
+    """
+    Replace in Files result for one file: the text searched, the matched spans and the new text
+    """
+    def __init__(self, path, text, spans, encoding='utf-8', bom=False, stat=None):
+        self.path = path  # Relative to the project root
+        self.text = text
+        self.spans = spans  # [(start, end, replacement)] character offsets into text
+        self.encoding = encoding
+        self.bom = bom
+        # (mtime, size) when read from disk, None when the text came from an open editor
+        self.stat = stat
+        self.new_text = "".join(self.pieces())
+
+    def pieces(self):
+        position = 0
+        for start, end, replacement in self.spans:
+            yield self.text[position:start]
+            yield replacement
+            position = end
+        yield self.text[position:]
+
+    def diff(self, context=2):
+        return "".join(difflib.unified_diff(
+            self.text.splitlines(True), self.new_text.splitlines(True),
+            f"a/{self.path}", f"b/{self.path}", n=context))
+
+class ReplacePreviewWorker(FindInFilesWorker):
+    """Works out the replacements for every matching file, nothing is written until they are applied"""
+    previewed = pyqtSignal(list)  # FileReplacement per file with matches
+
+    def __init__(self, root, rules, pattern, replacement, open_texts=None, **options):
+        super().__init__(root, rules, pattern, **options)
+        # Regex replacements expand \1 and \g<name>, plain ones are used as typed
+        self.template = replacement if self.use_regex else replacement.replace("\\", "\\\\")
+        # Text of open editors by relative path, their unsaved edits are what gets replaced
+        self.open_texts = open_texts or {}
+
+    def run(self):
+        if not self.prepare():
+            self.search_finished.emit(0, 0, False)
+            return
+        try:
+            self.text_regex.sub(self.template, "")  # Reports a bad group reference before any file is read
+        except (re.error, IndexError) as e:
+            self.error_occurred.emit(f"Invalid replacement: {e}")
+            self.search_finished.emit(0, 0, False)
+            return
+        replacements = [replacement for path, replacement in self.map_files(self.replace_file) if replacement is not None]
+        if self.cancelled:
+            replacements = []
+        self.previewed.emit(replacements)
+        self.search_finished.emit(sum(len(replacement.spans) for replacement in replacements), len(replacements), False)
+
+    def replace_file(self, path):
+        if self.cancelled:
+            return None
+        text = self.open_texts.get(path)
+        encoding, bom, stat = 'utf-8', False, None
+        if text is None:
+            try:
+                with open(os.path.join(self.root, path), 'rb') as f:
+                    info = os.fstat(f.fileno())
+                    data = f.read()
+            except OSError:
+                return None
+            stat = (info.st_mtime_ns, info.st_size)
+            marker = sniff_bom(data[:4])
+            if self.literal is not None and (marker is None or marker[0] == 'utf-8') \
+                    and self.literal not in (data if self.match_case else data.lower()):
+                return None
+            decoded = decode_text(data)
+            if decoded is None:
+                return None  # Binary content
+            text, encoding, bom = decoded
+        spans = [(match.start(), match.end(), match.expand(self.template)) for match in self.text_regex.finditer(text)]
+        if not spans:
+            return None
+        return FileReplacement(path, text, spans, encoding, bom, stat)
+
+class ReplacePreviewDialog(QDialog):
+    """Replace in Files preview: the files to change with a diff of each, unchecked files are left alone"""
+    def __init__(self, replacements, parent=None):
+        super().__init__(parent)
+        self.replacements = replacements
+        self.setWindowTitle("Replace in Files")
+        self.resize(900, 550)
+
+        layout = QVBoxLayout(self)
+        splitter = QSplitter(Qt.Horizontal)
+        self.files_list = QListWidget()
+        self.files_list.setUniformItemSizes(True)
+        for replacement in replacements:
+            item = QListWidgetItem(f"{replacement.path} ({len(replacement.spans)})")
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.files_list.addItem(item)
+        self.files_list.currentRowChanged.connect(self.show_diff)
+        splitter.addWidget(self.files_list)
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.diff_view.setFont(QFont("Courier New", 10))
+        splitter.addWidget(self.diff_view)
+        splitter.setSizes([300, 600])
+        layout.addWidget(splitter)
+
+        buttons = QHBoxLayout()
+        count = sum(len(replacement.spans) for replacement in replacements)
+        buttons.addWidget(QLabel(f"{count} replacements in {len(replacements)} files"))
+        buttons.addStretch()
+        replace_button = QPushButton("Replace")
+        replace_button.clicked.connect(self.accept)
+        buttons.addWidget(replace_button)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(cancel_button)
+        layout.addLayout(buttons)
+        if replacements:
+            self.files_list.setCurrentRow(0)
+
+    def show_diff(self, row):
+        # Worked out for the selected file only, thousands of files stay cheap to list
+        self.diff_view.setPlainText(self.replacements[row].diff() if 0 <= row < len(self.replacements) else "")
+
+    def selected(self):
+        return [replacement for row, replacement in enumerate(self.replacements)
+                if self.files_list.item(row).checkState() == Qt.Checked]
+
+class OutputSearchDialog(QDialog):
+    """Find in Output: regex/substring search over the whole output log"""
+    line_activated = pyqtSignal(int)
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.worker = None
+        self.setWindowTitle("Find in Output")
+        self.resize(700, 450)
+
+        layout = QVBoxLayout(self)
+        search_row = QHBoxLayout()
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("Search output...")
+        self.pattern_input.returnPressed.connect(self.start_search)
+        search_row.addWidget(self.pattern_input)
+        search_button = QPushButton("Search")
+        search_button.clicked.connect(self.start_search)
+        search_row.addWidget(search_button)
+        layout.addLayout(search_row)
+
+        options_row = QHBoxLayout()
+        self.regex_check = QCheckBox("Regex")
+        self.case_check = QCheckBox("Match case")
+        self.errors_check = QCheckBox("Errors only")
+        self.run_combo = QComboBox()
+        for widget in (self.regex_check, self.case_check, self.errors_check):
+            options_row.addWidget(widget)
+        options_row.addStretch()
+        options_row.addWidget(QLabel("Scope:"))
+        options_row.addWidget(self.run_combo)
+        layout.addLayout(options_row)
+
+        self.results_list = QListWidget()
+        self.results_list.setUniformItemSizes(True)
+        self.results_list.itemActivated.connect(
+            lambda item: self.line_activated.emit(item.data(Qt.UserRole)))
+        layout.addWidget(self.results_list)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.refresh_runs()
+
+    def refresh_runs(self):
+        """Fill the scope selector with the most recent runs"""
+        self.run_combo.clear()
+        self.run_combo.addItem("All output", None)
+        for run_index in range(len(self.index.runs) - 1, max(-1, len(self.index.runs) - 201), -1):
+            self.run_combo.addItem(self.index.runs[run_index][1], run_index)
+        if not self.index.ready:
+            self.status_label.setText("Indexing output...")
+
+    def start_search(self):
+        if not self.index.ready:
+            self.status_label.setText("Indexing output, try again in a moment...")
+            return
+        self.cancel_search()
+        self.results_list.clear()
+        run_index = self.run_combo.currentData()
+        offsets, size = self.index.snapshot()
+        self.worker = OutputSearchWorker(
+            self.index.path, offsets, size, self.pattern_input.text(),
+            use_regex=self.regex_check.isChecked(),
+            match_case=self.case_check.isChecked(),
+            errors_only=self.errors_check.isChecked(),
+            byte_range=self.index.run_range(run_index) if run_index is not None else None)
+        self.worker.matches_found.connect(self.add_matches)
+        self.worker.search_finished.connect(self.search_finished)
+        self.worker.error_occurred.connect(self.status_label.setText)
+        self.status_label.setText("Searching...")
+        self.worker.start()
+
+    def add_matches(self, matches):
+        if self.sender() is not self.worker:
+            return
+        for line, text in matches:
+            item = QListWidgetItem(f"{line + 1}: {text[:300]}")
+            item.setData(Qt.UserRole, line)
+            self.results_list.addItem(item)
+
+    def search_finished(self, count, truncated):
+        if self.sender() is not self.worker:
+            return
+        if count == 0 and not self.status_label.text().startswith(("Invalid", "Search failed")):
+            self.status_label.setText("No matches")
+        elif count:
+            more = " (showing first matches only)" if truncated else ""
+            self.status_label.setText(f"{count} matching lines{more}")
+
+    def cancel_search(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+    def closeEvent(self, event):
+        self.cancel_search()
+        super().closeEvent(event)
+
+class RunHistoryDialog(QDialog):
+    """Lists past runs and opens, diffs or exports their output"""
+    open_requested = pyqtSignal(dict)
+    diff_requested = pyqtSignal(dict, dict)
+
+    def __init__(self, run_log, parent=None):
+        super().__init__(parent)
+        self.run_log = run_log
+        self.setWindowTitle("Run History")
+        self.resize(800, 450)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Run", "Started", "File", "Mode", "Duration (s)", "Exit code"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.open_selected())
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        hint = QLabel("Select two runs to compare them")
+        hint.setStyleSheet("color: gray;")
+        buttons.addWidget(hint)
+        buttons.addStretch()
+        for label, slot in (("Open", self.open_selected), ("Diff", self.diff_selected), ("Export...", self.export_selected)):
+            button = QPushButton(label)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.refresh()
+
+    def refresh(self):
+        records = sorted(self.run_log.all().values(), key=lambda r: r["id"], reverse=True)
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(records))
+        for row, record in enumerate(records):
+            values = [record["id"], record.get("start", ""), record.get("file", ""), record.get("mode", "run"),
+                      record.get("duration", ""), record.get("exit_code", "")]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+    def selected_records(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        ids = [self.table.item(row, 0).data(Qt.DisplayRole) for row in rows]
+        # Oldest run first so diffs read old -> new
+        return sorted((self.run_log.get(run_id) for run_id in ids), key=lambda r: r["id"])
+
+    def open_selected(self):
+        for record in self.selected_records():
+            self.open_requested.emit(record)
+
+    def diff_selected(self):
+        records = self.selected_records()
+        if len(records) != 2:
+            QMessageBox.information(self, "Run History", "Select exactly two runs to compare.")
+            return
+        self.diff_requested.emit(records[0], records[1])
+
+    def export_selected(self):
+        records = self.selected_records()
+        if len(records) != 1:
+            QMessageBox.information(self, "Run History", "Select one run to export.")
+            return
+        record = records[0]
+        default_name = f"run-{record['id']}-{os.path.splitext(os.path.basename(record.get('file', 'output')))[0]}.txt"
+        path, _ = QFileDialog.getSaveFileName(self, "Export Run Output", default_name, "Text Files (*.txt);;All Files (*)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.run_log.read_output(record))
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+
+class GoToFileDialog(QDialog):
+    """Go to File: ranked fuzzy matches over the project index while typing"""
+    file_selected = pyqtSignal(str)
+
+    def __init__(self, file_index, parent=None):
+        super().__init__(parent)
+        self.file_index = file_index
+        self.setWindowTitle("Go to File")
+        self.resize(600, 400)
+
+        layout = QVBoxLayout(self)
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Type part of a file name or path...")
+        self.query_input.textChanged.connect(self.update_results)
+        self.query_input.returnPressed.connect(self.open_current)
+        self.query_input.installEventFilter(self)
+        layout.addWidget(self.query_input)
+
+        self.results_list = QListWidget()
+        self.results_list.setUniformItemSizes(True)
+        self.results_list.itemActivated.connect(lambda item: self.open_current())
+        layout.addWidget(self.results_list)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.update_results("")
+
+    def eventFilter(self, obj, event):
+        # Up and Down move through the results without leaving the query
+        if obj is self.query_input and event.type() == QEvent.KeyPress and event.key() in (Qt.Key_Up, Qt.Key_Down):
+            row = self.results_list.currentRow() + (1 if event.key() == Qt.Key_Down else -1)
+            if 0 <= row < self.results_list.count():
+                self.results_list.setCurrentRow(row)
+            return True
+        return super().eventFilter(obj, event)
+
+    def update_results(self, query):
+        self.results_list.clear()
+        for path in self.file_index.search(query):
+            directory, _, name = path.rpartition("/")
+            item = QListWidgetItem(f"{name}    {directory}" if directory else name)
+            item.setData(Qt.UserRole, os.path.join(self.file_index.root, *path.split("/")))
+            item.setToolTip(path)
+            self.results_list.addItem(item)
+        if self.results_list.count():
+            self.results_list.setCurrentRow(0)
+        self.status_label.setText(f"{len(self.file_index)} files indexed")
+
+    def open_current(self):
+        item = self.results_list.currentItem()
+        if item is None:
+            return
+        self.accept()
+        self.file_selected.emit(item.data(Qt.UserRole))
+
 class BioToolsPanel(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)